@@ -1,9 +1,16 @@
+import os
+import sqlite3
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from pathlib import Path
 
+from .services.compression import CompressionMiddleware
+from .services.wac_store import UnknownCBSA
+from .services.warmup import WarmUp
+
 app = FastAPI(
     title="LODES Explorer",
     description="Explore LODES workplace area characteristics by block group",
@@ -19,17 +26,87 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses that aren't already precompressed (br if available, else gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
 # Import routes
-from .routes import cbsa
+from .routes import cbsa, tiles, export, rollups, compare, locate, breaks, change
 
 # Include routers
 app.include_router(cbsa.router)
+app.include_router(tiles.router)
+app.include_router(export.router)
+app.include_router(rollups.router)
+app.include_router(compare.router)
+app.include_router(locate.router)
+app.include_router(breaks.router)
+app.include_router(change.router)
+
+
+@app.exception_handler(UnknownCBSA)
+async def unknown_cbsa(request, exc):
+    """CBSA codes not in the database are a 404 on every endpoint"""
+    return JSONResponse(status_code=404, content={"detail": "CBSA not found"})
+
+
+# Tables whose rows are served straight from SQLite, read once at warm-up
+# so their pages are in the OS cache
+WARM_TABLES = {"payloads": "body", "tiles": "tile_data", "blockgroup_lod": "geometry", "rollups": "geojson"}
+
+
+def warm_page_cache(cbsa_code: str, conn: sqlite3.Connection):
+    """Read a CBSA's stored payloads, tiles, simplified geometries and rollups once"""
+    for table, column in WARM_TABLES.items():
+        try:
+            for _ in conn.execute(f"SELECT {column} FROM {table} WHERE cbsa_code = ?", (cbsa_code,)):
+                pass
+        except sqlite3.OperationalError:
+            # Database built before the table existed
+            pass
+
+
+warmup = WarmUp(cbsa.DB_FILE, {
+    "frames": lambda cbsa_code, conn: cbsa.wac_store.get(cbsa_code),
+    "geometry": lambda cbsa_code, conn: cbsa.geometry_store.get(cbsa_code).spatial_index(),
+    "page_cache": warm_page_cache,
+})
+
+
+@app.on_event("startup")
+def start_warmup():
+    """
+    Load WAC data, decode geometries, build spatial indexes and warm the
+    SQLite page cache in the background, for the CBSAs in WARMUP_CBSAS
+    (comma-separated; default every CBSA). Requests are served meanwhile;
+    /health/ready reports when it is done.
+    """
+    codes = os.getenv("WARMUP_CBSAS")
+    warmup.start([code.strip() for code in codes.split(",") if code.strip()] if codes else None)
+
+
+@app.on_event("shutdown")
+def close_db_pool():
+    """Close the pooled read-only SQLite connections and the comparison thread pool"""
+    cbsa.db_pool.close_all()
+    compare.pool.shutdown(wait=False)
 
 
 @app.get("/health")
-def health_check():
-    """Health check endpoint"""
-    return {"status": "ok", "version": "0.1.0"}
+async def health_check():
+    """
+    Liveness: answers as soon as the process serves requests, warm or not.
+    Reports readiness and warm-up progress and timings alongside.
+    """
+    return {"status": "ok", "version": "0.1.0", "ready": warmup.ready, "warmup": warmup.status()}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once warm-up has finished, 503 while it runs or if the database is unreadable"""
+    return JSONResponse(
+        status_code=200 if warmup.ready else 503,
+        content={"ready": warmup.ready, "warmup": warmup.status()},
+    )
 
 
 # Helpful API index to avoid 404 on GET /api/
@@ -41,7 +118,16 @@ def api_index():
             "/api/cbsas",
             "/api/cbsa/{cbsa_code}",
             "/api/blockgroups/{cbsa_code}",
+            "/api/blockgroups/{cbsa_code}/attributes",
             "/api/filters",
+            "/api/industries/{cbsa_code}",
+            "/api/tiles/{cbsa_code}/{z}/{x}/{y}.mvt",
+            "/api/wac/{cbsa_code}?format=raw|arrow",
+            "/api/rollups/{cbsa_code}?level=tract|county|cbsa",
+            "/api/compare?cbsas=31080,41860,47900&metric=C000",
+            "/api/locate?lon={lon}&lat={lat}",
+            "/api/breaks/{cbsa_code}?metric=C000&k=5",
+            "/api/change/{cbsa_code}?from=2019&to=2023&metric=C000",
         ],
     }
 
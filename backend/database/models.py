@@ -37,6 +37,10 @@ class WACData(Base):
     id = Column(Integer, primary_key=True, index=True)
     cbsa_code = Column(String(5), nullable=False, index=True)
     bg_geoid = Column(String(12), nullable=False, index=True)
+    # "all" or "primary" jobs
+    job_type = Column(String(10), nullable=False, default="all")
+    # LODES year of the WAC file the row came from
+    year = Column(Integer, nullable=False, default=2023)
     
     # Total jobs
     c000 = Column(Integer, default=0)
@@ -113,5 +117,5 @@ class WACData(Base):
         Index("ix_wac_cbsa", "cbsa_code"),
         Index("ix_wac_bg", "bg_geoid"),
         Index("ix_wac_cbsa_bg", "cbsa_code", "bg_geoid"),
-        UniqueConstraint("cbsa_code", "bg_geoid", name="uq_wac_cbsa_bg"),
+        UniqueConstraint("cbsa_code", "year", "job_type", "bg_geoid", name="uq_wac_cbsa_year_type_bg"),
     )
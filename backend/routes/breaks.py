@@ -0,0 +1,58 @@
+from typing import Optional
+
+import numpy as np
+from fastapi import APIRouter, Query, Request
+
+from .cbsa import JOB_TYPE_PATTERN, JOB_TYPES, cached_response, parse_metric, selected_filter_columns, wac_store
+from ..services.breaks import class_breaks
+from ..services.geojson import encode_json
+
+router = APIRouter(prefix="/api", tags=["Breaks"])
+
+
+@router.get("/breaks/{cbsa_code}")
+async def get_class_breaks(
+    request: Request,
+    cbsa_code: str,
+    metric: Optional[str] = None,
+    employment_code: Optional[str] = None,
+    age_group: Optional[str] = None,
+    earnings_bracket: Optional[str] = None,
+    education_level: Optional[str] = None,
+    k: int = Query(5, ge=2, le=12),
+    bins: int = Query(20, ge=1, le=200),
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
+    """
+    Get quantile, equal-interval and Jenks natural-breaks classes (k classes,
+    as k + 1 edges) and a histogram of a metric over the block groups
+    matching the filters. The metric is a WAC column or expression (e.g.
+    ce03 / c000), or by default the filtered metric_value of
+    /api/blockgroups/filtered. Block groups where an expression divides by
+    zero are left out.
+    """
+    selected_cols = selected_filter_columns(
+        employment_code, age_group, earnings_bracket, education_level
+    )
+    expression = parse_metric(metric)
+
+    def build():
+        frame = wac_store.get(cbsa_code, job_type)
+        positions = frame.filter_positions(selected_cols)
+        if expression is None:
+            values = frame.metric_values(selected_cols, positions)
+        else:
+            values = expression.evaluate(frame, positions)
+            if values.dtype.kind == "f":
+                values = values[np.isfinite(values)]
+        return iter([encode_json({
+            "cbsa_code": cbsa_code,
+            "job_type": job_type,
+            "metric": expression.text if expression else "metric_value",
+            "active_filters": selected_cols,
+            "k": k,
+            **class_breaks(values, k, bins),
+        })])
+
+    key = ("breaks", cbsa_code, expression.text if expression else None, tuple(selected_cols), k, bins, job_type)
+    return await cached_response(request, key, build)
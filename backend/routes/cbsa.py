@@ -1,13 +1,31 @@
-import sqlite3
-import json
-from fastapi import APIRouter, HTTPException
-from typing import Optional, List
+import asyncio
+import math
+import os
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Callable, Iterator, Optional, List, Tuple
 from pydantic import BaseModel
 
+from ..database.sqlite_pool import ReadOnlyPool
+from ..services.wac_store import WACStore, COLUMN_INDEX, JOB_TYPES
+from ..services.geometry import GeometryStore
+from ..services.cube import YearCubeStore
+from ..services.generation import DataGeneration
+from ..services.simplify import select_lod_level
+from ..services.response_cache import CachedResponse, ResponseCache, etag_matches
+from ..services.single_flight import SingleFlight
+from ..services.geojson import blockgroup_features, filtered_features, read_payload, encode_json
+from ..services.compression import compress, negotiate_encoding
+from ..services.expressions import Expression, compile_expression, json_values
+
 router = APIRouter(prefix="/api", tags=["CBSA"])
 
 DB_FILE = "lodes.db"
 
+# job_type query parameter: all jobs (default) or primary jobs
+JOB_TYPE_PATTERN = f"^({'|'.join(JOB_TYPES)})$"
+
 NAICS_DESCRIPTIONS = {
     "CNS01": "Agriculture, Forestry, Fishing and Hunting",
     "CNS02": "Mining, Quarrying, and Oil and Gas Extraction",
@@ -46,207 +64,428 @@ class FilterOptions(BaseModel):
     education_levels: List[dict]
 
 
+# Read-only connections, one per worker thread (see backend.app shutdown)
+db_pool = ReadOnlyPool(DB_FILE)
+
+
 def get_db():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return the calling thread's pooled read-only connection (do not close it)"""
+    return db_pool.connection()
+
+
+# The data generation written by load_data.py: the stores and the response
+# cache drop what they built from older data when it changes
+generation = DataGeneration(get_db)
+
+# Columnar WAC data and decoded geometries, loaded once per CBSA
+# (see backend.app startup), and WAC data by year, loaded as requested
+wac_store = WACStore(DB_FILE, generation)
+geometry_store = GeometryStore(DB_FILE, wac_store)
+year_cubes = YearCubeStore(DB_FILE, wac_store)
+
+# Serialized block-group responses, bounded by RESPONSE_CACHE_MB (default 256)
+response_cache = ResponseCache(int(os.getenv("RESPONSE_CACHE_MB", "256")) * 1024 * 1024)
+generation.on_change(response_cache.clear)
+
+# Builds of uncached responses in progress, shared by identical requests
+flights = SingleFlight()
+
+
+def data_generation() -> str:
+    """
+    Return the data generation written by load_data.py, dropping the
+    in-memory frames and cached responses built from older data if it changed
+    """
+    return generation.current()
+
+
+async def cached_response(request: Request, key: tuple, build: Callable[[], Iterator[bytes]],
+                          stored: Optional[Callable[[str], Optional[bytes]]] = None,
+                          media_type: str = "application/json") -> Response:
+    """
+    Serve a payload (JSON unless ``media_type`` says otherwise) from the
+    response cache with an ETag, answering a matching If-None-Match with 304.
+
+    On a miss the payload is built in the threadpool, off the event loop,
+    and streamed to the request that started the build as it is produced
+    (compressed by CompressionMiddleware); it is cached once complete.
+    Concurrent misses for the same key (endpoint, CBSA and normalized
+    parameters, within one data generation) share that build and are
+    answered from the finished entry.
+
+    Clients that accept compression get a compressed copy: the one ``stored``
+    returns (built at load time) or else the cached payload compressed once
+    in the threadpool, coalesced the same way.
+    """
+    # A primary-key read of a page that is always cached: cheaper inline
+    # than a trip through the threadpool
+    identity_key = (data_generation(),) + key
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    encoded_key = identity_key + (encoding,)
+
+    # ETags name the key, so a client that already has the body needs no
+    # build. A compressed stream from the build carries the identity ETag
+    # (weakened by CompressionMiddleware), so that matches too.
+    if_none_match = request.headers.get("if-none-match")
+    for etag_key in ([encoded_key] if encoding is not None else []) + [identity_key]:
+        if etag_matches(response_cache.etag(etag_key), if_none_match):
+            return Response(status_code=304, headers=cache_headers(response_cache.etag(etag_key)))
+
+    if encoding is not None:
+        entry = response_cache.get(encoded_key)
+        if entry is None and stored is not None:
+            entry = await flights.run(
+                encoded_key + ("stored",),
+                lambda: run_in_threadpool(stored_entry, encoded_key, stored, encoding, media_type),
+            )
+        if entry is not None:
+            return entry_response(request, entry, {"Content-Encoding": encoding})
+
+    entry = response_cache.get(identity_key)
+    if entry is None:
+        chunks: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        def send(chunk: bytes):
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+        task, leader = flights.start(
+            identity_key, lambda: run_in_threadpool(build_entry, identity_key, build, media_type, send)
+        )
+        if leader:
+            # Chunks are queued before the build's result, so the end marker comes last
+            task.add_done_callback(lambda _: chunks.put_nowait(None))
+            # Wait for the first chunk, so a build that fails up front (e.g.
+            # with an HTTPException) still gets a proper error response
+            first = await chunks.get()
+            if first is not None:
+                return StreamingResponse(
+                    stream_build(first, chunks, task), media_type=media_type,
+                    headers=cache_headers(response_cache.etag(identity_key)),
+                )
+        entry = await asyncio.shield(task)
+
+    if encoding is None:
+        return entry_response(request, entry)
+
+    identity = entry
+    entry = response_cache.get(encoded_key)
+    if entry is None:
+        entry = await flights.run(
+            encoded_key, lambda: run_in_threadpool(compress_entry, encoded_key, identity, encoding)
+        )
+    return entry_response(request, entry, {"Content-Encoding": encoding})
+
+
+async def stream_build(first: bytes, chunks: "asyncio.Queue[Optional[bytes]]",
+                       task: "asyncio.Future[CachedResponse]") -> AsyncIterator[bytes]:
+    """Yield a build's chunks as they arrive, then re-raise its error if it failed"""
+    chunk: Optional[bytes] = first
+    while chunk is not None:
+        yield chunk
+        chunk = await chunks.get()
+    await asyncio.shield(task)
+
+
+def cache_headers(etag: str, headers: Optional[dict] = None) -> dict:
+    """Headers of a cached response: revalidated on every use, and varying by encoding"""
+    return {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding", **(headers or {})}
+
+
+def entry_response(request: Request, entry: CachedResponse, headers: Optional[dict] = None) -> Response:
+    """Response for a cache entry, or 304 if the client already has it"""
+    headers = cache_headers(entry.etag, headers)
+    if entry.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+
+def build_entry(key: tuple, build: Callable[[], Iterator[bytes]], media_type: str = "application/json",
+                send: Optional[Callable[[bytes], None]] = None) -> CachedResponse:
+    """Build a payload, passing each chunk to ``send`` as it is produced, and cache it (unless it outgrows the cache)"""
+    chunks = []
+    for chunk in build():
+        if send is not None:
+            send(chunk)
+        chunks.append(chunk)
+    return response_cache.put(key, b"".join(chunks), media_type)
+
+
+def stored_entry(key: tuple, stored: Callable[[str], Optional[bytes]], encoding: str,
+                 media_type: str) -> Optional[CachedResponse]:
+    """Cache the body precompressed at load time, if there is one"""
+    body = stored(encoding)
+    return response_cache.put(key, body, media_type) if body is not None else None
+
+
+def compress_entry(key: tuple, identity: CachedResponse, encoding: str) -> CachedResponse:
+    """Compress a cached payload and cache the result"""
+    return response_cache.put(key, compress(identity.body, encoding), identity.media_type)
+
+
+def selected_filter_columns(*codes: Optional[str]) -> List[str]:
+    """Normalize filter codes to lowercase WAC column names, rejecting unknown codes"""
+    selected_cols = []
+    for code in codes:
+        if not code:
+            continue
+        col_name = code.lower()
+        if col_name not in COLUMN_INDEX:
+            raise HTTPException(status_code=400, detail=f"Unknown filter code: {code}")
+        selected_cols.append(col_name)
+    return selected_cols
+
+
+def parse_metric(metric: Optional[str]) -> Optional[Expression]:
+    """Compile a metric expression parameter (e.g. ce03 / c000), rejecting invalid ones"""
+    if not metric:
+        return None
+    try:
+        return compile_expression(metric)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid metric: {e}")
+
+
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse a 'minLon,minLat,maxLon,maxLat' bbox parameter, rejecting malformed ones"""
+    if bbox is None:
+        return None
+    try:
+        values = tuple(float(value) for value in bbox.split(","))
+    except ValueError:
+        values = ()
+    if (len(values) != 4 or not all(map(math.isfinite, values))
+            or values[0] > values[2] or values[1] > values[3]):
+        raise HTTPException(status_code=400, detail=f"Invalid bbox: {bbox} (expected minLon,minLat,maxLon,maxLat)")
+    return values
+
+
+def bbox_positions(cbsa_code: str, bbox: Tuple[float, float, float, float]):
+    """Sorted positions of the block groups whose bounding box intersects bbox"""
+    return geometry_store.get(cbsa_code).spatial_index().query(bbox)
+
+
+def with_job_type_total(row, job_type: str) -> dict:
+    """A cbsas row as a dict, with total_jobs for the job type (the table holds all jobs)"""
+    cbsa = dict(row)
+    if job_type != JOB_TYPES[0]:
+        cbsa["total_jobs"] = int(wac_store.get(cbsa["cbsa_code"], job_type).totals[COLUMN_INDEX["c000"]])
+    return cbsa
 
 
 @router.get("/cbsas", response_model=List[CBSAResponse])
-def list_cbsas():
+def list_cbsas(job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN)):
     """Get all available CBSAs"""
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id, cbsa_code, cbsa_name, total_jobs FROM cbsas ORDER BY cbsa_code")
     rows = cursor.fetchall()
-    conn.close()
     
-    return [dict(row) for row in rows]
+    return [with_job_type_total(row, job_type) for row in rows]
 
 
 @router.get("/cbsa/{cbsa_code}", response_model=CBSAResponse)
-def get_cbsa(cbsa_code: str):
+def get_cbsa(cbsa_code: str, job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN)):
     """Get details for a specific CBSA"""
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT id, cbsa_code, cbsa_name, total_jobs FROM cbsas WHERE cbsa_code = ?", (cbsa_code,))
     row = cursor.fetchone()
-    conn.close()
     
     if not row:
         raise HTTPException(status_code=404, detail="CBSA not found")
     
-    return dict(row)
+    return with_job_type_total(row, job_type)
 
 
 @router.post("/blockgroups/filtered")
 @router.get("/blockgroups/filtered")
-def get_filtered_blockgroups(
+async def get_filtered_blockgroups(
+    request: Request,
     cbsa_code: str,
     employment_code: Optional[str] = None,
     age_group: Optional[str] = None,
     earnings_bracket: Optional[str] = None,
     education_level: Optional[str] = None,
+    zoom: Optional[float] = Query(None, ge=0, le=24),
+    tolerance: Optional[float] = Query(None, ge=0),
+    bbox: Optional[str] = None,
+    metric: Optional[str] = None,
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
 ):
     """
     Get block groups filtered by employment characteristics.
     Returns GeoJSON FeatureCollection with filtered data.
+    Pass the map zoom (or a tolerance in degrees) to get simplified geometry,
+    and a bbox (minLon,minLat,maxLon,maxLat) to get only the block groups
+    whose bounding box intersects it. metric_value is the metric expression
+    (e.g. ce03 / c000) if given, else the minimum of the filter columns.
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Build query
-    query = """
-        SELECT bg.bg_geoid, bg.geometry, w.*
-        FROM blockgroups bg
-        JOIN wac_data w ON bg.bg_geoid = w.bg_geoid AND bg.cbsa_code = w.cbsa_code
-        WHERE bg.cbsa_code = ?
+    selected_cols = selected_filter_columns(
+        employment_code, age_group, earnings_bracket, education_level
+    )
+    level = select_lod_level(zoom, tolerance)
+    bounds = parse_bbox(bbox)
+    expression = parse_metric(metric)
+
+    def build(within=None):
+        return filtered_features(
+            wac_store.get(cbsa_code, job_type), geometry_store.get(cbsa_code, level),
+            employment_code, selected_cols, within, expression,
+        )
+
+    if bounds is not None:
+        # Viewport requests are too varied to be worth caching; the stream
+        # is set up and then iterated in the threadpool
+        features = await run_in_threadpool(lambda: build(bbox_positions(cbsa_code, bounds)))
+        return StreamingResponse(features, media_type="application/json")
+
+    # Filters are keyed by their normalized columns; employment_code is also
+    # keyed as given because it is echoed back in the properties
+    key = (
+        "blockgroups/filtered", cbsa_code, level, tuple(selected_cols), employment_code or None,
+        expression.text if expression else None, job_type,
+    )
+    return await cached_response(request, key, build)
+
+
+@router.get("/blockgroups/{cbsa_code}/attributes")
+async def get_blockgroup_attributes(
+    request: Request,
+    cbsa_code: str,
+    employment_code: Optional[str] = None,
+    age_group: Optional[str] = None,
+    earnings_bracket: Optional[str] = None,
+    education_level: Optional[str] = None,
+    include_geoids: bool = False,
+    metric: Optional[str] = None,
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
     """
-    params = [cbsa_code]
-    
-    # Add employment code filter
-    if employment_code:
-        col_name = employment_code.lower()
-        query += f" AND w.{col_name} > 0"
-    
-    # Add age group filter
-    if age_group:
-        col_name = age_group.lower()
-        query += f" AND w.{col_name} > 0"
-    
-    # Add earnings bracket filter
-    if earnings_bracket:
-        col_name = earnings_bracket.lower()
-        query += f" AND w.{col_name} > 0"
-    
-    # Add education level filter
-    if education_level:
-        col_name = education_level.lower()
-        query += f" AND w.{col_name} > 0"
-    
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
-
-    features = []
-    for row in rows:
-        try:
-            geometry = parse_polygon_wkt(row["geometry"])
-            if not geometry:
-                continue
-
-            # Compute metric_value as the combination of all selected filters.
-            # Since the WAC data provides marginal counts (no cross-tab),
-            # we conservatively approximate the intersection by taking the minimum
-            # of the selected filter columns for this block group.
-            selected_cols = []
-            if employment_code:
-                selected_cols.append(employment_code.lower())
-            if age_group:
-                selected_cols.append(age_group.lower())
-            if earnings_bracket:
-                selected_cols.append(earnings_bracket.lower())
-            if education_level:
-                selected_cols.append(education_level.lower())
-
-            metric_value = row["c000"] or 0
-            if selected_cols:
-                vals = []
-                keys = set(row.keys())
-                for col in selected_cols:
-                    try:
-                        vals.append(row[col] if col in keys and row[col] is not None else 0)
-                    except Exception:
-                        vals.append(0)
-                metric_value = int(min(vals)) if vals else 0
-
-            properties = {
-                "bg_geoid": row["bg_geoid"],
-                "metric_value": metric_value or 0,
-                "total_jobs": row["c000"] or 0,
-                "filter_employment_code": employment_code or None,
-                "active_filters": selected_cols,
-            }
-
-            feature = {
-                "type": "Feature",
-                "properties": properties,
-                "geometry": geometry
-            }
-            features.append(feature)
-        except Exception as e:
-            print(f"Error processing row: {e}")
-            continue
+    Get filtered metric values without geometry, as arrays aligned to the
+    CBSA's block-group ordering (bg_geoids, returned with include_geoids=true).
+    metric_value is null for block groups that don't match the filters (or
+    where a metric expression divides by zero).
+    The version identifies the ordering (shared by every job_type); refetch
+    bg_geoids when it changes.
+    """
+    selected_cols = selected_filter_columns(
+        employment_code, age_group, earnings_bracket, education_level
+    )
+    expression = parse_metric(metric)
+
+    def build():
+        frame = wac_store.get(cbsa_code, job_type)
+        positions = frame.filter_positions(selected_cols)
+        if expression is None:
+            values = frame.metric_values(selected_cols, positions)
+        else:
+            values = expression.evaluate(frame, positions)
+        metric_values = [None] * len(frame)
+        for pos, value in zip(positions.tolist(), json_values(values)):
+            metric_values[pos] = value
 
-    return {
-        "type": "FeatureCollection",
-        "features": features
-    }
+        payload = {
+            "cbsa_code": cbsa_code,
+            "job_type": job_type,
+            "version": frame.version,
+            "active_filters": selected_cols,
+            "metric_value": metric_values,
+            "total_jobs": frame.column("c000").tolist(),
+        }
+        if include_geoids:
+            payload["bg_geoids"] = frame.bg_geoids
+        return iter([encode_json(payload)])
 
+    key = (
+        "blockgroups/attributes", cbsa_code, tuple(selected_cols), include_geoids,
+        expression.text if expression else None, job_type,
+    )
+    return await cached_response(request, key, build)
 
 
 @router.get("/blockgroups/{cbsa_code}")
-def get_blockgroups(cbsa_code: str):
+async def get_blockgroups(
+    request: Request,
+    cbsa_code: str,
+    zoom: Optional[float] = Query(None, ge=0, le=24),
+    tolerance: Optional[float] = Query(None, ge=0),
+    bbox: Optional[str] = None,
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
     """
     Get all block groups for a CBSA with geometry and aggregated statistics.
     Returns GeoJSON FeatureCollection.
+    Pass the map zoom (or a tolerance in degrees) to get simplified geometry,
+    and a bbox (minLon,minLat,maxLon,maxLat) to get only the block groups
+    whose bounding box intersects it.
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Get block groups
-    cursor.execute("""
-        SELECT bg.id, bg.cbsa_code, bg.bg_geoid, bg.geometry,
-               w.c000, w.ca01, w.ca02, w.ca03, w.ce01, w.ce02, w.ce03
-        FROM blockgroups bg
-        LEFT JOIN wac_data w ON bg.bg_geoid = w.bg_geoid AND bg.cbsa_code = w.cbsa_code
-        WHERE bg.cbsa_code = ?
-    """, (cbsa_code,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    if not rows:
-        # Return an empty FeatureCollection when a CBSA exists but has no block groups
-        # (avoid returning 404 which makes the frontend harder to handle)
-        return {
-            "type": "FeatureCollection",
-            "features": []
-        }
-    
-    features = []
-    for row in rows:
-        try:
-            # Parse WKT polygon to GeoJSON coordinates
-            geometry = parse_polygon_wkt(row["geometry"])
-            if not geometry:
-                continue
-            
-            properties = {
-                "bg_geoid": row["bg_geoid"],
-                "total_jobs": row["c000"] or 0,
-                "ca01": row["ca01"] or 0,
-                "ca02": row["ca02"] or 0,
-                "ca03": row["ca03"] or 0,
-                "ce01": row["ce01"] or 0,
-                "ce02": row["ce02"] or 0,
-                "ce03": row["ce03"] or 0,
-            }
-            
-            feature = {
-                "type": "Feature",
-                "properties": properties,
-                "geometry": geometry
-            }
-            features.append(feature)
-        except Exception as e:
-            print(f"Error processing row: {e}")
-            continue
-    
-    return {
-        "type": "FeatureCollection",
-        "features": features
-    }
+    level = select_lod_level(zoom, tolerance)
+    bounds = parse_bbox(bbox)
+
+    def build():
+        frame = wac_store.get(cbsa_code, job_type)
+        # A CBSA without block groups gives an empty FeatureCollection rather
+        # than a 404, which makes the frontend easier to handle
+        if not frame.has_geometry.any():
+            return blockgroup_features(frame, None)
+        within = bbox_positions(cbsa_code, bounds) if bounds is not None else None
+        return blockgroup_features(frame, geometry_store.get(cbsa_code, level), within)
+
+    if bounds is not None:
+        # Viewport requests are too varied to be worth caching; the stream
+        # is set up and then iterated in the threadpool
+        return StreamingResponse(await run_in_threadpool(build), media_type="application/json")
+
+    # Only all-jobs payloads are precompressed at load time
+    stored = None
+    if job_type == JOB_TYPES[0]:
+        stored = lambda encoding: read_payload(get_db(), cbsa_code, level, encoding)
+    return await cached_response(request, ("blockgroups", cbsa_code, level, job_type), build, stored=stored)
+
+
+@router.get("/industries/{cbsa_code}")
+async def get_industry_breakdown(
+    request: Request,
+    cbsa_code: str,
+    employment_code: Optional[str] = None,
+    age_group: Optional[str] = None,
+    earnings_bracket: Optional[str] = None,
+    education_level: Optional[str] = None,
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
+    """
+    Get jobs by industry sector (CNS01-CNS20) in the block groups matching
+    the filters, labelled like /api/filters, with each sector's share of the
+    sector total.
+    """
+    selected_cols = selected_filter_columns(
+        employment_code, age_group, earnings_bracket, education_level
+    )
+
+    def build():
+        block_groups, sums = wac_store.get(cbsa_code, job_type).column_sums(selected_cols)
+        jobs = [int(sums[COLUMN_INDEX[code.lower()]]) for code in NAICS_DESCRIPTIONS]
+        sector_total = sum(jobs)
+        return iter([encode_json({
+            "cbsa_code": cbsa_code,
+            "job_type": job_type,
+            "active_filters": selected_cols,
+            "block_groups": block_groups,
+            "total_jobs": int(sums[COLUMN_INDEX["c000"]]),
+            "sectors": [
+                {
+                    "code": code,
+                    "name": name,
+                    "jobs": count,
+                    "share": count / sector_total if sector_total else 0.0,
+                }
+                for (code, name), count in zip(NAICS_DESCRIPTIONS.items(), jobs)
+            ],
+        })])
+
+    key = ("industries", cbsa_code, tuple(sorted(set(selected_cols))), job_type)
+    return await cached_response(request, key, build)
 
 
 @router.get("/filters")
@@ -274,40 +513,3 @@ def get_filter_options():
             {"code": "CD04", "name": "Bachelor's or advanced degree"},
         ]
     )
-
-
-
-def parse_polygon_wkt(wkt_string: str) -> dict:
-    """Parse WKT polygon string to GeoJSON geometry"""
-    try:
-        # Remove 'POLYGON ((' and trailing '))'
-        wkt_string = wkt_string.strip()
-        if not wkt_string.startswith("POLYGON"):
-            return None
-        
-        # Extract coordinates
-        start = wkt_string.find("((") + 2
-        end = wkt_string.rfind("))")
-        coords_str = wkt_string[start:end]
-        
-        # Parse coordinate pairs
-        coords = []
-        for pair in coords_str.split(","):
-            parts = pair.strip().split()
-            if len(parts) >= 2:
-                try:
-                    lon, lat = float(parts[0]), float(parts[1])
-                    coords.append([lon, lat])
-                except:
-                    continue
-        
-        if len(coords) < 3:
-            return None
-        
-        return {
-            "type": "Polygon",
-            "coordinates": [coords]
-        }
-    except Exception as e:
-        print(f"Error parsing WKT: {e}")
-        return None
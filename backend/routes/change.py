@@ -0,0 +1,72 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+
+from .cbsa import JOB_TYPE_PATTERN, JOB_TYPES, cached_response, parse_metric, wac_store, year_cubes
+from ..services.cube import change
+from ..services.expressions import compile_expression, json_values
+from ..services.geojson import encode_json
+
+router = APIRouter(prefix="/api", tags=["Change"])
+
+
+@router.get("/change/{cbsa_code}")
+async def get_change(
+    request: Request,
+    cbsa_code: str,
+    from_year: int = Query(..., alias="from"),
+    to_year: int = Query(..., alias="to"),
+    metric: Optional[str] = None,
+    include_geoids: bool = False,
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
+    """
+    Get the change in a metric (a WAC column or expression such as
+    ce03 / c000, C000 by default) between two years, for the CBSA total and
+    as arrays aligned to the block-group ordering of
+    /api/blockgroups/{cbsa_code}/attributes: each year's value, the absolute
+    change and the percent change (null where the from value is zero or an
+    expression divides by zero).
+    """
+    expression = parse_metric(metric) or compile_expression("c000")
+    cube = await run_in_threadpool(year_cubes.get, cbsa_code, job_type, [from_year, to_year])
+    missing = [year for year in (from_year, to_year) if year not in cube.slots]
+    if missing:
+        available = ", ".join(map(str, cube.available)) or "none"
+        raise HTTPException(
+            status_code=404,
+            detail=f"No {job_type} WAC data for {missing[0]} (available: {available})",
+        )
+
+    def build():
+        values, totals = cube.evaluate(expression, [from_year, to_year])
+        absolute, percent = change(values[0], values[1])
+        total_absolute, total_percent = change(totals[:1], totals[1:])
+        frame = wac_store.get(cbsa_code, job_type)
+        payload = {
+            "cbsa_code": cbsa_code,
+            "job_type": job_type,
+            "metric": expression.text,
+            "from": from_year,
+            "to": to_year,
+            "years": cube.available,
+            "version": frame.version,
+            "total": {
+                "from_value": json_values(totals[:1])[0],
+                "to_value": json_values(totals[1:])[0],
+                "absolute_change": json_values(total_absolute)[0],
+                "percent_change": json_values(total_percent)[0],
+            },
+            "from_value": json_values(values[0]),
+            "to_value": json_values(values[1]),
+            "absolute_change": json_values(absolute),
+            "percent_change": json_values(percent),
+            "unmatched_block_groups": {str(year): cube.unmatched[year] for year in (from_year, to_year)},
+        }
+        if include_geoids:
+            payload["bg_geoids"] = frame.bg_geoids
+        return iter([encode_json(payload)])
+
+    key = ("change", cbsa_code, job_type, expression.text, from_year, to_year, include_geoids)
+    return await cached_response(request, key, build)
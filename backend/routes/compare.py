@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+
+from .cbsa import JOB_TYPE_PATTERN, JOB_TYPES, NAICS_DESCRIPTIONS, cached_response, get_db, selected_filter_columns, wac_store
+from ..services.geojson import encode_json
+from ..services.stats import QUANTILES, summarize
+
+router = APIRouter(prefix="/api", tags=["Compare"])
+
+# CBSAs are summarized concurrently; NumPy drops the GIL during the array work
+# (shut down in backend.app)
+pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="compare")
+
+
+@router.get("/compare")
+async def compare_cbsas(
+    request: Request,
+    cbsas: str,
+    metric: str = "C000",
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
+    """
+    Compare CBSAs (comma-separated codes) on a WAC column: totals, the
+    column's share of all jobs, its distribution across block groups
+    (mean, std, min, max, quantiles) and each CBSA's industry sector shares.
+    """
+    codes = list(dict.fromkeys(code.strip() for code in cbsas.split(",") if code.strip()))
+    if not codes:
+        raise HTTPException(status_code=400, detail="No CBSA codes given")
+    (metric_col,) = selected_filter_columns(metric) or ["c000"]
+
+    placeholders = ", ".join("?" * len(codes))
+    names = dict(await run_in_threadpool(lambda: get_db().execute(
+        f"SELECT cbsa_code, cbsa_name FROM cbsas WHERE cbsa_code IN ({placeholders})", codes
+    ).fetchall()))
+    missing = [code for code in codes if code not in names]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"CBSA not found: {', '.join(missing)}")
+
+    sectors = [code.lower() for code in NAICS_DESCRIPTIONS]
+
+    def build():
+        summaries = pool.map(lambda code: summarize(wac_store.get(code, job_type), metric_col, sectors), codes)
+        return iter([encode_json({
+            "metric": metric_col.upper(),
+            "job_type": job_type,
+            "quantiles": QUANTILES,
+            "cbsas": [
+                {"cbsa_code": code, "cbsa_name": names[code], **summary}
+                for code, summary in zip(codes, summaries)
+            ],
+        })])
+
+    return await cached_response(request, ("compare", tuple(codes), metric_col, job_type), build)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from .cbsa import JOB_TYPE_PATTERN, JOB_TYPES, cached_response, wac_store
+from ..services.export import ARROW_MEDIA_TYPE, HAS_PYARROW, RAW_MEDIA_TYPE, arrow_stream, raw_columns
+
+router = APIRouter(prefix="/api", tags=["Export"])
+
+
+@router.get("/wac/{cbsa_code}")
+async def export_wac(
+    request: Request,
+    cbsa_code: str,
+    format: str = Query("raw", pattern="^(raw|arrow)$"),
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
+    """
+    Export a CBSA's WAC rows as binary columns.
+    format=raw returns a JSON header followed by little-endian int32 column
+    buffers; format=arrow returns an Arrow IPC stream (requires pyarrow).
+    """
+    if format == "arrow":
+        if not HAS_PYARROW:
+            raise HTTPException(status_code=501, detail="Arrow export requires pyarrow on the server")
+        return await cached_response(
+            request, ("wac", cbsa_code, "arrow", job_type),
+            lambda: iter([arrow_stream(wac_store.get(cbsa_code, job_type))]),
+            media_type=ARROW_MEDIA_TYPE,
+        )
+
+    return await cached_response(
+        request, ("wac", cbsa_code, "raw", job_type),
+        lambda: raw_columns(wac_store.get(cbsa_code, job_type)),
+        media_type=RAW_MEDIA_TYPE,
+    )
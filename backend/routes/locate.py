@@ -0,0 +1,46 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from .cbsa import JOB_TYPE_PATTERN, JOB_TYPES, geometry_store, get_db, wac_store
+from ..services.geojson import SUMMARY_PROPERTIES
+
+router = APIRouter(prefix="/api", tags=["Locate"])
+
+
+@router.get("/locate")
+def locate_blockgroup(
+    lon: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    cbsa_code: Optional[str] = None,
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
+    """
+    Find the block group containing a point, in one CBSA or in any of them.
+    Candidates come from the bounding-box R-tree and are confirmed with an
+    exact point-in-polygon test. Returns a GeoJSON Feature with the same
+    properties as /api/blockgroups/{cbsa_code}, plus the CBSA code and job type.
+    """
+    if cbsa_code is not None:
+        cbsa_codes = [cbsa_code]
+    else:
+        cbsa_codes = [row[0] for row in get_db().execute("SELECT cbsa_code FROM cbsas ORDER BY cbsa_code")]
+
+    for code in cbsa_codes:
+        geometries = geometry_store.get(code)
+        for pos in geometries.spatial_index().query((lon, lat, lon, lat)).tolist():
+            if not geometries.contains(pos, lon, lat):
+                continue
+            frame = wac_store.get(code, job_type)
+            return {
+                "type": "Feature",
+                "properties": {
+                    "cbsa_code": code,
+                    "job_type": job_type,
+                    "bg_geoid": frame.bg_geoids[pos],
+                    **{name: int(frame.column(col)[pos]) for name, col in SUMMARY_PROPERTIES.items()},
+                },
+                "geometry": geometries.geojson(pos),
+            }
+
+    raise HTTPException(status_code=404, detail="No block group contains this point")
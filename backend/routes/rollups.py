@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Query, Request
+
+from .cbsa import JOB_TYPE_PATTERN, JOB_TYPES, cached_response, get_db, wac_store
+from ..services.rollups import read_rollups, resum_rollups, rollup_features
+from ..services.wac_store import UnknownCBSA, cbsa_exists
+
+router = APIRouter(prefix="/api", tags=["Rollups"])
+
+
+@router.get("/rollups/{cbsa_code}")
+async def get_rollups(
+    request: Request,
+    cbsa_code: str,
+    level: str = Query("county", pattern="^(tract|county|cbsa)$"),
+    job_type: str = Query(JOB_TYPES[0], pattern=JOB_TYPE_PATTERN),
+):
+    """
+    Get tract, county or whole-CBSA totals of every WAC column with dissolved
+    geometry, as a GeoJSON FeatureCollection. Rollups are built by load_data.py
+    for all jobs; other job types are re-summed from their in-memory frame.
+    """
+    def build():
+        rows = read_rollups(get_db(), cbsa_code, level)
+        if not rows and not cbsa_exists(get_db(), cbsa_code):
+            raise UnknownCBSA(cbsa_code)
+        if job_type != JOB_TYPES[0]:
+            rows = resum_rollups(rows, wac_store.get(cbsa_code, job_type), level)
+        return rollup_features(rows, level)
+
+    return await cached_response(request, ("rollups", cbsa_code, level, job_type), build)
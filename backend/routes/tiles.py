@@ -0,0 +1,35 @@
+import gzip
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from .cbsa import get_db
+from ..services.compression import negotiate_encoding
+from ..services.tiles import TILE_MAX_ZOOM, read_tile
+from ..services.wac_store import UnknownCBSA, cbsa_exists
+
+router = APIRouter(prefix="/api", tags=["Tiles"])
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+@router.get("/tiles/{cbsa_code}/{z}/{x}/{y}.mvt")
+def get_tile(cbsa_code: str, z: int, x: int, y: int, request: Request):
+    """
+    Get a Mapbox Vector Tile of block groups for a CBSA.
+    Tiles are precomputed at load time up to TILE_MAX_ZOOM; empty tiles,
+    and tiles beyond the pyramid, return 204 (unknown CBSAs 404).
+    """
+    if z < 0 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+
+    tile = read_tile(get_db(), cbsa_code, z, x, y) if z <= TILE_MAX_ZOOM else None
+
+    if tile is None:
+        if not cbsa_exists(get_db(), cbsa_code):
+            raise UnknownCBSA(cbsa_code)
+        return Response(status_code=204)
+
+    # Tiles are stored gzipped; only decompress for clients that can't take gzip
+    headers = {"Vary": "Accept-Encoding"}
+    if negotiate_encoding(request.headers.get("accept-encoding"), ["gzip"]):
+        return Response(tile, media_type=MVT_MEDIA_TYPE, headers={**headers, "Content-Encoding": "gzip"})
+    return Response(gzip.decompress(tile), media_type=MVT_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,139 @@
+"""
+Roaring-style compressed bitmaps of block-group positions.
+
+Positions are split on their high 16 bits into containers. A container holding
+at most ARRAY_MAX positions is a sorted uint16 array; a denser one is a 65536-bit
+bitset (1024 little-endian uint64 words). Intersections work container by
+container, so their cost follows the smaller set rather than the CBSA size.
+"""
+
+from typing import Iterable, List
+
+import numpy as np
+
+CONTAINER_BITS = 16
+CONTAINER_SIZE = 1 << CONTAINER_BITS
+ARRAY_MAX = 4096
+
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words: np.ndarray) -> int:
+        return int(np.bitwise_count(words).sum())
+else:  # NumPy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> int:
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _cardinality(container: np.ndarray) -> int:
+    if container.dtype == np.uint16:
+        return len(container)
+    return _popcount(container)
+
+
+def _to_lows(container: np.ndarray) -> np.ndarray:
+    """Sorted low 16 bits of the positions in a container"""
+    if container.dtype == np.uint16:
+        return container
+    return np.flatnonzero(np.unpackbits(container.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _from_lows(lows: np.ndarray) -> np.ndarray:
+    """Container for sorted, unique low 16 bits: an array if sparse, else a bitset"""
+    if len(lows) <= ARRAY_MAX:
+        return lows.astype(np.uint16)
+    bits = np.zeros(CONTAINER_SIZE, dtype=bool)
+    bits[lows] = True
+    return np.packbits(bits, bitorder="little").view("<u8")
+
+
+def _contains(words: np.ndarray, lows: np.ndarray) -> np.ndarray:
+    """Which of the low bits are set in a bitset container"""
+    lows = lows.astype(np.uint64)
+    return ((words[lows >> np.uint64(6)] >> (lows & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+
+def _intersect(containers: List[np.ndarray]) -> np.ndarray:
+    """
+    Intersect containers: bitsets are ANDed word by word, and the smallest
+    array is narrowed by the other arrays and then tested against the bitset
+    """
+    arrays = sorted((c for c in containers if c.dtype == np.uint16), key=len)
+    bitsets = [c for c in containers if c.dtype != np.uint16]
+    words = np.bitwise_and.reduce(bitsets) if bitsets else None
+
+    if not arrays:
+        return words if _popcount(words) > ARRAY_MAX else _to_lows(words)
+
+    lows = arrays[0]
+    for array in arrays[1:]:
+        if not len(lows):
+            break
+        lows = np.intersect1d(lows, array, assume_unique=True)
+    if words is not None and len(lows):
+        lows = lows[_contains(words, lows)]
+    return lows
+
+
+class Bitmap:
+    """An immutable set of non-negative positions"""
+
+    __slots__ = ("keys", "containers", "cardinality")
+
+    def __init__(self, keys: List[int], containers: List[np.ndarray]):
+        # containers[i] holds the positions whose high bits are keys[i]
+        self.keys = keys
+        self.containers = containers
+        self.cardinality = sum(_cardinality(c) for c in containers)
+
+    @classmethod
+    def from_positions(cls, positions: np.ndarray) -> "Bitmap":
+        """Bitmap of sorted, unique positions"""
+        positions = np.asarray(positions, dtype=np.int64)
+        highs = positions >> CONTAINER_BITS
+        keys, starts = np.unique(highs, return_index=True)
+        bounds = np.append(starts, len(positions))
+        containers = [
+            _from_lows(positions[start:end] & (CONTAINER_SIZE - 1))
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        return cls(keys.tolist(), containers)
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> "Bitmap":
+        return cls.from_positions(np.flatnonzero(mask))
+
+    def __len__(self) -> int:
+        return self.cardinality
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.containers)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        return Bitmap.intersect([self, other])
+
+    @staticmethod
+    def intersect(bitmaps: Iterable["Bitmap"]) -> "Bitmap":
+        """Intersection of one or more bitmaps"""
+        bitmaps = list(bitmaps)
+        indexes = [dict(zip(bitmap.keys, bitmap.containers)) for bitmap in bitmaps]
+        shared = set(bitmaps[0].keys).intersection(*(bitmap.keys for bitmap in bitmaps[1:]))
+
+        keys, containers = [], []
+        for key in sorted(shared):
+            result = _intersect([index[key] for index in indexes])
+            if _cardinality(result):
+                keys.append(key)
+                containers.append(result)
+        return Bitmap(keys, containers)
+
+    def positions(self) -> np.ndarray:
+        """Sorted positions as an int64 array"""
+        if not self.containers:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([
+            (key << CONTAINER_BITS) + _to_lows(container).astype(np.int64)
+            for key, container in zip(self.keys, self.containers)
+        ])
@@ -0,0 +1,142 @@
+"""
+Choropleth class breaks and histograms of one metric across block groups.
+
+Breaks are returned as k + 1 edges, from the minimum to the maximum value:
+quantile and equal-interval breaks come straight from NumPy, and Jenks
+natural breaks are the exact optimum of the within-class sum of squared
+deviations.
+
+Jenks runs its dynamic program over the distinct values weighted by their
+counts (job counts repeat a lot), with class costs read off prefix sums.
+Each row of the program is filled by divide and conquer, which is valid
+because the best split point never moves left as the range grows. All the
+midpoints at one recursion depth are evaluated together as one array
+operation, so a row costs O(m log m) for m distinct values instead of O(m²).
+"""
+
+from typing import Dict
+
+import numpy as np
+
+
+def _expand(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate the index ranges [starts[i], ends[i])"""
+    lengths = ends - starts
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+class _ClassCosts:
+    """Sum of squared deviations of any run of sorted, weighted values"""
+
+    def __init__(self, values: np.ndarray, weights: np.ndarray):
+        # Centering keeps the prefix sums small enough to subtract accurately
+        x = values - np.average(values, weights=weights)
+        self.w = np.concatenate([[0.0], np.cumsum(weights, dtype=np.float64)])
+        self.s1 = np.concatenate([[0.0], np.cumsum(weights * x)])
+        self.s2 = np.concatenate([[0.0], np.cumsum(weights * x * x)])
+
+    def __call__(self, i, j):
+        """Cost of the values i..j-1"""
+        s = self.s1[j] - self.s1[i]
+        return np.maximum(self.s2[j] - self.s2[i] - s * s / (self.w[j] - self.w[i]), 0.0)
+
+
+def _jenks_row(prev: np.ndarray, cost: _ClassCosts, c: int, m: int):
+    """
+    best[j] = min over i of prev[i] + cost(i, j), for j in c..m, and the
+    chosen i, filled by divide and conquer one recursion depth at a time
+    """
+    best = np.full(m + 1, np.inf)
+    split = np.zeros(m + 1, dtype=np.int64)
+
+    # Pending ranges of j (lo..hi) and the range their split must lie in
+    lo, hi = np.array([c]), np.array([m])
+    opt_lo, opt_hi = np.array([c - 1]), np.array([m - 1])
+    while len(lo):
+        mid = (lo + hi) // 2
+        ends = np.minimum(mid - 1, opt_hi) + 1
+        candidates = _expand(opt_lo, ends)
+        lengths = ends - opt_lo
+        starts = np.cumsum(lengths) - lengths
+
+        totals = prev[candidates] + cost(candidates, np.repeat(mid, lengths))
+        minima = np.minimum.reduceat(totals, starts)
+        # First (leftmost) candidate reaching each minimum
+        first = np.where(totals == np.repeat(minima, lengths), np.arange(len(totals)), len(totals))
+        chosen = candidates[np.minimum.reduceat(first, starts)]
+        best[mid] = minima
+        split[mid] = chosen
+
+        left = lo <= mid - 1
+        right = mid + 1 <= hi
+        lo, hi, opt_lo, opt_hi = (
+            np.concatenate([lo[left], (mid + 1)[right]]),
+            np.concatenate([(mid - 1)[left], hi[right]]),
+            np.concatenate([opt_lo[left], chosen[right]]),
+            np.concatenate([chosen[left], opt_hi[right]]),
+        )
+    return best, split
+
+
+def jenks_breaks(values: np.ndarray, k: int) -> Dict:
+    """
+    Jenks natural breaks of values into (at most) k classes, with the
+    goodness of variance fit (1 - within-class / total squared deviations)
+    """
+    if len(values) == 0:
+        return {"breaks": [], "gvf": None}
+    distinct, counts = np.unique(values, return_counts=True)
+    distinct = distinct.astype(np.float64)
+    m = len(distinct)
+    if m <= k:
+        # Every distinct value is its own class
+        return {"breaks": [distinct[0].item()] + distinct.tolist(), "gvf": 1.0}
+
+    cost = _ClassCosts(distinct, counts.astype(np.float64))
+    j = np.arange(m + 1)
+    row = np.full(m + 1, np.inf)
+    row[1:] = cost(0, j[1:])
+    total = float(row[m])
+
+    splits = []
+    for c in range(2, k + 1):
+        row, split = _jenks_row(row, cost, c, m)
+        splits.append(split)
+
+    # Walk the splits back from the last class to find where each class ends
+    ends = [m]
+    for split in reversed(splits):
+        ends.append(int(split[ends[-1]]))
+    ends.reverse()
+    return {
+        "breaks": distinct[[0] + [end - 1 for end in ends]].tolist(),
+        "gvf": 1 - float(row[m]) / total if total > 0 else 1.0,
+    }
+
+
+def class_breaks(values: np.ndarray, k: int, bins: int) -> Dict:
+    """Quantile, equal-interval and Jenks breaks (k classes) and a histogram of values"""
+    if len(values) == 0:
+        return {
+            "count": 0, "min": None, "max": None,
+            "quantile": [], "equal_interval": [], "jenks": [], "jenks_gvf": None,
+            "histogram": {"counts": [], "edges": []},
+        }
+
+    low, high = values.min(), values.max()
+    jenks = jenks_breaks(values, k)
+    if low == high:
+        # One bin: NumPy would widen the range by 0.5, which large values can't resolve
+        counts, edges = np.array([len(values)]), np.array([low, high])
+    else:
+        counts, edges = np.histogram(values, bins=bins, range=(low, high))
+    return {
+        "count": int(len(values)),
+        "min": low.item(),
+        "max": high.item(),
+        "quantile": np.quantile(values, np.linspace(0, 1, k + 1)).tolist(),
+        "equal_interval": np.linspace(low, high, k + 1).tolist(),
+        "jenks": jenks["breaks"],
+        "jenks_gvf": jenks["gvf"],
+        "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+    }
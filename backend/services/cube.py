@@ -0,0 +1,171 @@
+"""
+WAC data across years, as an array cube per CBSA and job type.
+
+A YearCube is one int32 array of shape (years, WAC columns, block groups),
+aligned to the CBSA's current block-group index (the one its CBSAFrames and
+GeometryFrames share). Years are appended one at a time into spare capacity
+along the year axis, which doubles when it runs out, so adding a year never
+rereads or rebuilds the years already loaded and memory grows linearly with
+the number of years. Years are loaded when first requested.
+
+A block group missing from a year's WAC data had no jobs that year and is
+zero. GEOIDs of a year that aren't in the current index (e.g. block groups
+of an older census vintage) have nowhere to go; they are counted per year
+in ``unmatched`` and left out.
+
+Metric expressions evaluate over several years at once through CubeSlice,
+which presents the selected years side by side as one long frame.
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .expressions import Expression
+from .wac_store import JOB_TYPES, WAC_COLUMNS, read_wac_rows, wac_years
+
+
+class CubeSlice:
+    """
+    Some years of a YearCube, readable like a CBSAFrame (``len`` and
+    ``rows``): each column is the selected years' block groups concatenated
+    """
+
+    def __init__(self, data: np.ndarray, slots: List[int]):
+        self.data = data
+        self.slots = slots
+
+    def __len__(self):
+        return len(self.slots) * self.data.shape[2]
+
+    def rows(self, indices, positions=None) -> np.ndarray:
+        values = self.data[np.ix_(self.slots, indices)]
+        if positions is not None:
+            values = values[:, :, positions]
+        return values.transpose(1, 0, 2).reshape(len(indices), -1)
+
+
+class YearCube:
+    """WAC columns of one CBSA and job type by year, aligned to a block-group index"""
+
+    def __init__(self, cbsa_code: str, job_type: str, positions: Dict[str, int], available: List[int]):
+        self.cbsa_code = cbsa_code
+        self.job_type = job_type
+        self.positions = positions
+        # Years in the database, oldest first
+        self.available = available
+        # Loaded years and their slot on the year axis, in the order appended
+        self.slots: Dict[int, int] = {}
+        # Rows of each loaded year whose GEOID isn't in the index
+        self.unmatched: Dict[int, int] = {}
+        self._data = np.zeros((0, len(WAC_COLUMNS), len(positions)), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def years(self) -> List[int]:
+        return list(self.slots)
+
+    @property
+    def data(self) -> np.ndarray:
+        """(years, columns, block groups) of the loaded years, in the order appended"""
+        return self._data[:len(self.slots)]
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def append(self, year: int, wac_rows: list):
+        """Add one year from (bg_geoid, *WAC_COLUMNS) rows"""
+        if year in self.slots:
+            raise ValueError(f"{year} is already in the cube")
+        slot = len(self.slots)
+        if slot == len(self._data):
+            grown = np.zeros((max(1, 2 * slot),) + self._data.shape[1:], dtype=np.int32)
+            grown[:slot] = self._data[:slot]
+            self._data = grown
+
+        matched = [row for row in wac_rows if row[0] in self.positions]
+        if matched:
+            index = np.fromiter((self.positions[row[0]] for row in matched), dtype=np.int64, count=len(matched))
+            data = np.array([row[1:] for row in matched], dtype=np.float64)
+            self._data[slot][:, index] = np.nan_to_num(data, nan=0.0).astype(np.int32).T
+        self.unmatched[year] = len(wac_rows) - len(matched)
+        # Published last, so readers never see a half-written year
+        self.slots[year] = slot
+
+    def evaluate(self, expression: Expression, years: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A metric for every block group and for the CBSA total in each of
+        the given years: arrays of shape (years, block groups) and (years,)
+        """
+        data = self._data
+        slots = [self.slots[year] for year in years]
+        values = expression.evaluate(CubeSlice(data, slots)).reshape(len(slots), -1)
+        sums = data[slots].sum(axis=2, dtype=np.int64)[:, :, np.newaxis]
+        totals = expression.evaluate(CubeSlice(sums, list(range(len(slots)))))
+        return values, totals
+
+
+def change(before: np.ndarray, after: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Absolute and percent change, with NaN percent where before is zero, and
+    NaN (or inf) wherever a value is, e.g. an expression that divided by
+    zero, or the difference overflows int64
+    """
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        absolute = after - before
+        if absolute.dtype.kind in "iu":
+            # A difference overflowed when the operands' signs differ and the result's isn't after's
+            overflow = ((after ^ before) & (after ^ absolute)) < 0
+            if overflow.any():
+                absolute = np.where(overflow, np.nan, absolute)
+        percent = np.full(np.shape(absolute), np.nan)
+        np.divide(absolute * 100.0, before, out=percent, where=before != 0)
+    return absolute, percent
+
+
+class YearCubeStore:
+    """Process-wide cache of YearCubes, with years appended as they are first requested"""
+
+    def __init__(self, db_file: str, wac_store):
+        self.db_file = db_file
+        self.wac_store = wac_store
+        self._cubes: Dict[Tuple[str, str], YearCube] = {}
+        self._lock = threading.Lock()
+        if wac_store.generation is not None:
+            wac_store.generation.on_change(self.clear)
+
+    def get(self, cbsa_code: str, job_type: str = JOB_TYPES[0], years: Iterable[int] = ()) -> YearCube:
+        """
+        Return the cube for a CBSA and job type with the given years loaded
+        (those that are in the database)
+        """
+        years = list(years)
+        self.wac_store.check_generation()
+        cube = self._cubes.get((cbsa_code, job_type))
+        if cube is not None and all(year in cube.slots or year not in cube.available for year in years):
+            return cube
+
+        positions = self.wac_store.get(cbsa_code).positions
+        with self._lock:
+            conn = sqlite3.connect(self.db_file)
+            try:
+                cube = self._cubes.get((cbsa_code, job_type))
+                if cube is None:
+                    cube = YearCube(cbsa_code, job_type, positions, wac_years(conn, cbsa_code, job_type))
+                    self._cubes[(cbsa_code, job_type)] = cube
+                for year in years:
+                    if year in cube.available and year not in cube.slots:
+                        cube.append(year, read_wac_rows(conn, cbsa_code, job_type, year))
+            finally:
+                conn.close()
+        return cube
+
+    def clear(self):
+        """Drop all cubes"""
+        with self._lock:
+            self._cubes = {}
@@ -0,0 +1,87 @@
+"""
+Binary columnar export of a CBSA's WAC rows.
+
+Two formats, both built straight from the CBSAFrame arrays:
+
+* ``raw``: a uint32 little-endian header length, a JSON header describing the
+  columns, then one buffer per column (``bg_geoid`` as fixed-width ASCII,
+  the WAC columns as little-endian int32). Every buffer starts on an 8-byte
+  boundary, so clients can map them with ``numpy.frombuffer`` without copying.
+* ``arrow``: an Arrow IPC stream with one record batch (needs ``pyarrow``,
+  which is only imported on the first Arrow export to keep worker start-up fast).
+"""
+
+import importlib.util
+import json
+import struct
+from typing import Iterator
+
+import numpy as np
+
+from .wac_store import ALL_ROWS, WAC_COLUMNS, CBSAFrame
+
+# Optional dependency, checked without importing it
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+RAW_MEDIA_TYPE = "application/octet-stream"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ALIGNMENT = 8
+
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % ALIGNMENT)
+
+
+def wac_rows(frame: CBSAFrame):
+    """bg_geoids (fixed-width bytes) and (column, row) int32 values of the rows with WAC data"""
+    positions = np.flatnonzero(frame.has_wac)
+    geoids = frame.geoid_array[positions]
+    values = np.ascontiguousarray(frame.rows(ALL_ROWS, positions), dtype="<i4")
+    return geoids, values
+
+
+def raw_columns(frame: CBSAFrame) -> Iterator[bytes]:
+    """Yield the raw export: header length, JSON header, then the column buffers"""
+    geoids, values = wac_rows(frame)
+    rows = len(geoids)
+
+    buffers = [("bg_geoid", geoids.dtype.str, geoids.nbytes)]
+    buffers += [(name, values.dtype.str, values[i].nbytes) for i, name in enumerate(WAC_COLUMNS)]
+
+    columns = []
+    offset = 0
+    for name, dtype, size in buffers:
+        columns.append({"name": name, "dtype": dtype, "offset": offset, "length": size})
+        offset += size + len(_padding(size))
+
+    header = json.dumps({
+        "cbsa_code": frame.cbsa_code,
+        "job_type": frame.job_type,
+        "rows": rows,
+        # Offsets are relative to the end of the (padded) header
+        "columns": columns,
+    }, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-(4 + len(header)) % ALIGNMENT)
+
+    yield struct.pack("<I", len(header)) + header
+    yield geoids.tobytes() + _padding(geoids.nbytes)
+    for column in values:
+        yield column.tobytes() + _padding(column.nbytes)
+
+
+def arrow_stream(frame: CBSAFrame) -> bytes:
+    """Arrow IPC stream of the rows with WAC data (bg_geoid string + int32 columns)"""
+    if not HAS_PYARROW:
+        raise RuntimeError("pyarrow is not installed")
+    import pyarrow
+    import pyarrow.ipc
+
+    geoids, values = wac_rows(frame)
+    arrays = [pyarrow.array(geoids.astype(str))]
+    arrays += [pyarrow.array(column) for column in values]
+    batch = pyarrow.RecordBatch.from_arrays(arrays, names=["bg_geoid"] + WAC_COLUMNS)
+
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,191 @@
+"""
+Derived metrics written as arithmetic expressions over WAC columns.
+
+An expression such as ``ce03 / c000`` or ``cns09 + cns10 + cns12`` is parsed
+with Python's ``ast`` module and only a small whitelist of nodes is accepted:
+column names (case-insensitive), numeric literals, ``+ - * /``, unary minus,
+parentheses and ``min(...)``, ``max(...)``, ``abs(...)``. The tree is compiled
+once into nested closures over whole-column NumPy operations, so evaluating an
+expression is one vectorized pass per CBSA. Compiled expressions are cached by
+their text.
+
+Columns are read as int64, so expressions without division stay integers;
+division gives floats, with NaN/inf where the denominator is zero. Integer
+arithmetic that would overflow int64 gives NaN for the block groups where
+it does, instead of wrapping around.
+"""
+
+import ast
+import math
+from functools import lru_cache, reduce
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+from .wac_store import COLUMN_INDEX, CBSAFrame
+
+MAX_EXPRESSION_LENGTH = 256
+MAX_EXPRESSION_NODES = 64
+EXPRESSION_CACHE_SIZE = 256
+
+_INT64_MIN, _INT64_MAX = int(np.iinfo(np.int64).min), int(np.iinfo(np.int64).max)
+
+class _Scope:
+    """
+    The columns an expression is evaluated over, and the block groups where
+    its integer arithmetic overflowed int64 so far
+    """
+
+    def __init__(self, column: Callable[[int], np.ndarray], n: int):
+        # column(index) -> that column's values for the block groups being evaluated
+        self.column = column
+        self.overflow = np.zeros(n, dtype=bool)
+
+
+def _checked(op: Callable, overflows: Callable) -> Callable:
+    """
+    Wrap a NumPy operation so block groups whose integer result overflowed
+    int64 (per ``overflows(result, *args)``) are recorded in the scope
+    """
+    def apply(scope: _Scope, *args):
+        result = op(*args)
+        if np.result_type(result).kind in "iu":
+            scope.overflow |= overflows(result, *args)
+        return result
+    return apply
+
+
+def _unchecked(op: Callable) -> Callable:
+    return lambda scope, *args: op(*args)
+
+
+def _product_overflows(result, left, right):
+    # Without overflow the product divides back exactly; -1 * INT64_MIN wraps to itself
+    divisor = np.where(left == 0, 1, left)
+    return ((left != 0) & (result // divisor != right)) | ((left == -1) & (right == _INT64_MIN))
+
+
+_BINARY_OPS = {
+    # Sums overflow when both operands have the other sign from the result
+    ast.Add: _checked(np.add, lambda result, left, right: ((left ^ result) & (right ^ result)) < 0),
+    ast.Sub: _checked(np.subtract, lambda result, left, right: ((left ^ right) & (left ^ result)) < 0),
+    ast.Mult: _checked(np.multiply, _product_overflows),
+    ast.Div: _unchecked(np.true_divide),
+}
+
+_negative = _checked(np.negative, lambda result, value: value == _INT64_MIN)
+
+_FUNCTIONS = {
+    "min": _unchecked(lambda *args: reduce(np.minimum, args)),
+    "max": _unchecked(lambda *args: reduce(np.maximum, args)),
+    "abs": _checked(np.abs, lambda result, value: value == _INT64_MIN),
+}
+
+
+def _compile(node: ast.AST, columns: List[str]) -> Callable[[_Scope], Any]:
+    """Compile an expression node into a function of a _Scope"""
+    if isinstance(node, ast.Name):
+        name = node.id.lower()
+        if name not in COLUMN_INDEX:
+            raise ValueError(f"Unknown column: {node.id}")
+        if name not in columns:
+            columns.append(name)
+        index = COLUMN_INDEX[name]
+        return lambda scope: scope.column(index)
+
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Unsupported literal: {value!r}")
+        # Columns are int64; larger integers (and float literals that overflow to inf) can't be evaluated
+        if isinstance(value, int) and not _INT64_MIN <= value <= _INT64_MAX or not math.isfinite(value):
+            raise ValueError(f"Literal out of range: {ast.unparse(node)}")
+        # As a NumPy scalar, so constant subexpressions overflow like columns do
+        value = np.int64(value) if isinstance(value, int) else np.float64(value)
+        return lambda scope: value
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        op = _BINARY_OPS[type(node.op)]
+        left, right = _compile(node.left, columns), _compile(node.right, columns)
+        return lambda scope: op(scope, left(scope), right(scope))
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _compile(node.operand, columns)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        return lambda scope: _negative(scope, operand(scope))
+
+    if isinstance(node, ast.Call):
+        name = node.func.id.lower() if isinstance(node.func, ast.Name) else None
+        if name not in _FUNCTIONS or node.keywords:
+            raise ValueError(f"Unsupported function call: {ast.unparse(node.func)}")
+        if not node.args:
+            raise ValueError(f"{name}() needs an argument")
+        if name == "abs" and len(node.args) != 1:
+            raise ValueError("abs() takes one argument")
+        function = _FUNCTIONS[name]
+        args = [_compile(arg, columns) for arg in node.args]
+        return lambda scope: function(scope, *(arg(scope) for arg in args))
+
+    raise ValueError(f"Unsupported syntax: {ast.unparse(node)}")
+
+
+class Expression:
+    """A compiled metric expression"""
+
+    def __init__(self, text: str, columns: List[str], function: Callable[[_Scope], Any]):
+        # Normalized text (lowercase names, canonical spacing)
+        self.text = text
+        # Columns the expression reads, in order of first use
+        self.columns = columns
+        self._function = function
+
+    def evaluate(self, frame: CBSAFrame, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Value for each block group in a frame (or only those at ``positions``),
+        NaN where integer arithmetic overflowed
+        """
+        n = len(frame) if positions is None else len(positions)
+        loaded = {}
+
+        def column(index: int) -> np.ndarray:
+            if index not in loaded:
+                loaded[index] = frame.rows([index], positions)[0].astype(np.int64)
+            return loaded[index]
+
+        scope = _Scope(column, n)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            result = self._function(scope)
+        if scope.overflow.any():
+            return np.where(scope.overflow, np.nan, result)
+        # Constant expressions come back as scalars
+        return np.broadcast_to(result, (n,)) if np.ndim(result) == 0 else result
+
+
+class _Lowercase(ast.NodeTransformer):
+    def visit_Name(self, node):
+        return ast.Name(id=node.id.lower(), ctx=node.ctx)
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(text: str) -> Expression:
+    """Parse and compile a metric expression, raising ValueError if it is invalid"""
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}") from None
+    if sum(1 for _ in ast.walk(tree)) > MAX_EXPRESSION_NODES:
+        raise ValueError(f"Expression has more than {MAX_EXPRESSION_NODES} nodes")
+
+    columns: List[str] = []
+    function = _compile(tree.body, columns)
+    return Expression(ast.unparse(_Lowercase().visit(tree)), columns, function)
+
+
+def json_values(values: np.ndarray) -> list:
+    """Values as a JSON-ready list: integers stay integers, NaN and inf become None"""
+    if values.dtype.kind in "iub":
+        return values.tolist()
+    return [value if math.isfinite(value) else None for value in values.tolist()]
@@ -0,0 +1,48 @@
+"""
+The data generation load_data.py bumps after every load.
+
+Everything the API holds in memory that was built from the database (frames,
+geometries, year cubes, cached responses) registers a callback here and is
+dropped when the generation changes. Each store checks the generation on
+every ``get``, so no endpoint keeps serving data from before a reload,
+whether or not it goes through the response cache. The check is a
+primary-key read of a page that is always cached.
+"""
+
+import sqlite3
+import threading
+from typing import Callable, List, Optional
+
+
+class DataGeneration:
+    """The current data generation, with callbacks run when it changes"""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        # connect() -> a connection to read the metadata table with (not closed)
+        self._connect = connect
+        self._value: Optional[str] = None
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def on_change(self, callback: Callable[[], None]):
+        """Run callback (e.g. a store's clear) whenever the generation changes"""
+        self._callbacks.append(callback)
+
+    def current(self) -> str:
+        """Read the generation, running the callbacks first if it changed"""
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM metadata WHERE name = 'data_generation'"
+            ).fetchone()
+            generation = row[0] if row else "0"
+        except sqlite3.OperationalError:
+            # Database loaded before the metadata table existed
+            generation = "0"
+
+        if generation != self._value:
+            with self._lock:
+                if self._value is not None and generation != self._value:
+                    for callback in self._callbacks:
+                        callback()
+                self._value = generation
+        return generation
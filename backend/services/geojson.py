@@ -0,0 +1,152 @@
+"""
+Chunked GeoJSON FeatureCollection encoding.
+
+Features are assembled from pre-encoded JSON fragments (geometry bytes from
+GeometryFrame.geojson_bytes and a small per-request properties object) and
+yielded in chunks, so a response never holds a tree of feature dicts.
+
+The unfiltered block-group payload of each CBSA and detail level is also
+compressed at load time and stored in the ``payloads`` table.
+"""
+
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .compression import ENCODINGS, compress
+from .expressions import Expression, json_values
+from .geometry import GeometryFrame
+from .wac_store import COLUMN_INDEX, CBSAFrame
+
+FEATURES_HEAD = b'{"type":"FeatureCollection","features":['
+FEATURES_TAIL = b"]}"
+
+# Features per yielded chunk
+CHUNK_FEATURES = 512
+
+# /api/blockgroups/{cbsa_code} summary properties and their WAC columns
+SUMMARY_PROPERTIES = {
+    "total_jobs": "c000",
+    "ca01": "ca01", "ca02": "ca02", "ca03": "ca03",
+    "ce01": "ce01", "ce02": "ce02", "ce03": "ce03",
+}
+
+
+def encode_json(value: Any) -> bytes:
+    """Compact JSON encoding, byte-for-byte the same as FastAPI's JSONResponse"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def feature_collection(features: Iterable[Tuple[bytes, bytes]],
+                       chunk_features: int = CHUNK_FEATURES) -> Iterator[bytes]:
+    """Yield a FeatureCollection in chunks from (properties JSON, geometry JSON) pairs"""
+    yield FEATURES_HEAD
+    chunk = []
+    separator = b""
+    for properties, geometry in features:
+        chunk.append(b'{"type":"Feature","properties":' + properties + b',"geometry":' + geometry + b"}")
+        if len(chunk) >= chunk_features:
+            yield separator + b",".join(chunk)
+            separator = b","
+            chunk = []
+    if chunk:
+        yield separator + b",".join(chunk)
+    yield FEATURES_TAIL
+
+
+def blockgroup_features(frame: CBSAFrame, geometries: Optional[GeometryFrame],
+                        within: Optional[np.ndarray] = None) -> Iterator[bytes]:
+    """
+    Block groups with geometry and summary statistics (/api/blockgroups/{cbsa_code}),
+    optionally restricted to the sorted positions ``within``
+    """
+    positions = np.flatnonzero(frame.has_geometry)
+    if within is not None:
+        positions = np.intersect1d(positions, within, assume_unique=True)
+    if len(positions) == 0 or geometries is None:
+        return feature_collection([])
+
+    summary = frame.rows([COLUMN_INDEX[col] for col in SUMMARY_PROPERTIES.values()], positions).T.tolist()
+    encoded = geometries.geojson_bytes()
+
+    template = (
+        b'{"bg_geoid":%s,'
+        + b",".join(b'"%s":%%d' % name.encode() for name in SUMMARY_PROPERTIES)
+        + b"}"
+    )
+    features = (
+        (template % (encode_json(frame.bg_geoids[pos]), *row), encoded[pos])
+        for pos, row in zip(positions.tolist(), summary)
+        if encoded[pos] is not None
+    )
+    return feature_collection(features)
+
+
+def filtered_features(frame: CBSAFrame, geometries: GeometryFrame,
+                      employment_code: Optional[str], selected_cols: List[str],
+                      within: Optional[np.ndarray] = None,
+                      expression: Optional[Expression] = None) -> Iterator[bytes]:
+    """
+    Block groups matching every selected filter column (/api/blockgroups/filtered),
+    optionally restricted to the sorted positions ``within``. metric_value is
+    ``expression`` if given, else the filter metric of CBSAFrame.metric_values.
+    """
+    positions = frame.filter_positions(selected_cols, require_geometry=True)
+    if within is not None:
+        positions = np.intersect1d(positions, within, assume_unique=True)
+
+    if expression is None:
+        # Compute metric_value as the combination of all selected filters
+        # (minimum of the selected columns, or total jobs when unfiltered)
+        metric_values = frame.metric_values(selected_cols, positions).tolist()
+        metric_format = b"%d"
+    else:
+        metric_values = [encode_json(value) for value in json_values(expression.evaluate(frame, positions))]
+        metric_format = b"%s"
+    total_jobs = frame.column("c000")[positions].tolist()
+    encoded = geometries.geojson_bytes()
+
+    # Properties shared by every feature are encoded once per request
+    template = (
+        b'{"bg_geoid":%s,"metric_value":' + metric_format + b',"total_jobs":%d'
+        b',"filter_employment_code":' + encode_json(employment_code or None).replace(b"%", b"%%")
+        + b',"active_filters":' + encode_json(selected_cols).replace(b"%", b"%%") + b"}"
+    )
+    features = (
+        (template % (encode_json(frame.bg_geoids[pos]), metric_value, jobs), encoded[pos])
+        for pos, metric_value, jobs in zip(positions.tolist(), metric_values, total_jobs)
+        if encoded[pos] is not None
+    )
+    return feature_collection(features)
+
+
+def payload_rows(cbsa_code: str, frame: CBSAFrame,
+                 level_frames: Dict[int, GeometryFrame]) -> List[tuple]:
+    """
+    Rows for the payloads table: the /api/blockgroups/{cbsa_code} body at each
+    detail level, compressed with every available encoding at best quality.
+    Returns (cbsa_code, level, content_encoding, body) tuples.
+    """
+    rows = []
+    for level, geometries in level_frames.items():
+        body = b"".join(blockgroup_features(frame, geometries))
+        rows.extend(
+            (cbsa_code, level, encoding, compress(body, encoding, best=True))
+            for encoding in ENCODINGS
+        )
+    return rows
+
+
+def read_payload(conn: sqlite3.Connection, cbsa_code: str, level: int, encoding: str) -> Optional[bytes]:
+    """Return a precompressed block-group payload, or None if it was not built"""
+    try:
+        row = conn.execute(
+            "SELECT body FROM payloads WHERE cbsa_code = ? AND level = ? AND content_encoding = ?",
+            (cbsa_code, level, encoding)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # Database loaded before the payloads table existed
+        return None
+    return row[0] if row else None
@@ -0,0 +1,346 @@
+"""
+Parse-once geometry store for block-group polygons.
+
+WKT geometries are decoded a single time per CBSA into flat float64 coordinate
+arrays with ring, polygon and feature offsets (the same layout GeoArrow uses),
+and GeoJSON geometries are served from those arrays. POLYGON and MULTIPOLYGON
+are supported, including interior rings.
+"""
+
+import re
+import json
+import sqlite3
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .spatial import STRTree
+
+# A polygon is a list of rings (exterior first); each ring is an (n, 2) array
+Polygon = List[np.ndarray]
+
+_RING_SPLIT = re.compile(r"\)\s*,\s*\(")
+_POLYGON_SPLIT = re.compile(r"\)\s*\)\s*,\s*\(\s*\(")
+
+
+def _parse_ring(text: str) -> Optional[np.ndarray]:
+    """Parse 'x y, x y, ...' into an (n, 2) array, or None if it is not a ring"""
+    pairs = text.strip(" ()").split(",")
+    try:
+        values = np.array(" ".join(pairs).split(), dtype=np.float64)
+    except ValueError:
+        return None
+    if len(pairs) == 0 or len(values) % len(pairs) != 0:
+        return None
+    # Keep x/y and drop any Z/M ordinates
+    ring = values.reshape(len(pairs), -1)[:, :2]
+    if len(ring) < 3:
+        return None
+    if not np.array_equal(ring[0], ring[-1]):
+        ring = np.vstack([ring, ring[:1]])
+    return ring
+
+
+def _parse_polygon(text: str) -> Optional[Polygon]:
+    rings = []
+    for i, ring_text in enumerate(_RING_SPLIT.split(text.strip(" ()"))):
+        ring = _parse_ring(ring_text)
+        if ring is None:
+            if i == 0:
+                # Without a valid exterior the polygon is unusable
+                return None
+            continue
+        rings.append(ring)
+    return rings
+
+
+def parse_wkt(wkt_string: str) -> Optional[List[Polygon]]:
+    """Parse a WKT POLYGON or MULTIPOLYGON into a list of polygons"""
+    if not wkt_string:
+        return None
+    wkt_string = wkt_string.strip()
+    head = wkt_string[:12].upper()
+
+    if head.startswith("MULTIPOLYGON"):
+        body = wkt_string[12:]
+        parts = _POLYGON_SPLIT.split(body[body.find("("):].strip()[1:-1])
+    elif head.startswith("POLYGON"):
+        body = wkt_string[7:]
+        parts = [body[body.find("("):]]
+    else:
+        return None
+
+    if "(" not in body:
+        # e.g. POLYGON EMPTY
+        return None
+
+    polygons = [p for p in (_parse_polygon(part) for part in parts) if p]
+    return polygons or None
+
+
+_WKB_POLYGON = 3
+_WKB_MULTIPOLYGON = 6
+
+
+def _wkb_polygon(polygon: Polygon) -> bytes:
+    parts = [struct.pack("<BII", 1, _WKB_POLYGON, len(polygon))]
+    for ring in polygon:
+        parts.append(struct.pack("<I", len(ring)))
+        parts.append(np.ascontiguousarray(ring, dtype="<f8").tobytes())
+    return b"".join(parts)
+
+
+def to_wkb(polygons: List[Polygon]) -> bytes:
+    """Encode polygons as little-endian WKB (Polygon, or MultiPolygon if several)"""
+    if len(polygons) == 1:
+        return _wkb_polygon(polygons[0])
+    return struct.pack("<BII", 1, _WKB_MULTIPOLYGON, len(polygons)) + b"".join(
+        _wkb_polygon(polygon) for polygon in polygons
+    )
+
+
+def from_wkb(data: bytes) -> List[Polygon]:
+    """Decode little-endian WKB written by to_wkb into a list of polygons"""
+    def read_polygon(offset):
+        _, _, nrings = struct.unpack_from("<BII", data, offset)
+        offset += 9
+        rings = []
+        for _ in range(nrings):
+            (npoints,) = struct.unpack_from("<I", data, offset)
+            offset += 4
+            rings.append(np.frombuffer(data, dtype="<f8", count=npoints * 2, offset=offset).reshape(-1, 2))
+            offset += npoints * 16
+        return rings, offset
+
+    byte_order, geometry_type = struct.unpack_from("<BI", data, 0)
+    if byte_order != 1:
+        raise ValueError("Only little-endian WKB is supported")
+    if geometry_type == _WKB_POLYGON:
+        return [read_polygon(0)[0]]
+
+    (npolygons,) = struct.unpack_from("<I", data, 5)
+    offset = 9
+    polygons = []
+    for _ in range(npolygons):
+        polygon, offset = read_polygon(offset)
+        polygons.append(polygon)
+    return polygons
+
+
+def to_geojson(polygons: List[Polygon]) -> Optional[dict]:
+    """GeoJSON Polygon (or MultiPolygon if several) geometry, or None if empty"""
+    coordinates = [[ring.tolist() for ring in polygon] for polygon in polygons]
+    if not coordinates:
+        return None
+    if len(coordinates) == 1:
+        return {"type": "Polygon", "coordinates": coordinates[0]}
+    return {"type": "MultiPolygon", "coordinates": coordinates}
+
+
+def signed_area(ring: np.ndarray) -> float:
+    """Shoelace area of a closed ring; positive when counter-clockwise"""
+    x, y = ring[:, 0], ring[:, 1]
+    return float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])) / 2
+
+
+def ring_contains(ring: np.ndarray, x: float, y: float) -> bool:
+    """Even-odd ray casting test of a point against a closed ring"""
+    x0, y0 = ring[:-1, 0], ring[:-1, 1]
+    x1, y1 = ring[1:, 0], ring[1:, 1]
+    crosses = (y0 > y) != (y1 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+    return bool(np.count_nonzero(crosses & (x < x_at)) % 2)
+
+
+class GeometryFrame:
+    """Decoded geometries for one CBSA, aligned to the CBSAFrame block-group index"""
+
+    def __init__(self, coords: np.ndarray, ring_offsets: np.ndarray,
+                 polygon_offsets: np.ndarray, feature_offsets: np.ndarray):
+        # coords[ring_offsets[r]:ring_offsets[r + 1]] is ring r,
+        # rings polygon_offsets[p]:polygon_offsets[p + 1] make up polygon p,
+        # polygons feature_offsets[i]:feature_offsets[i + 1] make up block group i
+        self.coords = coords
+        self.ring_offsets = ring_offsets
+        self.polygon_offsets = polygon_offsets
+        self.feature_offsets = feature_offsets
+        self._encoded: Optional[List[Optional[bytes]]] = None
+        self._bounds: Optional[np.ndarray] = None
+        self._index: Optional[STRTree] = None
+
+    def __len__(self):
+        return len(self.feature_offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return (self.coords.nbytes + self.ring_offsets.nbytes
+                + self.polygon_offsets.nbytes + self.feature_offsets.nbytes)
+
+    def has_geometry(self, pos: int) -> bool:
+        return self.feature_offsets[pos + 1] > self.feature_offsets[pos]
+
+    def polygons(self, pos: int) -> List[Polygon]:
+        """Return the polygons for a block group as lists of coordinate arrays"""
+        ring_offsets = self.ring_offsets
+        polygon_offsets = self.polygon_offsets
+        polygons = []
+        for p in range(self.feature_offsets[pos], self.feature_offsets[pos + 1]):
+            polygons.append([
+                self.coords[ring_offsets[r]:ring_offsets[r + 1]]
+                for r in range(polygon_offsets[p], polygon_offsets[p + 1])
+            ])
+        return polygons
+
+    def geojson(self, pos: int) -> Optional[dict]:
+        """Return a GeoJSON Polygon/MultiPolygon geometry for a block group"""
+        return to_geojson(self.polygons(pos))
+
+    def contains(self, pos: int, x: float, y: float) -> bool:
+        """Whether a point lies inside a block group: in an exterior ring and none of its holes"""
+        return any(
+            ring_contains(polygon[0], x, y)
+            and not any(ring_contains(hole, x, y) for hole in polygon[1:])
+            for polygon in self.polygons(pos)
+        )
+
+    def bounds(self) -> np.ndarray:
+        """(minx, miny, maxx, maxy) of every block group, NaN where it has no geometry"""
+        if self._bounds is None:
+            starts = self.ring_offsets[self.polygon_offsets[self.feature_offsets[:-1]]]
+            ends = self.ring_offsets[self.polygon_offsets[self.feature_offsets[1:]]]
+            present = ends > starts
+            bounds = np.full((len(self), 4), np.nan)
+            if present.any():
+                # Features are stored in order, so each present feature's
+                # coordinates run up to the start of the next one
+                first = starts[present]
+                bounds[present, 0] = np.minimum.reduceat(self.coords[:, 0], first)
+                bounds[present, 1] = np.minimum.reduceat(self.coords[:, 1], first)
+                bounds[present, 2] = np.maximum.reduceat(self.coords[:, 0], first)
+                bounds[present, 3] = np.maximum.reduceat(self.coords[:, 1], first)
+            self._bounds = bounds
+        return self._bounds
+
+    def spatial_index(self) -> STRTree:
+        """R-tree of the block-group bounding boxes, keyed by position"""
+        if self._index is None:
+            positions = np.flatnonzero(np.diff(self.feature_offsets) > 0)
+            self._index = STRTree(positions, self.bounds()[positions])
+        return self._index
+
+    def geojson_bytes(self) -> List[Optional[bytes]]:
+        """
+        JSON-encoded GeoJSON geometry of every block group (None where missing),
+        encoded on first use and reused by every response
+        """
+        if self._encoded is None:
+            self._encoded = [
+                json.dumps(geometry, separators=(",", ":")).encode("utf-8") if geometry else None
+                for geometry in map(self.geojson, range(len(self)))
+            ]
+        return self._encoded
+
+
+def build_geometry_frame(parsed: List[Optional[List[Polygon]]]) -> GeometryFrame:
+    """Pack per-block-group polygon lists into flat arrays"""
+    rings = []
+    polygon_offsets = [0]
+    feature_offsets = [0]
+    for polygons in parsed:
+        for polygon in polygons or ():
+            rings.extend(polygon)
+            polygon_offsets.append(len(rings))
+        feature_offsets.append(len(polygon_offsets) - 1)
+
+    ring_offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+    if rings:
+        np.cumsum([len(ring) for ring in rings], out=ring_offsets[1:])
+        coords = np.concatenate(rings)
+    else:
+        coords = np.empty((0, 2), dtype=np.float64)
+
+    return GeometryFrame(
+        coords,
+        ring_offsets,
+        np.asarray(polygon_offsets, dtype=np.int64),
+        np.asarray(feature_offsets, dtype=np.int64),
+    )
+
+
+def load_geometry_frame(conn: sqlite3.Connection, cbsa_code: str,
+                        positions: Dict[str, int], level: int = 0) -> GeometryFrame:
+    """
+    Read and decode one CBSA's geometries, aligned to the given block-group
+    positions. Level 0 is the full-resolution WKT in ``blockgroups``; higher
+    levels are the simplified WKB geometries in ``blockgroup_lod``.
+    """
+    parsed: List[Optional[List[Polygon]]] = [None] * len(positions)
+    if level == 0:
+        cursor = conn.execute(
+            "SELECT bg_geoid, geometry FROM blockgroups WHERE cbsa_code = ?", (cbsa_code,)
+        )
+        decode = parse_wkt
+    else:
+        cursor = conn.execute(
+            "SELECT bg_geoid, geometry FROM blockgroup_lod WHERE cbsa_code = ? AND level = ?",
+            (cbsa_code, level)
+        )
+        decode = from_wkb
+
+    for bg_geoid, geometry in cursor:
+        pos = positions.get(bg_geoid)
+        if pos is None:
+            continue
+        try:
+            parsed[pos] = decode(geometry)
+        except Exception as e:
+            print(f"Error decoding geometry for {bg_geoid}: {e}")
+    return build_geometry_frame(parsed)
+
+
+class GeometryStore:
+    """Process-wide cache of GeometryFrames, decoded once per CBSA and detail level"""
+
+    def __init__(self, db_file: str, wac_store):
+        self.db_file = db_file
+        self.wac_store = wac_store
+        self._frames: Dict[Tuple[str, int], GeometryFrame] = {}
+        self._lock = threading.Lock()
+        if wac_store.generation is not None:
+            wac_store.generation.on_change(self.clear)
+
+    def get(self, cbsa_code: str, level: int = 0) -> GeometryFrame:
+        """Return the geometries for a CBSA at a detail level, decoding them on first touch"""
+        self.wac_store.check_generation()
+        frame = self._frames.get((cbsa_code, level))
+        if frame is not None:
+            return frame
+
+        positions = self.wac_store.get(cbsa_code).positions
+        with self._lock:
+            frame = self._frames.get((cbsa_code, level))
+            if frame is None:
+                conn = sqlite3.connect(self.db_file)
+                try:
+                    frame = load_geometry_frame(conn, cbsa_code, positions, level)
+                except sqlite3.OperationalError as e:
+                    # Database built before simplified levels existed
+                    if level == 0:
+                        raise
+                    print(f"Detail level {level} unavailable, using full resolution: {e}")
+                    frame = None
+                finally:
+                    conn.close()
+                if frame is not None:
+                    self._frames[(cbsa_code, level)] = frame
+        if frame is None:
+            frame = self._frames[(cbsa_code, level)] = self.get(cbsa_code)
+        return frame
+
+    def clear(self):
+        """Drop all decoded geometries"""
+        with self._lock:
+            self._frames = {}
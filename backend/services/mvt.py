@@ -0,0 +1,257 @@
+"""
+Minimal Mapbox Vector Tile (v2) encoder for polygon layers.
+
+Only what the block-group tiles need is implemented: Web Mercator projection,
+polygon clipping to a buffered tile, integer quantization with winding-order
+fixes, and protobuf encoding of a single layer with uint/string properties.
+See https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+EXTENT = 4096
+BUFFER = 64
+
+_MOVE_TO = 1
+_LINE_TO = 2
+_CLOSE_PATH = 7
+_POLYGON = 3
+
+_MAX_LAT = 85.0511287798066
+
+
+def project(coords: np.ndarray) -> np.ndarray:
+    """Project lon/lat to Web Mercator unit square coordinates (y down)"""
+    lon = coords[:, 0]
+    lat = np.radians(np.clip(coords[:, 1], -_MAX_LAT, _MAX_LAT))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / (2.0 * np.pi)
+    return np.column_stack([x, y])
+
+
+def _clip_edge(ring: np.ndarray, axis: int, bound: float, keep_above: bool) -> np.ndarray:
+    """One Sutherland-Hodgman pass against an axis-aligned line (vectorized)"""
+    if len(ring) == 0:
+        return ring
+    inside = ring[:, axis] >= bound if keep_above else ring[:, axis] <= bound
+    if inside.all():
+        return ring
+    if not inside.any():
+        return ring[:0]
+
+    prev = np.concatenate([ring[-1:], ring[:-1]])
+    prev_inside = np.concatenate([inside[-1:], inside[:-1]])
+    crossing = prev_inside != inside
+
+    delta = ring[:, axis] - prev[:, axis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(crossing, (bound - prev[:, axis]) / delta, 0.0)
+    intersection = prev + (ring - prev) * t[:, None]
+    intersection[:, axis] = bound
+
+    # For each edge emit [intersection if it crosses, current vertex if inside]
+    candidates = np.stack([intersection, ring], axis=1)
+    keep = np.stack([crossing, inside], axis=1)
+    return candidates[keep]
+
+
+def clip_ring(ring: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    """Clip an open ring to the square [lo, hi] x [lo, hi]"""
+    if len(ring) and ring.min() >= lo and ring.max() <= hi:
+        return ring
+    for axis in (0, 1):
+        ring = _clip_edge(ring, axis, lo, True)
+        ring = _clip_edge(ring, axis, hi, False)
+    return ring
+
+
+def _signed_area(ring: np.ndarray) -> float:
+    x = ring[:, 0]
+    y = ring[:, 1]
+    cross = np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]) + x[-1] * y[0] - x[0] * y[-1]
+    return float(cross) / 2.0
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def varint_lengths(values: np.ndarray) -> np.ndarray:
+    """Number of bytes each unsigned integer takes as a protobuf varint"""
+    nbytes = np.ones(values.size, dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+    return nbytes
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """Encode an array of unsigned integers as concatenated protobuf varints"""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return b""
+
+    nbytes = varint_lengths(values)
+    starts = np.zeros(values.size, dtype=np.int64)
+    np.cumsum(nbytes[:-1], out=starts[1:])
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+
+    rest = values.copy()
+    for k in range(int(nbytes.max())):
+        sel = nbytes > k
+        more = (nbytes[sel] > k + 1).astype(np.uint8) << 7
+        out[starts[sel] + k] = (rest[sel] & np.uint64(0x7F)).astype(np.uint8) | more
+        rest >>= np.uint64(7)
+    return out.tobytes()
+
+
+def _varint(value: int) -> bytes:
+    if value < len(_SMALL_VARINTS):
+        return _SMALL_VARINTS[value]
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+_SMALL_VARINTS = [
+    bytes([value]) if value < 0x80 else bytes([(value & 0x7F) | 0x80, value >> 7])
+    for value in range(1 << 14)
+]
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited field (wire type 2)"""
+    return _varint((number << 3) | 2) + _varint(len(payload)) + payload
+
+
+def _uint_field(number: int, value: int) -> bytes:
+    """Varint field (wire type 0)"""
+    return _varint(number << 3) + _varint(value)
+
+
+def polygon_commands(polygons: Iterable[List[np.ndarray]], origin: np.ndarray,
+                     scale: float) -> Optional[np.ndarray]:
+    """
+    Clip, quantize and encode polygons (unit-square coordinates) as MVT
+    geometry commands for the tile whose top-left corner is ``origin``.
+    Returns None when nothing survives clipping.
+    """
+    parts = []
+    cursor = np.zeros(2, dtype=np.int64)
+    for polygon in polygons:
+        for r, ring in enumerate(polygon):
+            # Rings arrive closed; work on the open ring
+            local = (ring[:-1] - origin) * scale
+            local = clip_ring(local, -BUFFER, EXTENT + BUFFER)
+            if len(local) < 3:
+                if r == 0:
+                    break
+                continue
+
+            points = np.rint(local).astype(np.int64)
+            keep = np.empty(len(points), dtype=bool)
+            keep[0] = np.any(points[0] != points[-1])
+            keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+            points = points[keep]
+            if len(points) < 3:
+                if r == 0:
+                    break
+                continue
+
+            area = _signed_area(points)
+            if area == 0:
+                if r == 0:
+                    break
+                continue
+            # Exterior rings have positive area in tile coordinates, holes negative
+            if (r == 0) != (area > 0):
+                points = points[::-1]
+
+            deltas = np.diff(np.vstack([cursor, points]), axis=0)
+            cursor = points[-1]
+            encoded = _zigzag(deltas).reshape(-1)
+            parts.append(np.array([(1 << 3) | _MOVE_TO], dtype=np.uint64))
+            parts.append(encoded[:2])
+            parts.append(np.array([((len(points) - 1) << 3) | _LINE_TO], dtype=np.uint64))
+            parts.append(encoded[2:])
+            parts.append(np.array([(1 << 3) | _CLOSE_PATH], dtype=np.uint64))
+
+    if not parts:
+        return None
+    return np.concatenate(parts)
+
+
+class LayerBuilder:
+    """Accumulates polygon features and encodes them as one MVT layer"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._ids: List[int] = []
+        self._tags: List[np.ndarray] = []
+        self._commands: List[np.ndarray] = []
+        self._keys: Dict[str, int] = {}
+        self._values: Dict[object, int] = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _tag(self, key: str, value) -> Tuple[int, int]:
+        key_index = self._keys.setdefault(key, len(self._keys))
+        value_index = self._values.setdefault((type(value), value), len(self._values))
+        return key_index, value_index
+
+    def add_feature(self, feature_id: int, properties: dict, commands: np.ndarray):
+        tags = []
+        for key, value in properties.items():
+            tags.extend(self._tag(key, value))
+        self._ids.append(feature_id)
+        self._tags.append(np.asarray(tags, dtype=np.uint64))
+        self._commands.append(commands)
+
+    @staticmethod
+    def _packed(arrays: List[np.ndarray]) -> Tuple[bytes, np.ndarray]:
+        """
+        Varint-encode all arrays in one vectorized pass; returns the buffer
+        and the byte offset where each array starts (plus the end offset).
+        """
+        values = np.concatenate(arrays)
+        value_offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in arrays], out=value_offsets[1:])
+        byte_offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(varint_lengths(values), out=byte_offsets[1:])
+        return encode_varints(values), byte_offsets[value_offsets]
+
+    def encode(self) -> bytes:
+        """Return a serialized Tile message containing this layer"""
+        layer = [_uint_field(15, 2), _field(1, self.name.encode())]
+
+        if self._ids:
+            tag_bytes, tag_offsets = self._packed(self._tags)
+            command_bytes, command_offsets = self._packed(self._commands)
+            tag_offsets = tag_offsets.tolist()
+            command_offsets = command_offsets.tolist()
+            for i, feature_id in enumerate(self._ids):
+                layer.append(_field(2, (
+                    _uint_field(1, feature_id)
+                    + _field(2, tag_bytes[tag_offsets[i]:tag_offsets[i + 1]])
+                    + _uint_field(3, _POLYGON)
+                    + _field(4, command_bytes[command_offsets[i]:command_offsets[i + 1]])
+                )))
+
+        layer.extend(_field(3, key.encode()) for key in self._keys)
+        for value_type, value in self._values:
+            if value_type is str:
+                layer.append(_field(4, _field(1, value.encode())))
+            else:
+                layer.append(_field(4, _uint_field(5, int(value))))
+        layer.append(_uint_field(5, EXTENT))
+        return _field(3, b"".join(layer))
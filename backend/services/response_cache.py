@@ -0,0 +1,99 @@
+"""
+Bounded LRU cache of serialized API responses.
+
+Entries are keyed on endpoint, CBSA and normalized parameters, capped by total
+body size, and carry a strong ETag for conditional GETs. The ETag is a hash of
+the key (which includes the data generation) salted per process, rather than
+of the body, so it is known before a body is built: a response streamed while
+it is being built carries the same ETag as the finished entry, and a request
+whose If-None-Match names it needs no build at all.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class CachedResponse:
+    """A serialized response body with its ETag"""
+
+    __slots__ = ("body", "etag", "media_type")
+
+    def __init__(self, body: bytes, media_type: str, etag: str):
+        self.body = body
+        self.media_type = media_type
+        self.etag = etag
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header value includes this entry's ETag"""
+        return etag_matches(self.etag, if_none_match)
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """True if an If-None-Match header value includes an ETag (or its weak form)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseCache:
+    """LRU cache of CachedResponses bounded by total body bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Responses can change between processes (code or database), so ETags don't outlive this one
+        self._etag_salt = os.urandom(16)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def etag(self, key: Hashable) -> str:
+        """The strong ETag of a key's body"""
+        return '"' + hashlib.blake2b(repr(key).encode(), digest_size=16, key=self._etag_salt).hexdigest() + '"'
+
+    def put(self, key: Hashable, body: bytes, media_type: str = "application/json") -> CachedResponse:
+        """Store a body (unless it alone exceeds the cap) and return its entry"""
+        entry = CachedResponse(body, media_type, self.etag(key))
+        if len(body) > self.max_bytes:
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
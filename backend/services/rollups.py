@@ -0,0 +1,216 @@
+"""
+Tract, county and CBSA rollups of block-group WAC data.
+
+A block-group GEOID is state (2) + county (3) + tract (6) + block group (1)
+digits; some source files drop the state's leading zero, so GEOIDs are
+zero-padded to 12 digits before taking prefixes. Every WAC column is summed
+per rollup, and the block-group polygons are dissolved into one geometry.
+
+Dissolving relies on neighbouring block groups sharing boundary vertices (as
+TIGER geometries do): with every ring oriented consistently, an edge shared
+by two block groups appears once in each direction and cancels out, and the
+remaining edges are traced into the outer and inner rings of the union.
+
+The dissolved geometry is stored already encoded as GeoJSON, so a request
+only encodes each rollup's properties and splices the stored bytes in.
+"""
+
+import sqlite3
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .geojson import encode_json, feature_collection
+from .geometry import GeometryFrame, Polygon, from_wkb, ring_contains, signed_area, to_geojson
+from .wac_store import WAC_COLUMNS, CBSAFrame
+
+# Rollup level -> length of the GEOID prefix that identifies it (None: whole CBSA)
+ROLLUP_LEVELS: Dict[str, Optional[int]] = {"tract": 11, "county": 5, "cbsa": None}
+
+GEOID_LENGTH = 12
+
+
+def rollup_keys(frame: CBSAFrame, level: str) -> List[str]:
+    """Rollup GEOID of each block group in a frame"""
+    prefix = ROLLUP_LEVELS[level]
+    if prefix is None:
+        return [frame.cbsa_code] * len(frame)
+    return [geoid.zfill(GEOID_LENGTH)[:prefix] for geoid in frame.bg_geoids]
+
+
+def _oriented_rings(polygons: List[List[Polygon]]) -> List[np.ndarray]:
+    """Open rings with exteriors counter-clockwise and holes clockwise"""
+    rings = []
+    for feature in polygons:
+        for polygon in feature:
+            for i, ring in enumerate(polygon):
+                area = signed_area(ring)
+                if area == 0:
+                    continue
+                if (area > 0) != (i == 0):
+                    ring = ring[::-1]
+                rings.append(ring[:-1])
+    return rings
+
+
+def _trace_rings(points: np.ndarray, src: np.ndarray, dst: np.ndarray) -> List[np.ndarray]:
+    """Follow directed boundary edges into closed rings"""
+    order = np.argsort(src, kind="stable")
+    src, dst = src[order], dst[order]
+    starts = np.searchsorted(src, np.arange(len(points) + 1))
+    used = np.zeros(len(src), dtype=bool)
+
+    rings = []
+    for first in range(len(src)):
+        if used[first]:
+            continue
+        origin = src[first]
+        ring = [origin]
+        edge = first
+        while True:
+            used[edge] = True
+            u, v = src[edge], dst[edge]
+            if v == origin:
+                break
+            ring.append(v)
+            candidates = [e for e in range(starts[v], starts[v + 1]) if not used[e]]
+            if not candidates:
+                ring = None
+                break
+            if len(candidates) > 1:
+                # Several boundaries meet at this vertex: take the sharpest
+                # right turn so touching polygons become separate rings
+                incoming = points[v] - points[u]
+                outgoing = points[dst[candidates]] - points[v]
+                angle = np.arctan2(
+                    incoming[0] * outgoing[:, 1] - incoming[1] * outgoing[:, 0],
+                    incoming @ outgoing.T,
+                )
+                edge = candidates[int(np.argmin(angle))]
+            else:
+                edge = candidates[0]
+        if ring is not None and len(ring) >= 3:
+            rings.append(points[ring + [origin]])
+    return rings
+
+
+def dissolve(polygons: List[List[Polygon]]) -> List[Polygon]:
+    """Union of block-group polygons that share boundary vertices"""
+    rings = _oriented_rings(polygons)
+    if not rings:
+        return []
+
+    coords = np.concatenate(rings)
+    points, vertex_ids = np.unique(coords, axis=0, return_inverse=True)
+    vertex_ids = vertex_ids.reshape(-1)
+
+    lengths = np.array([len(ring) for ring in rings])
+    ring_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    index = np.arange(len(coords))
+    following = np.where(index + 1 - ring_starts == np.repeat(lengths, lengths), ring_starts, index + 1)
+
+    src = vertex_ids.astype(np.int64)
+    dst = vertex_ids[following].astype(np.int64)
+    n = len(points)
+    forward = np.unique(src[src != dst] * n + dst[src != dst])
+    backward = (forward % n) * n + forward // n
+    boundary = forward[~np.isin(forward, backward)]
+
+    exteriors, holes = [], []
+    for ring in _trace_rings(points, boundary // n, boundary % n):
+        area = signed_area(ring)
+        if area > 0:
+            exteriors.append((area, ring))
+        elif area < 0:
+            holes.append(ring)
+
+    exteriors.sort(key=lambda item: item[0])
+    result = [[ring] for _, ring in exteriors]
+    for hole in holes:
+        x, y = hole[:-1].mean(axis=0)
+        for i, (_, exterior) in enumerate(exteriors):
+            # Smallest exterior that contains the hole
+            if ring_contains(exterior, x, y):
+                result[i].append(hole)
+                break
+    return result
+
+
+def rollup_sums(frame: CBSAFrame, level: str):
+    """Rollup GEOIDs, the rollup index of each block group and each rollup's WAC column sums"""
+    geoids, inverse = np.unique(rollup_keys(frame, level), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    sums = np.zeros((len(geoids), len(WAC_COLUMNS)), dtype=np.int64)
+    np.add.at(sums, inverse, frame.values.T)
+    return geoids, inverse, sums
+
+
+def rollup_rows(cbsa_code: str, frame: CBSAFrame, geometries: GeometryFrame) -> List[tuple]:
+    """
+    Rows for the rollups table at every level:
+    (cbsa_code, level, geoid, block_groups, *WAC column sums, GeoJSON geometry or None)
+    """
+    rows = []
+    for level in ROLLUP_LEVELS:
+        geoids, inverse, sums = rollup_sums(frame, level)
+        block_groups = np.bincount(inverse, minlength=len(geoids))
+
+        members = [[] for _ in geoids]
+        for pos in np.flatnonzero(frame.has_geometry).tolist():
+            members[inverse[pos]].append(pos)
+
+        for i, geoid in enumerate(geoids.tolist()):
+            polygons = dissolve([geometries.polygons(pos) for pos in members[i]])
+            rows.append((
+                cbsa_code, level, geoid, int(block_groups[i]),
+                *sums[i].tolist(),
+                encode_json(to_geojson(polygons)) if polygons else None,
+            ))
+    return rows
+
+
+def read_rollups(conn: sqlite3.Connection, cbsa_code: str, level: str) -> List[tuple]:
+    """(geoid, block_groups, *WAC column sums, GeoJSON geometry) rows of one rollup level"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(rollups)")}
+    if not columns:
+        # Database loaded before the rollups table existed
+        return []
+    # Rollups built before the geojson column only have WKB geometry
+    geojson = "geojson" if "geojson" in columns else "NULL"
+    rows = conn.execute(
+        f"SELECT geoid, block_groups, {', '.join(WAC_COLUMNS)}, {geojson}, geometry FROM rollups "
+        "WHERE cbsa_code = ? AND level = ? ORDER BY geoid",
+        (cbsa_code, level)
+    ).fetchall()
+    return [
+        (*row[:-2], row[-2] if row[-2] is not None or row[-1] is None else encode_json(to_geojson(from_wkb(row[-1]))))
+        for row in rows
+    ]
+
+
+def resum_rollups(rows: List[tuple], frame: CBSAFrame, level: str) -> List[tuple]:
+    """
+    read_rollups rows with the WAC sums taken from another job type's frame.
+    Job types share block groups, so the geometry and counts are reused.
+    """
+    geoids, _, sums = rollup_sums(frame, level)
+    index = {geoid: i for i, geoid in enumerate(geoids.tolist())}
+    return [
+        (geoid, block_groups, *sums[index[geoid]].tolist(), geometry)
+        for geoid, block_groups, *_, geometry in rows
+    ]
+
+
+def rollup_features(rows: List[tuple], level: str) -> Iterator[bytes]:
+    """Encode read_rollups rows as a GeoJSON FeatureCollection in chunks"""
+    features = []
+    for geoid, block_groups, *sums, geometry in rows:
+        properties = {
+            "geoid": geoid,
+            "level": level,
+            "block_groups": block_groups,
+            "total_jobs": sums[0],
+            **dict(zip(WAC_COLUMNS, sums)),
+        }
+        features.append((encode_json(properties), geometry if geometry is not None else b"null"))
+    return feature_collection(features)
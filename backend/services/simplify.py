@@ -0,0 +1,197 @@
+"""
+Topology-preserving simplification for zoom-dependent levels of detail.
+
+Block groups tile the plane, so neighbouring polygons share boundary vertices.
+Simplifying each polygon on its own would open slivers and overlaps along
+those shared edges. Instead, junction vertices (where the set of neighbouring
+vertices differs between polygons, as in TopoJSON) are always kept, and each
+arc between junctions is simplified with Douglas-Peucker. A shared arc is the
+same vertex sequence in both polygons (possibly reversed), so both sides get
+identical results. Rings that would collapse keep a minimal triangle of
+their most important vertices, so coarser levels never have more vertices.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .geometry import GeometryFrame, Polygon, build_geometry_frame, to_wkb
+
+# Detail level -> simplification tolerance in degrees. Level 0 is full resolution.
+LOD_TOLERANCES = {1: 0.0001, 2: 0.0004, 3: 0.0016, 4: 0.0064}
+
+
+def pixel_size(zoom: float) -> float:
+    """Width of one 256px web-map pixel in degrees of longitude at a zoom level"""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def select_lod_level(zoom: Optional[float] = None, tolerance: Optional[float] = None) -> int:
+    """
+    Pick the coarsest detail level whose tolerance does not exceed the requested
+    tolerance (or one pixel at the requested zoom). Returns 0 for full resolution.
+    """
+    if tolerance is None:
+        if zoom is None:
+            return 0
+        tolerance = pixel_size(zoom)
+
+    level = 0
+    for lod, lod_tolerance in sorted(LOD_TOLERANCES.items()):
+        if lod_tolerance <= tolerance:
+            level = lod
+    return level
+
+
+def _importance(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Run Douglas-Peucker down to ``tolerance`` and return, for each vertex, the
+    largest tolerance at which it is still kept (inf for the endpoints, 0 for
+    vertices dropped even at ``tolerance``). Keeping vertices with
+    importance > t reproduces Douglas-Peucker at any t >= ``tolerance``.
+    """
+    n = len(points)
+    importance = np.zeros(n)
+    importance[0] = importance[-1] = np.inf
+
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        a, b, parent = stack.pop()
+        if b - a < 2:
+            continue
+        p = points[a]
+        d = points[b] - p
+        seg = points[a + 1:b] - p
+        norm = np.hypot(d[0], d[1])
+        if norm == 0:
+            dist = np.hypot(seg[:, 0], seg[:, 1])
+        else:
+            dist = np.abs(d[0] * seg[:, 1] - d[1] * seg[:, 0]) / norm
+        i = int(np.argmax(dist))
+        if dist[i] <= tolerance:
+            continue
+        m = a + 1 + i
+        importance[m] = min(dist[i], parent)
+        stack.append((a, m, importance[m]))
+        stack.append((m, b, importance[m]))
+    return importance
+
+
+def _junctions(frame: GeometryFrame, open_index: np.ndarray, ring_ids: np.ndarray) -> np.ndarray:
+    """Flag open-ring vertices whose neighbours differ between occurrences"""
+    coords = frame.coords[open_index]
+    _, vertex_ids = np.unique(coords, axis=0, return_inverse=True)
+    vertex_ids = vertex_ids.reshape(-1)
+    n_vertices = int(vertex_ids.max()) + 1 if len(vertex_ids) else 0
+
+    # Previous/next vertex within each (open, cyclic) ring
+    positions = np.arange(len(open_index))
+    ring_start = np.searchsorted(ring_ids, ring_ids, side="left")
+    ring_end = np.searchsorted(ring_ids, ring_ids, side="right")
+    prev = np.where(positions == ring_start, ring_end - 1, positions - 1)
+    nxt = np.where(positions == ring_end - 1, ring_start, positions + 1)
+
+    a = vertex_ids[prev].astype(np.int64)
+    b = vertex_ids[nxt].astype(np.int64)
+    pair = np.minimum(a, b) * n_vertices + np.maximum(a, b)
+
+    lo = np.full(n_vertices, np.iinfo(np.int64).max)
+    hi = np.full(n_vertices, -1, dtype=np.int64)
+    np.minimum.at(lo, vertex_ids, pair)
+    np.maximum.at(hi, vertex_ids, pair)
+    return (lo != hi)[vertex_ids]
+
+
+def _simplify_ring(ring: np.ndarray, fixed: np.ndarray, tolerances: List[float]) -> List[np.ndarray]:
+    """Simplify one closed ring at each tolerance, keeping fixed vertices"""
+    open_ring = ring[:-1]
+    fixed_at = np.flatnonzero(fixed)
+    if len(fixed_at) == 0:
+        # No junctions: anchor on a start point that doesn't depend on ring
+        # orientation, plus the vertex farthest from it
+        first = int(np.lexsort((open_ring[:, 1], open_ring[:, 0]))[0])
+        far = int(np.argmax(np.hypot(*(open_ring - open_ring[first]).T)))
+        fixed_at = np.unique([first, far])
+
+    # Rotate so the ring starts on a fixed vertex, then close it
+    start = int(fixed_at[0])
+    rotated = np.concatenate([open_ring[start:], open_ring[:start], open_ring[start:start + 1]])
+    cuts = np.append((fixed_at - start) % len(open_ring), len(open_ring))
+    cuts = np.unique(cuts)
+
+    importance = np.zeros(len(rotated))
+    for a, b in zip(cuts[:-1], cuts[1:]):
+        importance[a:b + 1] = np.maximum(importance[a:b + 1], _importance(rotated[a:b + 1], min(tolerances)))
+
+    # Never collapse a ring: below 4 points, keep its three most important
+    # vertices. Every finer level keeps those too, so vertex counts only
+    # shrink from level to level.
+    minimal = np.sort(np.argsort(-importance[:-1], kind="stable")[:3])
+    minimal = np.concatenate([rotated[minimal], rotated[:1]]) if len(minimal) == 3 else ring
+
+    results = []
+    for tolerance in tolerances:
+        simplified = rotated[importance > tolerance]
+        results.append(simplified if len(simplified) >= 4 else minimal)
+    return results
+
+
+def simplify_levels(frame: GeometryFrame,
+                    tolerances: Dict[int, float] = LOD_TOLERANCES) -> Dict[int, List[Optional[List[Polygon]]]]:
+    """Simplify every feature in a frame at each level; returns per-level polygon lists"""
+    levels = sorted(tolerances)
+    n_rings = len(frame.ring_offsets) - 1
+    ring_lengths = np.diff(frame.ring_offsets)
+
+    # Open-ring view of the coordinates (drop each ring's closing vertex)
+    ring_ids = np.repeat(np.arange(n_rings), ring_lengths - 1)
+    open_index = np.arange(len(frame.coords))
+    open_index = open_index[~np.isin(open_index, frame.ring_offsets[1:] - 1)]
+    junctions = _junctions(frame, open_index, ring_ids)
+
+    open_offsets = np.zeros(n_rings + 1, dtype=np.int64)
+    np.cumsum(ring_lengths - 1, out=open_offsets[1:])
+
+    simplified_rings = [
+        _simplify_ring(
+            frame.coords[frame.ring_offsets[r]:frame.ring_offsets[r + 1]],
+            junctions[open_offsets[r]:open_offsets[r + 1]],
+            [tolerances[level] for level in levels],
+        )
+        for r in range(n_rings)
+    ]
+
+    result = {}
+    for i, level in enumerate(levels):
+        features = []
+        for pos in range(len(frame)):
+            polygons = []
+            for p in range(frame.feature_offsets[pos], frame.feature_offsets[pos + 1]):
+                polygons.append([
+                    simplified_rings[r][i]
+                    for r in range(frame.polygon_offsets[p], frame.polygon_offsets[p + 1])
+                ])
+            features.append(polygons or None)
+        result[level] = features
+    return result
+
+
+def simplified_frames(geometries: GeometryFrame,
+                      tolerances: Dict[int, float] = LOD_TOLERANCES) -> Dict[int, GeometryFrame]:
+    """Simplified GeometryFrames for each detail level, aligned like the input"""
+    return {
+        level: build_geometry_frame(features)
+        for level, features in simplify_levels(geometries, tolerances).items()
+    }
+
+
+def lod_rows(cbsa_code: str, bg_geoids: List[str],
+             level_frames: Dict[int, GeometryFrame]) -> List[tuple]:
+    """Rows for the blockgroup_lod table: (cbsa_code, bg_geoid, level, WKB geometry)"""
+    return [
+        (cbsa_code, bg_geoids[pos], level, to_wkb(frame.polygons(pos)))
+        for level, frame in level_frames.items()
+        if level > 0
+        for pos in range(len(frame))
+        if frame.has_geometry(pos)
+    ]
@@ -0,0 +1,45 @@
+"""
+Single-flight coalescing of identical concurrent work.
+
+When many clients ask for the same uncached response at once (a dashboard
+opening on one CBSA), only the first request computes it; the others await
+the same task and get its result, or its exception. The task is shielded
+from the requests awaiting it, so a client disconnecting doesn't cancel the
+work for everyone else. Keys are dropped as soon as their task finishes, so
+later requests start afresh (normally finding the result in the response
+cache).
+
+Flights live on the event loop and must only be used from it.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """In-flight tasks by key"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def start(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> "Tuple[asyncio.Task[Any], bool]":
+        """Return the in-flight task for key, starting call() if there is none, and whether this call started it"""
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task, False
+        task = asyncio.ensure_future(call())
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        self.started += 1
+        return task, True
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call() once per key, however many callers ask while it runs"""
+        task, _ = self.start(key, call)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._tasks), "started": self.started, "coalesced": self.coalesced}
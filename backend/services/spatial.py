@@ -0,0 +1,92 @@
+"""
+Static R-tree over block-group bounding boxes, packed with Sort-Tile-Recursive.
+
+Items are sorted into vertical slices by x, each slice by y, and packed into
+nodes of NODE_CAPACITY; the node boxes are packed the same way up to a single
+root. Queries walk the tree one level at a time with array operations.
+"""
+
+from typing import List
+
+import numpy as np
+
+NODE_CAPACITY = 16
+
+
+def _str_order(boxes: np.ndarray, capacity: int) -> np.ndarray:
+    """Sort-Tile-Recursive order of boxes: x slices, then y within each slice"""
+    n = len(boxes)
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    n_nodes = -(-n // capacity)
+    slice_size = capacity * int(np.ceil(np.sqrt(n_nodes)))
+    by_x = np.argsort(centers[:, 0], kind="stable")
+    slices = np.arange(n) // slice_size
+    # Within each x slice, order by y
+    return by_x[np.lexsort((centers[by_x, 1], slices))]
+
+
+def _intersects(boxes: np.ndarray, bbox: np.ndarray) -> np.ndarray:
+    return (
+        (boxes[:, 0] <= bbox[2]) & (boxes[:, 2] >= bbox[0])
+        & (boxes[:, 1] <= bbox[3]) & (boxes[:, 3] >= bbox[1])
+    )
+
+
+def _expand(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate the index ranges [starts[i], ends[i])"""
+    lengths = ends - starts
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+def _pack(boxes: np.ndarray, capacity: int):
+    """Group consecutive boxes into nodes: (node boxes, child starts, child ends)"""
+    starts = np.arange(0, len(boxes), capacity)
+    ends = np.minimum(starts + capacity, len(boxes))
+    nodes = np.column_stack([
+        np.minimum.reduceat(boxes[:, 0], starts),
+        np.minimum.reduceat(boxes[:, 1], starts),
+        np.maximum.reduceat(boxes[:, 2], starts),
+        np.maximum.reduceat(boxes[:, 3], starts),
+    ])
+    return nodes, starts, ends
+
+
+class STRTree:
+    """R-tree of (minx, miny, maxx, maxy) boxes identified by integer ids"""
+
+    def __init__(self, ids: np.ndarray, boxes: np.ndarray, capacity: int = NODE_CAPACITY):
+        order = _str_order(boxes, capacity)
+        self.ids = np.asarray(ids)[order]
+        self.boxes = boxes[order]
+
+        # Levels from the leaves' parents up to the root: node boxes and the
+        # range of children each covers in the level below (or in the items)
+        self.levels: List[tuple] = []
+        if len(self.boxes):
+            nodes, starts, ends = _pack(self.boxes, capacity)
+            while True:
+                if len(nodes) > capacity:
+                    # STR-order this level before packing its parents
+                    order = _str_order(nodes, capacity)
+                    nodes, starts, ends = nodes[order], starts[order], ends[order]
+                self.levels.append((nodes, starts, ends))
+                if len(nodes) == 1:
+                    break
+                nodes, starts, ends = _pack(nodes, capacity)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, bbox) -> np.ndarray:
+        """Sorted ids of the boxes that intersect bbox (minx, miny, maxx, maxy)"""
+        bbox = np.asarray(bbox, dtype=np.float64)
+        if not self.levels:
+            return np.empty(0, dtype=self.ids.dtype)
+
+        candidates = np.arange(len(self.levels[-1][0]))
+        for nodes, starts, ends in reversed(self.levels):
+            candidates = candidates[_intersects(nodes[candidates], bbox)]
+            candidates = _expand(starts[candidates], ends[candidates])
+
+        hits = candidates[_intersects(self.boxes[candidates], bbox)]
+        return np.sort(self.ids[hits])
@@ -0,0 +1,52 @@
+"""
+Summary statistics of one WAC column across a CBSA's block groups.
+
+Everything is computed with whole-array NumPy reductions (which release the
+GIL), so several CBSAs can be summarized in parallel threads.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+from .wac_store import COLUMN_INDEX, CBSAFrame
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+def summarize(frame: CBSAFrame, metric: str, sectors: List[str]) -> Dict:
+    """
+    Totals, distribution and quantiles of ``metric`` over the block groups
+    with WAC data, plus each sector column's share of the sector total.
+    """
+    values = frame.column(metric)[frame.has_wac]
+    total_jobs = int(frame.totals[COLUMN_INDEX["c000"]])
+    metric_total = int(frame.totals[COLUMN_INDEX[metric]])
+
+    sector_jobs = np.array([frame.totals[COLUMN_INDEX[col]] for col in sectors], dtype=np.int64)
+    sector_total = int(sector_jobs.sum())
+
+    summary = {
+        "block_groups": int(len(values)),
+        "nonzero_block_groups": int(np.count_nonzero(values)),
+        "total_jobs": total_jobs,
+        "metric_total": metric_total,
+        "metric_share": metric_total / total_jobs if total_jobs else 0.0,
+        "sector_shares": {
+            col.upper(): (int(jobs) / sector_total if sector_total else 0.0)
+            for col, jobs in zip(sectors, sector_jobs)
+        },
+    }
+    if len(values):
+        summary.update({
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": int(values.min()),
+            "max": int(values.max()),
+            "quantiles": {
+                str(q): float(v) for q, v in zip(QUANTILES, np.quantile(values, QUANTILES))
+            },
+        })
+    else:
+        summary.update({"mean": None, "std": None, "min": None, "max": None, "quantiles": None})
+    return summary
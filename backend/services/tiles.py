@@ -0,0 +1,105 @@
+"""
+Precomputed vector tile pyramid per CBSA.
+
+Tiles are built at load time from the ``blockgroups`` and ``wac_data`` tables,
+using the simplified ``blockgroup_lod`` geometry that matches each zoom, and
+stored gzip-compressed in the ``tiles`` table. That table follows the MBTiles
+layout (``zoom_level``, ``tile_column``, ``tile_row`` with a TMS row) plus a
+``cbsa_code`` column.
+"""
+
+import gzip
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .geometry import GeometryFrame
+from .mvt import BUFFER, EXTENT, LayerBuilder, polygon_commands, project
+from .simplify import select_lod_level
+from .wac_store import COLUMN_INDEX, CBSAFrame
+
+TILE_MIN_ZOOM = 5
+TILE_MAX_ZOOM = 12
+LAYER_NAME = "blockgroups"
+
+# Same attributes as the /api/blockgroups/{cbsa_code} GeoJSON properties
+TILE_PROPERTIES = {
+    "total_jobs": "c000",
+    "ca01": "ca01", "ca02": "ca02", "ca03": "ca03",
+    "ce01": "ce01", "ce02": "ce02", "ce03": "ce03",
+}
+
+
+def build_tile_pyramid(frame: CBSAFrame, level_frames: Dict[int, GeometryFrame],
+                       min_zoom: int = TILE_MIN_ZOOM, max_zoom: int = TILE_MAX_ZOOM) -> List[tuple]:
+    """
+    Encode the tile pyramid for one CBSA. ``level_frames`` maps detail level to
+    geometries (level 0 is full resolution); each zoom uses the matching level.
+    Returns rows for the tiles table: (zoom_level, tile_column, tile_row, tile_data).
+    """
+    values = frame.rows([COLUMN_INDEX[col] for col in TILE_PROPERTIES.values()]).T.tolist()
+    properties = [
+        {"bg_geoid": bg_geoid, **dict(zip(TILE_PROPERTIES, row))}
+        for bg_geoid, row in zip(frame.bg_geoids, values)
+    ]
+
+    levels = {}
+
+    def features_at(level):
+        """Projected polygons and bounds of the features at a detail level"""
+        if level not in level_frames:
+            level = 0
+        if level not in levels:
+            geometries = level_frames[level]
+            projected = GeometryFrame(
+                project(geometries.coords),
+                geometries.ring_offsets,
+                geometries.polygon_offsets,
+                geometries.feature_offsets,
+            )
+            positions = np.flatnonzero(np.diff(geometries.feature_offsets) > 0)
+            levels[level] = (
+                positions,
+                projected.bounds()[positions],
+                [projected.polygons(pos) for pos in positions],
+            )
+        return levels[level]
+
+    rows = []
+    for z in range(min_zoom, max_zoom + 1):
+        positions, bounds, polygons = features_at(select_lod_level(zoom=z))
+        n = 2 ** z
+        pad = BUFFER / EXTENT
+        tile_ranges = np.column_stack([
+            np.floor(bounds[:, 0] * n - pad), np.floor(bounds[:, 1] * n - pad),
+            np.floor(bounds[:, 2] * n + pad), np.floor(bounds[:, 3] * n + pad),
+        ]).clip(0, n - 1).astype(np.int64)
+
+        layers: Dict[Tuple[int, int], LayerBuilder] = {}
+        for pos, feature_polygons, (x0, y0, x1, y1) in zip(positions.tolist(), polygons, tile_ranges.tolist()):
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    commands = polygon_commands(feature_polygons, np.array([x / n, y / n]), n * EXTENT)
+                    if commands is None:
+                        continue
+                    layer = layers.get((x, y))
+                    if layer is None:
+                        layer = layers[(x, y)] = LayerBuilder(LAYER_NAME)
+                    layer.add_feature(pos, properties[pos], commands)
+
+        rows.extend(
+            (z, x, n - 1 - y, gzip.compress(layer.encode(), mtime=0))
+            for (x, y), layer in layers.items()
+        )
+    return rows
+
+
+def read_tile(conn: sqlite3.Connection, cbsa_code: str, z: int, x: int, y: int) -> Optional[bytes]:
+    """Return the gzip-compressed tile for XYZ coordinates, or None"""
+    row = conn.execute(
+        "SELECT tile_data FROM tiles "
+        "WHERE cbsa_code = ? AND zoom_level = ? AND tile_column = ? AND tile_row = ?",
+        (cbsa_code, z, x, (2 ** z) - 1 - y)
+    ).fetchone()
+    return row[0] if row else None
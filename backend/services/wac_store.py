@@ -0,0 +1,423 @@
+"""
+In-memory columnar store for WAC employment data.
+
+Each CBSA is loaded once from the ``wac_data`` table into a 2-D NumPy integer
+array (one row per WAC column) aligned to a sorted block-group index, so that
+filter masks and metric values are computed as whole-column operations instead
+of per-row Python work. Each column also gets a compressed bitmap of its
+nonzero block groups, so compound "column > 0" filters resolve by intersection.
+
+WAC data comes in job types (all jobs, primary jobs). Every job type of a CBSA
+shares one block-group index, so they all line up with the same geometry.
+Only "all" is held as int32; the others are stored as their difference from
+it in the narrowest integer type that fits (uint16 for LODES primary jobs)
+and only the columns a request reads are reconstructed. On disk they are
+kept the same way: one zlib-compressed delta matrix per CBSA, year and job
+type in ``wac_deltas``, instead of a second full set of ``wac_data`` rows.
+
+Frames hold a CBSA's current (latest) year; every loaded year is available
+through the year cubes in ``cube.py``.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .bitmap import Bitmap
+from .generation import DataGeneration
+
+WAC_COLUMNS = [
+    "c000", "ca01", "ca02", "ca03", "ce01", "ce02", "ce03",
+    "cns01", "cns02", "cns03", "cns04", "cns05", "cns06", "cns07",
+    "cns08", "cns09", "cns10", "cns11", "cns12", "cns13", "cns14",
+    "cns15", "cns16", "cns17", "cns18", "cns19", "cns20",
+    "cr01", "cr02", "cr03", "cr04", "cr05", "cr07",
+    "ct01", "ct02",
+    "cd01", "cd02", "cd03", "cd04",
+    "cs01", "cs02",
+    "cfa01", "cfa02", "cfa03", "cfa04", "cfa05",
+    "cfs01", "cfs02", "cfs03", "cfs04", "cfs05",
+]
+
+COLUMN_INDEX = {col: i for i, col in enumerate(WAC_COLUMNS)}
+
+# WAC job types; the first is the base the others are stored against
+JOB_TYPES = ["all", "primary"]
+
+ALL_ROWS = list(range(len(WAC_COLUMNS)))
+
+# Filter combinations whose column sums each CBSAFrame keeps
+COLUMN_SUMS_CACHE_SIZE = 256
+
+
+class CBSAFrame:
+    """WAC columns for one CBSA and job type, aligned to a sorted block-group index"""
+
+    def __init__(self, cbsa_code: str, bg_geoids: List[str], values: np.ndarray,
+                 has_wac: np.ndarray, has_geometry: np.ndarray, job_type: str = JOB_TYPES[0]):
+        self.cbsa_code = cbsa_code
+        self.job_type = job_type
+        self.bg_geoids = bg_geoids
+        self.positions = {geoid: i for i, geoid in enumerate(bg_geoids)}
+        # The same GEOIDs as a fixed-width bytes array, for vectorized gathers
+        self.geoid_array = np.array(bg_geoids, dtype=np.bytes_)
+        # Identifies this block-group ordering, for clients that cache it
+        self.version = hashlib.blake2b("\n".join(bg_geoids).encode(), digest_size=8).hexdigest()
+        self.has_geometry = has_geometry
+        self.geometry_bitmap = Bitmap.from_mask(has_geometry)
+        # Shape (len(WAC_COLUMNS), len(bg_geoids)); each column is contiguous
+        self._values = values
+        self._index_values(values, has_wac)
+
+    def _index_values(self, values: np.ndarray, has_wac: np.ndarray):
+        self.has_wac = has_wac
+        # Block groups with WAC data where each column is > 0
+        self.nonzero = [Bitmap.from_mask(has_wac & (column > 0)) for column in values]
+        # Per-column totals, and totals over the block groups matching a filter set
+        self.totals = values.sum(axis=1, dtype=np.int64)
+        self._column_sums: "OrderedDict[Tuple[str, ...], Tuple[int, np.ndarray]]" = OrderedDict()
+        self._column_sums_lock = threading.Lock()
+
+    @property
+    def values(self) -> np.ndarray:
+        """Every WAC column, shape (len(WAC_COLUMNS), len(bg_geoids))"""
+        return self._values
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the WAC values as stored"""
+        return self._values.nbytes
+
+    def rows(self, indices: List[int], positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Values of the WAC columns at ``indices``, for every block group or only those at ``positions``"""
+        if positions is None:
+            return self.values[indices]
+        return self.values[np.ix_(indices, positions)]
+
+    def __len__(self):
+        return len(self.bg_geoids)
+
+    def column(self, name: str) -> np.ndarray:
+        """Return the array for a (lowercase) WAC column"""
+        return self.rows([COLUMN_INDEX[name]])[0]
+
+    def filter_positions(self, columns: List[str], require_geometry: bool = False) -> np.ndarray:
+        """
+        Sorted positions of block groups with WAC data where every selected
+        column is > 0 (and, optionally, with geometry)
+        """
+        bitmaps = [self.nonzero[COLUMN_INDEX[col]] for col in columns]
+        if not bitmaps:
+            # c000 > 0 does not hold for every block group with WAC data
+            return np.flatnonzero(self.has_wac & self.has_geometry if require_geometry else self.has_wac)
+        if require_geometry:
+            bitmaps.append(self.geometry_bitmap)
+        return Bitmap.intersect(bitmaps).positions()
+
+    def filter_mask(self, columns: List[str]) -> np.ndarray:
+        """Block groups with WAC data where every selected column is > 0"""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.filter_positions(columns)] = True
+        return mask
+
+    def column_sums(self, columns: List[str]) -> Tuple[int, np.ndarray]:
+        """
+        Number of block groups matching every selected filter column and the
+        sum of each WAC column over them. Unfiltered totals are precomputed;
+        filtered sums are cached per filter set (filter order doesn't matter).
+        """
+        if not columns:
+            return int(self.has_wac.sum()), self.totals
+
+        key = tuple(sorted(set(columns)))
+        with self._column_sums_lock:
+            cached = self._column_sums.get(key)
+            if cached is not None:
+                self._column_sums.move_to_end(key)
+                return cached
+
+        positions = self.filter_positions(list(key))
+        result = (len(positions), self.rows(ALL_ROWS, positions).sum(axis=1, dtype=np.int64))
+        with self._column_sums_lock:
+            self._column_sums[key] = result
+            if len(self._column_sums) > COLUMN_SUMS_CACHE_SIZE:
+                self._column_sums.popitem(last=False)
+        return result
+
+    def metric_values(self, columns: List[str], positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Metric value for each block group (or only those at ``positions``)
+        given the selected filter columns.
+
+        Since the WAC data provides marginal counts (no cross-tab), the
+        intersection is conservatively approximated by the minimum of the
+        selected columns. With no filters the metric is total jobs (c000).
+        """
+        indices = [COLUMN_INDEX[col] for col in columns] or [COLUMN_INDEX["c000"]]
+        return self.rows(indices, positions).min(axis=0)
+
+
+class DeltaFrame(CBSAFrame):
+    """
+    Another job type's WAC columns for the same block groups as a base frame,
+    stored as the base values minus these values in a narrow integer type
+    """
+
+    def __init__(self, base: CBSAFrame, job_type: str, values: np.ndarray, has_wac: np.ndarray):
+        # Share the block-group index (and so the geometry) with the base frame
+        self.base = base
+        self.cbsa_code = base.cbsa_code
+        self.job_type = job_type
+        self.bg_geoids = base.bg_geoids
+        self.positions = base.positions
+        self.geoid_array = base.geoid_array
+        self.version = base.version
+        self.has_geometry = base.has_geometry
+        self.geometry_bitmap = base.geometry_bitmap
+
+        delta = base.values.astype(np.int64) - values
+        self.delta = delta.astype(narrowest_dtype(delta))
+        self._index_values(values, has_wac)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self.rows(ALL_ROWS)
+
+    @property
+    def nbytes(self) -> int:
+        return self.delta.nbytes
+
+    def rows(self, indices: List[int], positions: Optional[np.ndarray] = None) -> np.ndarray:
+        base = self.base.rows(indices, positions)
+        delta = self.delta[indices] if positions is None else self.delta[np.ix_(indices, positions)]
+        return (base - delta).astype(np.int32, copy=False)
+
+
+def narrowest_dtype(values: np.ndarray) -> np.dtype:
+    """Smallest integer type that holds every value"""
+    return np.result_type(np.min_scalar_type(values.min(initial=0)), np.min_scalar_type(values.max(initial=0)))
+
+
+def _row_values(rows: list) -> np.ndarray:
+    """WAC columns of (bg_geoid, *WAC_COLUMNS) rows as an int64 array, one row per column"""
+    if not rows:
+        return np.zeros((len(WAC_COLUMNS), 0), dtype=np.int64)
+    data = np.array([row[1:] for row in rows], dtype=np.float64)
+    return np.nan_to_num(data, nan=0.0).astype(np.int64).T
+
+
+def _base_values(base_rows: list, bg_geoids: List[str]) -> np.ndarray:
+    """Base rows' WAC columns aligned to bg_geoids (zero where the base has no row)"""
+    index = {row[0]: i for i, row in enumerate(base_rows)}
+    found = np.fromiter((index.get(geoid, -1) for geoid in bg_geoids), dtype=np.int64, count=len(bg_geoids))
+    values = np.zeros((len(WAC_COLUMNS), len(bg_geoids)), dtype=np.int64)
+    values[:, found >= 0] = _row_values(base_rows)[:, found[found >= 0]]
+    return values
+
+
+def encode_wac_deltas(base_rows: list, rows: list) -> Tuple[bytes, str, bytes]:
+    """
+    Encode one job type's WAC rows as the base (all jobs) rows of the same
+    CBSA and year minus them: (GEOIDs, NumPy dtype, deltas), both BLOBs
+    zlib-compressed, for the ``wac_deltas`` table
+    """
+    bg_geoids = [row[0] for row in rows]
+    delta = _base_values(base_rows, bg_geoids) - _row_values(rows)
+    dtype = narrowest_dtype(delta)
+    return (
+        zlib.compress("\n".join(bg_geoids).encode()),
+        dtype.str,
+        zlib.compress(delta.astype(dtype).tobytes()),
+    )
+
+
+def decode_wac_deltas(base_rows: list, bg_geoids: bytes, dtype: str, deltas: bytes) -> list:
+    """(bg_geoid, *WAC_COLUMNS) rows back from a ``wac_deltas`` record and the base rows"""
+    geoids = zlib.decompress(bg_geoids).decode().split("\n") if bg_geoids else []
+    delta = np.frombuffer(zlib.decompress(deltas), dtype=dtype).reshape(len(WAC_COLUMNS), len(geoids))
+    values = _base_values(base_rows, geoids) - delta
+    return [(geoid, *row) for geoid, row in zip(geoids, values.T.tolist())]
+
+
+def _wac_columns(conn: sqlite3.Connection) -> set:
+    return {row[1] for row in conn.execute("PRAGMA table_info(wac_data)")}
+
+
+def _has_wac_deltas(conn: sqlite3.Connection) -> bool:
+    """Whether the database has the wac_deltas table (older ones keep every job type in wac_data)"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'wac_deltas'").fetchone() is not None
+
+
+def wac_years(conn: sqlite3.Connection, cbsa_code: str, job_type: Optional[str] = None) -> List[int]:
+    """
+    Years of WAC data loaded for a CBSA (of one job type, or of any), oldest
+    first; empty for databases loaded before wac_data had a year column
+    """
+    if "year" not in _wac_columns(conn):
+        return []
+    queries = [("SELECT DISTINCT year FROM wac_data WHERE cbsa_code = ?", [cbsa_code])]
+    if _has_wac_deltas(conn):
+        queries.append(("SELECT DISTINCT year FROM wac_deltas WHERE cbsa_code = ?", [cbsa_code]))
+    years = set()
+    for query, params in queries:
+        if job_type is not None:
+            query += " AND job_type = ?"
+            params.append(job_type)
+        years.update(row[0] for row in conn.execute(query, params))
+    return sorted(years)
+
+
+def read_wac_rows(conn: sqlite3.Connection, cbsa_code: str, job_type: str, year: int) -> list:
+    """(bg_geoid, *WAC_COLUMNS) rows of one CBSA, job type and year"""
+    rows = conn.execute(
+        f"SELECT bg_geoid, {', '.join(WAC_COLUMNS)} FROM wac_data "
+        f"WHERE cbsa_code = ? AND job_type = ? AND year = ?",
+        (cbsa_code, job_type, year)
+    ).fetchall()
+    if rows or job_type == JOB_TYPES[0] or not _has_wac_deltas(conn):
+        return rows
+    record = conn.execute(
+        "SELECT bg_geoids, dtype, deltas FROM wac_deltas WHERE cbsa_code = ? AND year = ? AND job_type = ?",
+        (cbsa_code, year, job_type)
+    ).fetchone()
+    if record is None:
+        return []
+    return decode_wac_deltas(read_wac_rows(conn, cbsa_code, JOB_TYPES[0], year), *record)
+
+
+def load_frames(conn: sqlite3.Connection, cbsa_code: str) -> Dict[str, CBSAFrame]:
+    """
+    Read one CBSA's block groups and WAC rows of its current (latest) year
+    into a frame per job type
+    """
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT bg_geoid FROM blockgroups WHERE cbsa_code = ?", (cbsa_code,))
+    geometry_geoids = {row[0] for row in cursor.fetchall()}
+
+    # Databases loaded before wac_data had job_type or year columns hold
+    # all jobs of a single year
+    job_type_column = "job_type" if "job_type" in _wac_columns(conn) else f"'{JOB_TYPES[0]}'"
+    query, params = (
+        f"SELECT {job_type_column}, bg_geoid, {', '.join(WAC_COLUMNS)} FROM wac_data WHERE cbsa_code = ?",
+        [cbsa_code],
+    )
+    years = wac_years(conn, cbsa_code)
+    if years:
+        query += " AND year = ?"
+        params.append(years[-1])
+
+    rows_by_type: Dict[str, list] = {job_type: [] for job_type in JOB_TYPES}
+    for row in cursor.execute(query, params):
+        if row[0] in rows_by_type:
+            rows_by_type[row[0]].append(row[1:])
+    # Other job types are stored as deltas (unless loaded before wac_deltas existed)
+    for job_type in JOB_TYPES[1:]:
+        if not rows_by_type[job_type] and years:
+            rows_by_type[job_type] = read_wac_rows(conn, cbsa_code, job_type, years[-1])
+
+    wac_geoids = {row[0] for rows in rows_by_type.values() for row in rows}
+    bg_geoids = sorted(geometry_geoids.union(wac_geoids))
+    positions = {geoid: i for i, geoid in enumerate(bg_geoids)}
+    has_geometry = np.fromiter((g in geometry_geoids for g in bg_geoids), dtype=bool, count=len(bg_geoids))
+
+    def columns(wac_rows):
+        values = np.zeros((len(WAC_COLUMNS), len(bg_geoids)), dtype=np.int32)
+        has_wac = np.zeros(len(bg_geoids), dtype=bool)
+        if wac_rows:
+            index = np.fromiter((positions[row[0]] for row in wac_rows), dtype=np.int64, count=len(wac_rows))
+            values[:, index] = _row_values(wac_rows)
+            has_wac[index] = True
+        return values, has_wac
+
+    base_type, *other_types = JOB_TYPES
+    base = CBSAFrame(cbsa_code, bg_geoids, *columns(rows_by_type[base_type]), has_geometry)
+    frames = {base_type: base}
+    for job_type in other_types:
+        frames[job_type] = DeltaFrame(base, job_type, *columns(rows_by_type[job_type]))
+    return frames
+
+
+def load_frame(conn: sqlite3.Connection, cbsa_code: str, job_type: str = JOB_TYPES[0]) -> CBSAFrame:
+    """Read one CBSA's block groups and current WAC rows of one job type into a CBSAFrame"""
+    return load_frames(conn, cbsa_code)[job_type]
+
+
+class UnknownCBSA(KeyError):
+    """A CBSA code that isn't in the cbsas table"""
+
+
+def cbsa_exists(conn: sqlite3.Connection, cbsa_code: str) -> bool:
+    """Whether a CBSA code is in the cbsas table"""
+    return conn.execute("SELECT 1 FROM cbsas WHERE cbsa_code = ?", (cbsa_code,)).fetchone() is not None
+
+
+class WACStore:
+    """Process-wide cache of CBSAFrames, loaded once per CBSA (all job types together)"""
+
+    def __init__(self, db_file: str, generation: Optional[DataGeneration] = None):
+        self.db_file = db_file
+        # Checked on every get; frames (and the stores built on them) are
+        # dropped when it changes
+        self.generation = generation
+        self._frames: Dict[str, Dict[str, CBSAFrame]] = {}
+        self._lock = threading.Lock()
+        if generation is not None:
+            generation.on_change(self.clear)
+
+    def check_generation(self):
+        """Drop everything built from an older data generation"""
+        if self.generation is not None:
+            self.generation.current()
+
+    def get(self, cbsa_code: str, job_type: str = JOB_TYPES[0]) -> CBSAFrame:
+        """
+        Return the frame for a CBSA and job type, loading the CBSA on first
+        touch. Raises UnknownCBSA for codes not in the cbsas table, so only
+        real CBSAs are ever cached.
+        """
+        self.check_generation()
+        frames = self._frames.get(cbsa_code)
+        if frames is not None:
+            return frames[job_type]
+
+        with self._lock:
+            frames = self._frames.get(cbsa_code)
+            if frames is None:
+                conn = sqlite3.connect(self.db_file)
+                try:
+                    if not cbsa_exists(conn, cbsa_code):
+                        raise UnknownCBSA(cbsa_code)
+                    frames = load_frames(conn, cbsa_code)
+                finally:
+                    conn.close()
+                self._frames[cbsa_code] = frames
+        return frames[job_type]
+
+    def load_all(self):
+        """Load every CBSA listed in the cbsas table"""
+        conn = sqlite3.connect(self.db_file)
+        try:
+            cbsa_codes = [row[0] for row in conn.execute("SELECT cbsa_code FROM cbsas")]
+        except sqlite3.Error as e:
+            print(f"WAC store not loaded: {e}")
+            return
+        finally:
+            conn.close()
+
+        for cbsa_code in cbsa_codes:
+            self.get(cbsa_code)
+
+    def cbsa_codes(self) -> List[str]:
+        """CBSAs currently loaded"""
+        return list(self._frames)
+
+    def clear(self):
+        """Drop all cached frames (e.g. after reloading the database)"""
+        with self._lock:
+            self._frames = {}
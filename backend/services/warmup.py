@@ -0,0 +1,106 @@
+"""
+Background warm-up of a server process.
+
+A fresh worker would otherwise serve its first requests cold: WAC frames
+not loaded, geometries not decoded, no spatial index, and an empty SQLite
+page cache. WarmUp does that work for each configured CBSA in a background
+thread, so the server starts accepting connections at once while /health
+reports readiness and progress. Requests for a CBSA that is still warming
+wait for it on the stores' locks; the others are served as usual.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# A warm-up step: a function of a CBSA code and a read-only connection
+WarmUpStep = Callable[[str, sqlite3.Connection], None]
+
+
+class WarmUp:
+    """Run warm-up steps for each CBSA in order, recording progress and timings"""
+
+    def __init__(self, db_file: str, steps: Dict[str, WarmUpStep]):
+        self.db_file = db_file
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._cbsa_codes: List[str] = []
+        self._current: Optional[str] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        # Seconds per step for each warmed CBSA
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._errors: Dict[str, str] = {}
+
+    @property
+    def ready(self) -> bool:
+        """Warm-up has finished, and the database could be read (single CBSAs may have failed)"""
+        return self._finished is not None and "*" not in self._errors
+
+    def start(self, cbsa_codes: Optional[List[str]] = None):
+        """Warm the given CBSAs (default: every CBSA in the database) in a daemon thread"""
+        self._started = time.time()
+        self._thread = threading.Thread(target=self.run, args=(cbsa_codes,), name="warmup", daemon=True)
+        self._thread.start()
+
+    def run(self, cbsa_codes: Optional[List[str]] = None):
+        """Warm the CBSAs in the calling thread"""
+        if self._started is None:
+            self._started = time.time()
+        conn = None
+        try:
+            conn = sqlite3.connect(f"file:{self.db_file}?mode=ro", uri=True)
+            if cbsa_codes is None:
+                cbsa_codes = [row[0] for row in conn.execute("SELECT cbsa_code FROM cbsas ORDER BY cbsa_code")]
+            self._cbsa_codes = list(cbsa_codes)
+            for cbsa_code in self._cbsa_codes:
+                self._warm(cbsa_code, conn)
+        except sqlite3.Error as e:
+            # The database itself is unreadable ("*" is every CBSA)
+            self._errors["*"] = str(e)
+        finally:
+            if conn is not None:
+                conn.close()
+            with self._lock:
+                self._current = None
+                self._finished = time.time()
+            print(f"Warm-up finished: {len(self._timings)} CBSAs in {self._finished - self._started:.1f}s"
+                  + (f" ({len(self._errors)} failed)" if self._errors else ""))
+
+    def _warm(self, cbsa_code: str, conn: sqlite3.Connection):
+        with self._lock:
+            self._current = cbsa_code
+        timings = {}
+        for name, step in self.steps.items():
+            start = time.perf_counter()
+            try:
+                step(cbsa_code, conn)
+            except Exception as e:
+                self._errors[cbsa_code] = f"{name}: {e}"
+                break
+            finally:
+                timings[name] = round(time.perf_counter() - start, 4)
+        with self._lock:
+            self._timings[cbsa_code] = timings
+
+    def status(self) -> dict:
+        """Readiness, progress and per-CBSA timings, for /health"""
+        with self._lock:
+            if self._started is None:
+                state = "pending"
+            elif self._finished is None:
+                state = "running"
+            else:
+                state = "failed" if self._errors else "done"
+            end = self._finished if self._finished is not None else time.time()
+            return {
+                "state": state,
+                "done": len(self._timings),
+                "total": len(self._cbsa_codes),
+                "current": self._current,
+                "seconds": round(end - self._started, 3) if self._started is not None else None,
+                "cbsas": {code: dict(timings) for code, timings in self._timings.items()},
+                "errors": dict(self._errors),
+            }
@@ -0,0 +1,386 @@
+"""
+In-process endpoint benchmarks for backend.app:app.
+
+Builds a synthetic dataset on first use (see synthetic.py; the database is
+kept in its directory for later runs), warms the app the way startup does,
+then sends requests through the ASGI app itself, with no server or network.
+For each endpoint and filter combination it records:
+
+* first-request latency, which includes one-time loads (year cubes, stored
+  payloads, simplified geometries)
+* cold latency: the median of --cold-repeat requests, each right after the
+  response cache is cleared (frames, geometry and spatial indexes stay
+  loaded, as in a warmed worker)
+* warm latency: min/mean/p50/p90/p99/max over --repeat cached requests
+* payload size: identity, gzip and (if installed) br bytes on the wire
+* peak memory: the Python heap peak (tracemalloc, NumPy included) during a
+  cold request
+
+It also records a burst of concurrent identical cold requests, the warm-up
+time and the process's peak RSS. Results are written as JSON, and
+--compare prints the changes against an earlier results file and exits
+with status 1 if any case's cold or warm latency got worse by more than
+--threshold. Compare runs made on the same, otherwise idle, machine and
+dataset: sub-millisecond timings move by tens of percent under load.
+
+Usage (from the repository root):
+python -m benchmarks.run [--dataset cbsas|national] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+import numpy as np
+
+from .synthetic import DATASETS, DEFAULT_SEED, NATIONAL_BLOCK_GROUPS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BURST_SIZE = 50
+PERCENTILES = (50, 90, 99)
+
+# Filter combinations run against each benchmarked CBSA
+FILTERS = [
+    {},
+    {"employment_code": "CNS09"},
+    {"age_group": "CA01", "earnings_bracket": "CE03"},
+    {"employment_code": "CNS16", "age_group": "CA02", "earnings_bracket": "CE02", "education_level": "CD04"},
+    {"metric": "ce03 / c000"},
+    {"job_type": "primary"},
+]
+
+
+def ensure_dataset(dataset: str, directory: Path, seed: int, block_groups: int, workers: int) -> Optional[float]:
+    """
+    Generate and load the dataset unless its database already exists.
+    Runs in a subprocess, which keeps pandas out of this one. Returns the
+    seconds taken, or None if the dataset was already there.
+    """
+    if (directory / "lodes.db").exists():
+        return None
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.synthetic", dataset, str(directory),
+         "--seed", str(seed), "--block-groups", str(block_groups), "--workers", str(workers)],
+        cwd=REPO_ROOT, check=True,
+    )
+    return time.perf_counter() - start
+
+
+def git_revision() -> Optional[str]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ("-dirty" if dirty else "")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def distribution(samples: List[float]) -> Dict[str, float]:
+    """Summary of latencies in milliseconds"""
+    values = np.asarray(samples) * 1000
+    summary = {"min": values.min(), "mean": values.mean()}
+    summary.update({f"p{q}": np.percentile(values, q) for q in PERCENTILES})
+    summary["max"] = values.max()
+    return {name: round(float(value), 3) for name, value in summary.items()}
+
+
+def tile_for(lon: float, lat: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator (XYZ) tile containing a point"""
+    n = 2 ** zoom
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+def pick_cbsas(app_module, dataset: str) -> List[str]:
+    """The CBSAs to benchmark: all shipped CBSAs, or the largest, median and smallest national ones"""
+    codes = sorted(app_module.cbsa.wac_store.cbsa_codes())
+    if dataset == "cbsas":
+        return codes
+    by_size = sorted(codes, key=lambda code: len(app_module.cbsa.wac_store.get(code)))
+    return [by_size[-1], by_size[len(by_size) // 2], by_size[0]]
+
+
+def probe_point(app_module, cbsa_code: str) -> Tuple[float, float]:
+    """A point inside the CBSA's middle block group with geometry (for locate, bbox and tiles)"""
+    bounds = app_module.cbsa.geometry_store.get(cbsa_code).bounds()
+    positions = np.flatnonzero(~np.isnan(bounds[:, 0]))
+    bounds = bounds[positions[len(positions) // 2]]
+    return float((bounds[0] + bounds[2]) / 2), float((bounds[1] + bounds[3]) / 2)
+
+
+def build_cases(app_module, cbsa_codes: List[str]) -> List[str]:
+    """Request paths for every endpoint and filter combination"""
+    cases = ["/health", "/api/cbsas", "/api/filters", f"/api/compare?cbsas={','.join(cbsa_codes)}"]
+    for code in cbsa_codes:
+        lon, lat = probe_point(app_module, code)
+        bbox = f"{lon - 0.05:.4f},{lat - 0.05:.4f},{lon + 0.05:.4f},{lat + 0.05:.4f}"
+        cases += [
+            f"/api/cbsa/{code}",
+            f"/api/blockgroups/{code}",
+            f"/api/blockgroups/{code}?zoom=8",
+            f"/api/blockgroups/{code}?job_type=primary",
+            f"/api/blockgroups/{code}?bbox={bbox}",
+            f"/api/blockgroups/filtered?cbsa_code={code}&bbox={bbox}",
+        ]
+        for params in FILTERS:
+            query = urlencode(params)
+            cases += [
+                f"/api/blockgroups/filtered?cbsa_code={code}" + (f"&{query}" if query else ""),
+                f"/api/blockgroups/{code}/attributes" + (f"?{query}" if query else ""),
+                f"/api/industries/{code}" + (f"?{query}" if query else ""),
+            ]
+        cases += [
+            f"/api/breaks/{code}?metric=c000",
+            f"/api/breaks/{code}?metric=ce03+%2F+c000&k=7&employment_code=CNS09",
+            f"/api/rollups/{code}?level=tract",
+            f"/api/rollups/{code}?level=county",
+            f"/api/wac/{code}?format=raw",
+            f"/api/change/{code}?from=2019&to=2023",
+            f"/api/change/{code}?from=2019&to=2023&metric=cns09+%2B+cns10",
+            f"/api/locate?lon={lon:.5f}&lat={lat:.5f}&cbsa_code={code}",
+        ]
+        if app_module.export.HAS_PYARROW:
+            cases.append(f"/api/wac/{code}?format=arrow")
+        for zoom in (8, 12):
+            x, y = tile_for(lon, lat, zoom)
+            cases.append(f"/api/tiles/{code}/{zoom}/{x}/{y}.mvt")
+    # Without a CBSA, locate searches every CBSA's spatial index
+    lon, lat = probe_point(app_module, cbsa_codes[-1])
+    cases.append(f"/api/locate?lon={lon:.5f}&lat={lat:.5f}")
+    return cases
+
+
+async def timed_get(client: httpx.AsyncClient, path: str, encoding: str = "identity") -> Tuple[float, httpx.Response]:
+    start = time.perf_counter()
+    response = await client.get(path, headers={"Accept-Encoding": encoding})
+    return time.perf_counter() - start, response
+
+
+async def measure(client: httpx.AsyncClient, app_module, path: str, repeat: int, cold_repeat: int,
+                  encodings: List[str]) -> Dict:
+    """Cold and warm latency, payload sizes and peak heap of one request path"""
+    response_cache = app_module.cbsa.response_cache
+
+    # The first request also pays one-time costs: year cubes, stored payloads
+    # and simplified geometries are loaded on first use
+    response_cache.clear()
+    first, response = await timed_get(client, path)
+    cold = []
+    for _ in range(cold_repeat):
+        response_cache.clear()
+        seconds, response = await timed_get(client, path)
+        cold.append(seconds)
+    result = {
+        "path": path,
+        "status": response.status_code,
+        "first_ms": round(first * 1000, 3),
+        "cold_ms": round(float(np.median(cold)) * 1000, 3),
+        "bytes": response.num_bytes_downloaded,
+    }
+
+    warm = [(await timed_get(client, path))[0] for _ in range(repeat)]
+    result["latency_ms"] = distribution(warm)
+
+    for encoding in encodings:
+        _, response = await timed_get(client, path, encoding)
+        result[f"bytes_{encoding}"] = response.num_bytes_downloaded
+
+    response_cache.clear()
+    tracemalloc.start()
+    try:
+        await client.get(path, headers={"Accept-Encoding": "identity"})
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 3)
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+async def measure_burst(client: httpx.AsyncClient, app_module, path: str, size: int) -> Dict:
+    """size identical requests at once against a cold response cache"""
+    flights = app_module.cbsa.flights
+    before = flights.stats()
+    app_module.cbsa.response_cache.clear()
+    start = time.perf_counter()
+    timings = await asyncio.gather(*(timed_get(client, path) for _ in range(size)))
+    wall = time.perf_counter() - start
+    after = flights.stats()
+    return {
+        "path": path,
+        "requests": size,
+        "statuses": sorted({response.status_code for _, response in timings}),
+        "wall_ms": round(wall * 1000, 3),
+        "latency_ms": distribution([seconds for seconds, _ in timings]),
+        "builds": after["started"] - before["started"],
+        "coalesced": after["coalesced"] - before["coalesced"],
+    }
+
+
+async def run_cases(app_module, cases: List[str], bursts: List[str], repeat: int,
+                    cold_repeat: int) -> Tuple[List[Dict], List[Dict]]:
+    encodings = ["gzip"] + (["br"] if "br" in importlib.import_module("backend.services.compression").ENCODINGS else [])
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        results = []
+        for i, path in enumerate(cases, 1):
+            # Collections triggered by earlier cases' garbage would land in this one's timings
+            gc.collect()
+            gc.disable()
+            try:
+                result = await measure(client, app_module, path, repeat, cold_repeat, encodings)
+            finally:
+                gc.enable()
+            results.append(result)
+            print(f"  [{i}/{len(cases)}] {path}: p50 {result['latency_ms']['p50']:.2f} ms, "
+                  f"cold {result['cold_ms']:.1f} ms, {result['bytes']:,} B")
+        burst_results = [await measure_burst(client, app_module, path, BURST_SIZE) for path in bursts]
+    return results, burst_results
+
+
+# Latency changes smaller than these (ms) are noise, whatever the ratio
+NOISE_MS = {"cold_ms": 1.0, "p50": 0.25}
+
+
+def compare(old: Dict, new: Dict, threshold: float) -> int:
+    """Print per-case changes against an earlier run; returns the number of regressions"""
+    previous = {result["path"]: result for result in old["results"]}
+    regressions = 0
+    ratios = {name: [] for name in NOISE_MS}
+    print(f"Comparing with {old['meta'].get('revision')} ({old['meta'].get('timestamp')}):")
+    for result in new["results"]:
+        before = previous.get(result["path"])
+        if before is None:
+            continue
+        changes, slower = [], False
+        for name in NOISE_MS:
+            old_ms = before["cold_ms"] if name == "cold_ms" else before["latency_ms"][name]
+            new_ms = result["cold_ms"] if name == "cold_ms" else result["latency_ms"][name]
+            if old_ms > 0 and new_ms > 0:
+                ratios[name].append(new_ms / old_ms)
+            if abs(new_ms - old_ms) <= NOISE_MS[name] or abs(new_ms - old_ms) <= threshold * old_ms:
+                continue
+            slower |= new_ms > old_ms
+            changes.append(f"{name.replace('_ms', '')} {old_ms:.2f} -> {new_ms:.2f} ms ({new_ms / old_ms:.2f}x)")
+        if before["bytes"] != result["bytes"]:
+            changes.append(f"{before['bytes']:,} -> {result['bytes']:,} B")
+        if changes:
+            regressions += slower
+            print(f"  {'REGRESSION ' if slower else ''}{result['path']}: {', '.join(changes)}")
+    # A uniform shift across all cases is more likely the machine than the code
+    drift = ", ".join(
+        f"{name.replace('_ms', '')} {np.exp(np.mean(np.log(values))):.2f}x" for name, values in ratios.items() if values
+    )
+    print(f"  {regressions} regression(s) over {threshold:.0%}; geometric mean change: {drift}")
+    return regressions
+
+
+def main(args) -> int:
+    directory = (args.data_dir or REPO_ROOT / "benchmarks" / "data" / args.dataset).resolve()
+    print(f"Dataset {args.dataset} in {directory}")
+    load_seconds = ensure_dataset(args.dataset, directory, args.seed, args.block_groups, args.workers)
+
+    # The app opens lodes.db relative to the working directory
+    sys.path.insert(0, str(REPO_ROOT))
+    os.chdir(directory)
+    start = time.perf_counter()
+    app_module = importlib.import_module("backend.app")
+    import_seconds = time.perf_counter() - start
+
+    print("Warming up...")
+    app_module.warmup.run()
+    warmup = app_module.warmup.status()
+    if warmup["errors"]:
+        print(f"Warm-up errors: {warmup['errors']}")
+        return 1
+
+    cbsa_codes = pick_cbsas(app_module, args.dataset)
+    cases = build_cases(app_module, cbsa_codes)
+    bursts = [
+        f"/api/blockgroups/filtered?cbsa_code={cbsa_codes[0]}&employment_code=CNS09",
+        f"/api/blockgroups/{cbsa_codes[0]}/attributes?metric=ce03+%2F+c000",
+    ]
+    print(f"Running {len(cases)} cases and {len(bursts)} bursts ({args.repeat} warm requests each)...")
+    results, burst_results = asyncio.run(run_cases(app_module, cases, bursts, args.repeat, args.cold_repeat))
+
+    block_groups = sum(len(app_module.cbsa.wac_store.get(code)) for code in app_module.cbsa.wac_store.cbsa_codes())
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "dataset": args.dataset,
+            "seed": args.seed,
+            "cbsas": len(app_module.cbsa.wac_store.cbsa_codes()),
+            "block_groups": block_groups,
+            "benchmarked_cbsas": cbsa_codes,
+            "repeat": args.repeat,
+            "cold_repeat": args.cold_repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "setup": {
+            "generate_and_load_s": round(load_seconds, 2) if load_seconds is not None else None,
+            "import_s": round(import_seconds, 3),
+            "warmup_s": warmup["seconds"],
+            "peak_rss_mb": peak_rss_mb(),
+        },
+        "results": results,
+        "bursts": burst_results,
+    }
+
+    output = Path(args.output).resolve() if args.output else None
+    os.chdir(REPO_ROOT)
+    output = output or REPO_ROOT / "benchmarks" / "results" / f"{args.dataset}-{report['meta']['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=1))
+    print(f"✓ Results written to {output} (peak RSS {report['setup']['peak_rss_mb']} MB)")
+
+    if args.compare:
+        return 1 if compare(json.loads(Path(args.compare).read_text()), report, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", choices=DATASETS, default="cbsas")
+    parser.add_argument("--data-dir", type=Path,
+                        help="dataset directory (default: benchmarks/data/<dataset>); generated if it has no lodes.db")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--block-groups", type=int, default=NATIONAL_BLOCK_GROUPS,
+                        help="block groups of a newly generated national dataset")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="load_data.py worker processes when generating")
+    parser.add_argument("--repeat", type=int, default=20, help="warm requests per case (default: 20)")
+    parser.add_argument("--cold-repeat", type=int, default=3,
+                        help="cold requests per case; the median is reported (default: 3)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<dataset>-<revision>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="latency increase that counts as a regression (default: 0.2 = 20%%)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,326 @@
+"""
+Deterministic synthetic LODES data for benchmarking.
+
+Writes the same CSV files load_data.py reads (``{cbsa}_blockgroups2023.csv``
+and ``{cbsa}_{all|primary}{year}.csv`` for 2019 and 2023) plus a
+``cbsas.json`` of CBSA names, then loads them with the real pipeline.
+The same dataset name and seed always give byte-identical files.
+
+Datasets:
+
+* ``cbsas``: the three CBSAs the app ships with, at their real block-group
+  counts and extents.
+* ``national``: about 240,000 block groups in 900 CBSAs across the
+  continental US, with a long-tailed size distribution (the largest has
+  about 12,000 block groups, like New York). --block-groups makes a
+  smaller one with proportionally fewer CBSAs.
+
+Block groups are star-shaped polygons on a jittered grid with lognormal
+vertex counts (median 60, a long tail into the thousands), like TIGER/Line
+block groups, including some holes and multi-part block groups. GEOIDs
+nest into tracts and counties the way rollups expect. WAC columns are drawn
+from per-block-group category mixes so that every category group sums to
+C000 (education to the 30-and-over workers), and primary jobs are a
+subsample of all jobs, never exceeding them in any column.
+
+Usage (from the repository root):
+python -m benchmarks.synthetic {cbsas,national} [directory]
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend.services.wac_store import WAC_COLUMNS
+
+DATASETS = ("cbsas", "national")
+YEARS = (2019, 2023)
+DEFAULT_SEED = 2023
+NATIONAL_BLOCK_GROUPS = 240_000
+NATIONAL_CBSAS = 900
+
+# (block groups, minLon, minLat, maxLon, maxLat, state FIPS) of the shipped CBSAs
+SHIPPED_CBSAS = {
+    "31080": (8714, -118.95, 33.40, -117.40, 34.82, "06"),
+    "41860": (3241, -122.65, 37.45, -121.55, 38.32, "06"),
+    "47900": (4050, -78.20, 38.05, -76.45, 39.45, "11"),
+}
+CONTINENTAL_US = (-124.0, 25.5, -67.5, 48.5)
+
+# Vertices per polygon exterior: lognormal around the TIGER/Line median
+VERTEX_MEDIAN = 60
+VERTEX_SIGMA = 0.8
+MAX_VERTICES = 4000
+HOLE_SHARE = 0.005
+MULTIPART_SHARE = 0.004
+# Block groups without WAC rows (no jobs)
+NO_JOBS_SHARE = 0.005
+
+# Category groups of WAC columns: (columns, share of C000 on average, concentration)
+# Lower concentration means block groups specialize more.
+CATEGORY_GROUPS = [
+    (["ca01", "ca02", "ca03"], [0.22, 0.55, 0.23], 20.0),
+    (["ce01", "ce02", "ce03"], [0.20, 0.30, 0.50], 8.0),
+    ([f"cns{i:02d}" for i in range(1, 21)],
+     [0.001, 0.0003, 0.006, 0.04, 0.07, 0.045, 0.085, 0.04, 0.07, 0.035,
+      0.02, 0.075, 0.017, 0.07, 0.085, 0.17, 0.023, 0.095, 0.032, 0.0297], 0.4),
+    (["cr01", "cr02", "cr03", "cr04", "cr05", "cr07"], [0.72, 0.12, 0.015, 0.12, 0.003, 0.022], 30.0),
+    (["ct01", "ct02"], [0.78, 0.22], 15.0),
+    (["cs01", "cs02"], [0.51, 0.49], 25.0),
+    (["cfa01", "cfa02", "cfa03", "cfa04", "cfa05"], [0.05, 0.05, 0.08, 0.1, 0.72], 6.0),
+    (["cfs01", "cfs02", "cfs03", "cfs04", "cfs05"], [0.14, 0.1, 0.1, 0.1, 0.56], 4.0),
+]
+# Educational attainment only covers workers aged 30 or older (ca02 + ca03)
+EDUCATION_GROUP = (["cd01", "cd02", "cd03", "cd04"], [0.1, 0.2, 0.3, 0.4], 10.0)
+PRIMARY_SHARE = 0.9
+
+
+def dataset_cbsas(dataset: str, rng: np.random.Generator,
+                  block_groups: int = NATIONAL_BLOCK_GROUPS) -> Dict[str, Tuple]:
+    """{cbsa_code: (name, block groups, extent, state FIPS)} of a dataset"""
+    if dataset == "cbsas":
+        from load_data import CBSA_MAPPING
+        return {
+            code: (CBSA_MAPPING[code], n, extent, state)
+            for code, (n, *extent, state) in SHIPPED_CBSAS.items()
+        }
+
+    # Smaller datasets have proportionally fewer CBSAs of similar sizes.
+    # Sizes are long-tailed, flattened at the head so the largest is ~6% of the total
+    count = max(3, min(NATIONAL_CBSAS, round(NATIONAL_CBSAS * block_groups / NATIONAL_BLOCK_GROUPS)))
+    ranks = np.arange(count)
+    weights = 1.0 / (ranks + 4.0) ** 1.05
+    sizes = np.maximum(40, np.round(weights / weights.sum() * block_groups)).astype(int)
+    cbsas = {}
+    min_lon, min_lat, max_lon, max_lat = CONTINENTAL_US
+    for i, n in enumerate(sizes.tolist()):
+        # Extent grows with the square root of the block-group count
+        half = 0.012 * np.sqrt(n)
+        lon = rng.uniform(min_lon + half, max_lon - half)
+        lat = rng.uniform(min_lat + half, max_lat - half)
+        extent = (lon - half * 1.25, lat - half, lon + half * 1.25, lat + half)
+        cbsas[f"{10000 + 40 * i:05d}"] = (f"Synthetic CBSA {i + 1}", n, extent, f"{i % 56 + 1:02d}")
+    return cbsas
+
+
+def block_group_layout(rng: np.random.Generator, n: int, extent: Tuple[float, float, float, float]):
+    """Centers (n, 2) and cell size of n block groups on a jittered grid"""
+    min_lon, min_lat, max_lon, max_lat = extent
+    width, height = max_lon - min_lon, max_lat - min_lat
+    cell = np.sqrt(width * height / n)
+    cols = max(1, int(np.ceil(width / cell)))
+    rows = max(1, int(np.ceil(n / cols)))
+    cells = np.sort(rng.choice(rows * cols, size=n, replace=False))
+    row, col = np.divmod(cells, cols)
+    jitter = rng.uniform(-0.1, 0.1, size=(n, 2)) * cell
+    centers = np.column_stack([min_lon + (col + 0.5) * cell, min_lat + (row + 0.5) * cell]) + jitter
+    return centers, cell
+
+
+def geoids(rng: np.random.Generator, n: int, state: str, county_base: int,
+           centers: np.ndarray) -> List[str]:
+    """
+    12-digit GEOIDs (state, county, tract, block group): counties are
+    west-to-east bands of 2,500 block groups or so, and tracts group 1 to 4
+    neighbouring block groups
+    """
+    counties = max(1, n // 2500)
+    span = np.ptp(centers[:, 0]) or 1.0
+    band = np.minimum((centers[:, 0] - centers[:, 0].min()) / span * counties, counties - 1).astype(int)
+    order = np.lexsort((centers[:, 0], centers[:, 1], band))
+    tract_sizes = rng.integers(1, 5, size=n)
+
+    result = [""] * n
+    county, tract, bg = -1, 0, 0
+    for pos in order.tolist():
+        if band[pos] != county:
+            county, tract, bg = band[pos], 0, 0
+        elif bg == tract_sizes[tract]:
+            tract, bg = tract + 1, 0
+        bg += 1
+        result[pos] = f"{state}{county_base + 2 * county + 1:03d}{100 + tract:06d}{bg}"
+    return result
+
+
+def _ring(rng: np.random.Generator, center: np.ndarray, radius: float, vertices: int) -> np.ndarray:
+    """A closed star-shaped ring around a center with a wobbly radius"""
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+    wobble = np.cumsum(rng.normal(0, 0.08, vertices))
+    wobble -= np.linspace(0, wobble[-1], vertices)
+    radii = radius * np.clip(1 + wobble, 0.6, 1.2)
+    ring = center + np.column_stack([np.cos(angles), np.sin(angles)]) * radii[:, np.newaxis]
+    return np.vstack([ring, ring[:1]])
+
+
+def _ring_wkt(ring: np.ndarray) -> str:
+    return "(" + ", ".join(f"{x:.6f} {y:.6f}" for x, y in ring.tolist()) + ")"
+
+
+def polygons_wkt(rng: np.random.Generator, centers: np.ndarray, cell: float) -> List[str]:
+    """WKT POLYGON (or MULTIPOLYGON) per block group"""
+    n = len(centers)
+    vertices = np.clip(np.round(rng.lognormal(np.log(VERTEX_MEDIAN), VERTEX_SIGMA, n)), 8, MAX_VERTICES)
+    radii = 0.4 * cell * rng.uniform(0.8, 1.0, n)
+    holes = rng.random(n) < HOLE_SHARE
+    multipart = rng.random(n) < MULTIPART_SHARE
+    wkt = []
+    for i in range(n):
+        rings = [_ring_wkt(_ring(rng, centers[i], radii[i], int(vertices[i])))]
+        if holes[i]:
+            rings.append(_ring_wkt(_ring(rng, centers[i], radii[i] * 0.2, 12)[::-1]))
+        polygon = "(" + ", ".join(rings) + ")"
+        if multipart[i]:
+            # A small island off the block group's north-east edge
+            island = _ring(rng, centers[i] + radii[i] * 0.95, radii[i] * 0.08, 10)
+            wkt.append(f"MULTIPOLYGON ({polygon}, ({_ring_wkt(island)}))")
+        else:
+            wkt.append(f"POLYGON {polygon}")
+    return wkt
+
+
+def category_mixes(rng: np.random.Generator, n: int) -> List[np.ndarray]:
+    """Per-block-group category probabilities for each category group (and education last)"""
+    mixes = []
+    for _, shares, concentration in CATEGORY_GROUPS + [EDUCATION_GROUP]:
+        gamma = rng.gamma(np.asarray(shares) * concentration * len(shares), size=(n, len(shares)))
+        gamma[:, 0] += 1e-12
+        mixes.append(gamma / gamma.sum(axis=1, keepdims=True))
+    return mixes
+
+
+def draw_wac(rng: np.random.Generator, c000: np.ndarray, mixes: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """WAC columns for given C000 totals, each category group summing to its total"""
+    columns = {"c000": c000}
+    for (names, _, _), mix in zip(CATEGORY_GROUPS, mixes):
+        counts = rng.multinomial(c000, mix)
+        columns.update(zip(names, counts.T))
+    names, _, _ = EDUCATION_GROUP
+    counts = rng.multinomial(columns["ca02"] + columns["ca03"], mixes[-1])
+    columns.update(zip(names, counts.T))
+    return columns
+
+
+def _subsample(rng: np.random.Generator, counts: np.ndarray, size: np.ndarray) -> np.ndarray:
+    """Draw size items without replacement from each row's category counts"""
+    drawn = np.zeros_like(counts)
+    remaining_total = counts.sum(axis=1)
+    remaining = size.copy()
+    for j in range(counts.shape[1] - 1):
+        drawn[:, j] = rng.hypergeometric(counts[:, j], remaining_total - counts[:, j], remaining)
+        remaining -= drawn[:, j]
+        remaining_total -= counts[:, j]
+    drawn[:, -1] = remaining
+    return drawn
+
+
+def primary_wac(rng: np.random.Generator, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Primary jobs: a subsample of all jobs that keeps every group's sum"""
+    c000 = rng.binomial(columns["c000"], PRIMARY_SHARE)
+    primary = {"c000": c000}
+    for names, _, _ in CATEGORY_GROUPS:
+        counts = np.column_stack([columns[name] for name in names])
+        primary.update(zip(names, _subsample(rng, counts, c000).T))
+    names, _, _ = EDUCATION_GROUP
+    counts = np.column_stack([columns[name] for name in names])
+    primary.update(zip(names, _subsample(rng, counts, primary["ca02"] + primary["ca03"]).T))
+    return primary
+
+
+def write_wac_csv(path: Path, bg_geoids: List[str], columns: Dict[str, np.ndarray]):
+    """Write a WAC CSV with the uppercase LODES headers load_data.py expects"""
+    data = np.column_stack([columns[col] for col in WAC_COLUMNS])
+    with open(path, "w", newline="") as f:
+        f.write(",".join(["bgrp"] + [col.upper() for col in WAC_COLUMNS]) + "\n")
+        for geoid, row in zip(bg_geoids, data.tolist()):
+            f.write(geoid + "," + ",".join(map(str, row)) + "\n")
+
+
+def write_cbsa(directory: Path, cbsa_code: str, n: int, extent: Tuple, state: str,
+               county_base: int, seed: int):
+    """Write one CBSA's geometry CSV and its WAC CSVs for every year and job type"""
+    # Each CBSA gets its own stream, so files don't depend on generation order
+    rng = np.random.default_rng([seed, int(cbsa_code)])
+    centers, cell = block_group_layout(rng, n, extent)
+    bg_geoids = geoids(rng, n, state, county_base, centers)
+    wkt = polygons_wkt(rng, centers, cell)
+    with open(directory / f"{cbsa_code}_blockgroups2023.csv", "w", newline="") as f:
+        f.write("bgrp,geometry\n")
+        for geoid, geometry in zip(bg_geoids, wkt):
+            f.write(f'{geoid},"{geometry}"\n')
+
+    # Jobs are long-tailed, with a few employment hubs
+    c000 = np.maximum(1, np.round(rng.lognormal(np.log(214), 1.3, n))).astype(np.int64)
+    c000[rng.random(n) < 0.01] *= 20
+    mixes = category_mixes(rng, n)
+    has_jobs = np.flatnonzero(rng.random(n) >= NO_JOBS_SHARE)
+    with_jobs = [bg_geoids[i] for i in has_jobs.tolist()]
+
+    for year in sorted(YEARS, reverse=True):
+        if year != max(YEARS):
+            # Earlier years: every block group's jobs scaled by its own trend
+            c000 = np.maximum(1, np.round(c000 * rng.lognormal(-0.05, 0.2, n))).astype(np.int64)
+        columns = draw_wac(rng, c000, mixes)
+        primary = primary_wac(rng, columns)
+        for job_type, values in (("all", columns), ("primary", primary)):
+            write_wac_csv(
+                directory / f"{cbsa_code}_{job_type}{year}.csv",
+                with_jobs, {col: values[col][has_jobs] for col in WAC_COLUMNS},
+            )
+
+
+def generate(dataset: str, directory: Path, seed: int = DEFAULT_SEED,
+             block_groups: int = NATIONAL_BLOCK_GROUPS) -> Dict[str, str]:
+    """Write a dataset's CSVs and cbsas.json into directory; returns {cbsa_code: name}"""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    cbsas = dataset_cbsas(dataset, rng, block_groups)
+    states: Dict[str, int] = {}
+    for cbsa_code, (name, n, extent, state) in cbsas.items():
+        # Counties are numbered per state, so GEOIDs never collide across CBSAs
+        county_base = states.get(state, 0)
+        states[state] = county_base + 2 * max(1, n // 2500) + 2
+        write_cbsa(directory, cbsa_code, n, extent, state, county_base, seed)
+    names = {code: name for code, (name, *_) in cbsas.items()}
+    (directory / "cbsas.json").write_text(json.dumps(names, indent=1))
+    return names
+
+
+def load(directory: Path, workers: int = os.cpu_count() or 1):
+    """Load a generated dataset into directory/lodes.db with load_data.py's pipeline"""
+    import load_data
+
+    names = json.loads((directory / "cbsas.json").read_text())
+    cwd = os.getcwd()
+    # load_data works on lodes.db in the working directory (also in its workers)
+    os.chdir(directory)
+    try:
+        load_data.CBSA_MAPPING = names
+        load_data.load(".", workers)
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", choices=DATASETS)
+    parser.add_argument("directory", nargs="?", type=Path,
+                        help="output directory (default: benchmarks/data/<dataset>)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--block-groups", type=int, default=NATIONAL_BLOCK_GROUPS,
+                        help=f"total block groups of the national dataset (default: {NATIONAL_BLOCK_GROUPS:,})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="load_data.py worker processes (default: CPU count)")
+    parser.add_argument("--no-load", action="store_true", help="only write the CSV files")
+    args = parser.parse_args()
+
+    directory = args.directory or Path(__file__).parent / "data" / args.dataset
+    start = time.perf_counter()
+    names = generate(args.dataset, directory, args.seed, args.block_groups)
+    print(f"✓ Generated {len(names)} CBSAs in {directory} ({time.perf_counter() - start:.1f}s)")
+    if not args.no_load:
+        load(directory, args.workers)
@@ -50,6 +50,22 @@ async function fetchFilteredBlockGroups(cbsaCode, filters) {
     }
 }
 
+async function fetchBlockGroupAttributes(cbsaCode, filters, includeGeoids) {
+    try {
+        const params = new URLSearchParams({
+            ...Object.fromEntries(Object.entries(filters).filter(([_, v]) => v)),
+            include_geoids: includeGeoids ? 'true' : 'false'
+        });
+        
+        const response = await fetch(`${API_BASE}/blockgroups/${cbsaCode}/attributes?${params}`);
+        if (!response.ok) throw new Error('Failed to fetch block group attributes');
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching block group attributes:', error);
+        return null;
+    }
+}
+
 async function fetchCBSADetails(cbsaCode) {
     try {
         const response = await fetch(`${API_BASE}/cbsa/${cbsaCode}`);
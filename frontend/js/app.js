@@ -1,6 +1,10 @@
 // Main application logic
 let currentCBSA = null;
 let filterOptions = {};
+// Unfiltered block groups of the current CBSA, reused when filters change
+let baseGeoJson = null;
+// bg_geoid -> position in the attribute arrays, and the ordering version
+let blockGroupOrder = null;
 
 document.addEventListener('DOMContentLoaded', async () => {
     initializeMap();
@@ -44,6 +48,8 @@ async function initializeUI() {
 
 async function selectCBSA(cbsaCode) {
     currentCBSA = cbsaCode;
+    baseGeoJson = null;
+    blockGroupOrder = null;
     
     // Show loading state
     document.getElementById('filters-section').style.display = 'block';
@@ -54,6 +60,7 @@ async function selectCBSA(cbsaCode) {
         if (typeof showMapLoading === 'function') showMapLoading();
         const geojsonData = await fetchBlockGroups(cbsaCode);
         if (geojsonData) {
+            baseGeoJson = geojsonData;
             loadBlockGroupsOnMap(geojsonData);
         }
 
@@ -119,11 +126,14 @@ async function applyFilters() {
         age_group: document.getElementById('age-group').value || null,
         earnings_bracket: document.getElementById('earnings-bracket').value || null,
         education_level: document.getElementById('education-level').value || null,
+        job_type: document.getElementById('job-type').value || null,
     };
 
     try {
         if (typeof showMapLoading === 'function') showMapLoading();
-        const geojsonData = await fetchFilteredBlockGroups(currentCBSA, filters);
+        const geojsonData = baseGeoJson
+            ? await filterBaseGeoJson(currentCBSA, filters)
+            : await fetchFilteredBlockGroups(currentCBSA, filters);
         if (geojsonData) {
             loadBlockGroupsOnMap(geojsonData);
         }
@@ -134,11 +144,48 @@ async function applyFilters() {
     }
 }
 
+// Join filtered attribute arrays onto the already-loaded geometry instead of
+// downloading every polygon again
+async function filterBaseGeoJson(cbsaCode, filters) {
+    let attributes = await fetchBlockGroupAttributes(cbsaCode, filters, !blockGroupOrder);
+    if (attributes && !attributes.bg_geoids && attributes.version !== blockGroupOrder.version) {
+        // Ordering changed on the server (data reloaded); fetch it again
+        attributes = await fetchBlockGroupAttributes(cbsaCode, filters, true);
+    }
+    if (!attributes) return null;
+
+    if (attributes.bg_geoids) {
+        blockGroupOrder = {
+            version: attributes.version,
+            index: new Map(attributes.bg_geoids.map((geoid, i) => [geoid, i]))
+        };
+    }
+
+    const features = [];
+    baseGeoJson.features.forEach(feature => {
+        const i = blockGroupOrder.index.get(feature.properties.bg_geoid);
+        if (i === undefined || attributes.metric_value[i] === null) return;
+        features.push({
+            type: 'Feature',
+            geometry: feature.geometry,
+            properties: {
+                bg_geoid: feature.properties.bg_geoid,
+                metric_value: attributes.metric_value[i],
+                total_jobs: attributes.total_jobs[i],
+                filter_employment_code: filters.employment_code || null,
+                active_filters: attributes.active_filters
+            }
+        });
+    });
+    return { type: 'FeatureCollection', features };
+}
+
 function clearFilters() {
     document.getElementById('employment-code').value = '';
     document.getElementById('age-group').value = '';
     document.getElementById('earnings-bracket').value = '';
     document.getElementById('education-level').value = '';
+    document.getElementById('job-type').value = 'all';
     
     // Reload original block groups
     if (currentCBSA) {
@@ -4,12 +4,24 @@ Data loading script for LODES Explorer
 Run this to populate the database with CSV data
 """
 
-import sys
-import json
+import os
+import re
+import time
+import hashlib
+import argparse
 import pandas as pd
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+from backend.services.wac_store import JOB_TYPES, WAC_COLUMNS, encode_wac_deltas, load_frame, read_wac_rows
+from backend.services.geometry import load_geometry_frame
+from backend.services.simplify import simplified_frames, lod_rows, LOD_TOLERANCES
+from backend.services.tiles import build_tile_pyramid, TILE_MIN_ZOOM, TILE_MAX_ZOOM
+from backend.services.geojson import payload_rows
+from backend.services.rollups import rollup_rows, ROLLUP_LEVELS
+from backend.services.compression import ENCODINGS
+
 # Database connection
 DB_FILE = "lodes.db"
 
@@ -19,8 +31,58 @@ CBSA_MAPPING = {
     "47900": "Washington-Arlington-Alexandria, DC-VA-MD-WV",
 }
 
+# WAC files are named {cbsa_code}_{job_type}{year}.csv, one per job type and year
+WAC_FILE_NAME = re.compile(r"^\d+_(?P<job_type>[a-z]+)(?P<year>\d{4})\.csv$")
+
+# Year of the WAC data in databases loaded before wac_data had a year column
+DEFAULT_YEAR = 2023
+
+# One row per CBSA, year, job type and block group (unique index created
+# after the bulk load, see create_indexes)
+WAC_DATA_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        cbsa_code TEXT NOT NULL,
+        bg_geoid TEXT NOT NULL,
+        job_type TEXT NOT NULL DEFAULT 'all',
+        year INTEGER NOT NULL DEFAULT 2023,
+        c000 INTEGER DEFAULT 0,
+        ca01 INTEGER DEFAULT 0, ca02 INTEGER DEFAULT 0, ca03 INTEGER DEFAULT 0,
+        ce01 INTEGER DEFAULT 0, ce02 INTEGER DEFAULT 0, ce03 INTEGER DEFAULT 0,
+        cns01 INTEGER DEFAULT 0, cns02 INTEGER DEFAULT 0, cns03 INTEGER DEFAULT 0,
+        cns04 INTEGER DEFAULT 0, cns05 INTEGER DEFAULT 0, cns06 INTEGER DEFAULT 0,
+        cns07 INTEGER DEFAULT 0, cns08 INTEGER DEFAULT 0, cns09 INTEGER DEFAULT 0,
+        cns10 INTEGER DEFAULT 0, cns11 INTEGER DEFAULT 0, cns12 INTEGER DEFAULT 0,
+        cns13 INTEGER DEFAULT 0, cns14 INTEGER DEFAULT 0, cns15 INTEGER DEFAULT 0,
+        cns16 INTEGER DEFAULT 0, cns17 INTEGER DEFAULT 0, cns18 INTEGER DEFAULT 0,
+        cns19 INTEGER DEFAULT 0, cns20 INTEGER DEFAULT 0,
+        cr01 INTEGER DEFAULT 0, cr02 INTEGER DEFAULT 0, cr03 INTEGER DEFAULT 0,
+        cr04 INTEGER DEFAULT 0, cr05 INTEGER DEFAULT 0, cr07 INTEGER DEFAULT 0,
+        ct01 INTEGER DEFAULT 0, ct02 INTEGER DEFAULT 0,
+        cd01 INTEGER DEFAULT 0, cd02 INTEGER DEFAULT 0, cd03 INTEGER DEFAULT 0,
+        cd04 INTEGER DEFAULT 0,
+        cs01 INTEGER DEFAULT 0, cs02 INTEGER DEFAULT 0,
+        cfa01 INTEGER DEFAULT 0, cfa02 INTEGER DEFAULT 0, cfa03 INTEGER DEFAULT 0,
+        cfa04 INTEGER DEFAULT 0, cfa05 INTEGER DEFAULT 0,
+        cfs01 INTEGER DEFAULT 0, cfs02 INTEGER DEFAULT 0, cfs03 INTEGER DEFAULT 0,
+        cfs04 INTEGER DEFAULT 0, cfs05 INTEGER DEFAULT 0
+    )
+"""
+
+
+def connect():
+    """Open the database tuned for bulk loading"""
+    conn = sqlite3.connect(DB_FILE)
+    # WAL lets worker processes read while this connection writes
+    conn.execute("PRAGMA journal_mode = WAL")
+    # The database is rebuilt from the CSVs on failure, so trade durability for speed
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -65536")
+    return conn
+
+
 def init_database():
-    """Create database tables"""
+    """Create database tables (unique indexes are created after loading)"""
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
     
@@ -40,38 +102,110 @@ def init_database():
             id INTEGER PRIMARY KEY,
             cbsa_code TEXT NOT NULL,
             bg_geoid TEXT NOT NULL,
-            geometry TEXT NOT NULL,
-            UNIQUE(cbsa_code, bg_geoid)
+            geometry TEXT NOT NULL
         )
     """)
     
     # WAC Data table
+    cursor.execute(WAC_DATA_TABLE.format(table="wac_data"))
+    
+    # Databases loaded before job types and years only held all jobs of 2023
+    wac_columns = [row[1] for row in cursor.execute("PRAGMA table_info(wac_data)")]
+    if "job_type" not in wac_columns:
+        cursor.execute("ALTER TABLE wac_data ADD COLUMN job_type TEXT NOT NULL DEFAULT 'all'")
+    if "year" not in wac_columns:
+        cursor.execute(f"ALTER TABLE wac_data ADD COLUMN year INTEGER NOT NULL DEFAULT {DEFAULT_YEAR}")
+    cursor.execute("DROP INDEX IF EXISTS uq_wac_cbsa_bg")
+    cursor.execute("DROP INDEX IF EXISTS uq_wac_cbsa_type_bg")
+    # ... and were created with a table-level UNIQUE(cbsa_code, bg_geoid),
+    # which a DROP INDEX can't remove and which rejects every other year and
+    # job type of a block group, so the table is rebuilt without it
+    if has_legacy_wac_unique(cursor):
+        rebuild_wac_data(cursor)
+        print("✓ Rebuilt wac_data without the one-row-per-block-group constraint")
+    
+    # Job types other than all jobs, per CBSA and year: all jobs minus them,
+    # in the narrowest integer type, zlib-compressed (see wac_store.encode_wac_deltas)
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS wac_data (
-            id INTEGER PRIMARY KEY,
+        CREATE TABLE IF NOT EXISTS wac_deltas (
+            cbsa_code TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            job_type TEXT NOT NULL,
+            bg_geoids BLOB NOT NULL,
+            dtype TEXT NOT NULL,
+            deltas BLOB NOT NULL,
+            PRIMARY KEY (cbsa_code, year, job_type)
+        )
+    """)
+    
+    # Simplified block-group geometries (WKB), one row per detail level
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blockgroup_lod (
             cbsa_code TEXT NOT NULL,
             bg_geoid TEXT NOT NULL,
-            c000 INTEGER DEFAULT 0,
-            ca01 INTEGER DEFAULT 0, ca02 INTEGER DEFAULT 0, ca03 INTEGER DEFAULT 0,
-            ce01 INTEGER DEFAULT 0, ce02 INTEGER DEFAULT 0, ce03 INTEGER DEFAULT 0,
-            cns01 INTEGER DEFAULT 0, cns02 INTEGER DEFAULT 0, cns03 INTEGER DEFAULT 0,
-            cns04 INTEGER DEFAULT 0, cns05 INTEGER DEFAULT 0, cns06 INTEGER DEFAULT 0,
-            cns07 INTEGER DEFAULT 0, cns08 INTEGER DEFAULT 0, cns09 INTEGER DEFAULT 0,
-            cns10 INTEGER DEFAULT 0, cns11 INTEGER DEFAULT 0, cns12 INTEGER DEFAULT 0,
-            cns13 INTEGER DEFAULT 0, cns14 INTEGER DEFAULT 0, cns15 INTEGER DEFAULT 0,
-            cns16 INTEGER DEFAULT 0, cns17 INTEGER DEFAULT 0, cns18 INTEGER DEFAULT 0,
-            cns19 INTEGER DEFAULT 0, cns20 INTEGER DEFAULT 0,
-            cr01 INTEGER DEFAULT 0, cr02 INTEGER DEFAULT 0, cr03 INTEGER DEFAULT 0,
-            cr04 INTEGER DEFAULT 0, cr05 INTEGER DEFAULT 0, cr07 INTEGER DEFAULT 0,
-            ct01 INTEGER DEFAULT 0, ct02 INTEGER DEFAULT 0,
-            cd01 INTEGER DEFAULT 0, cd02 INTEGER DEFAULT 0, cd03 INTEGER DEFAULT 0,
-            cd04 INTEGER DEFAULT 0,
-            cs01 INTEGER DEFAULT 0, cs02 INTEGER DEFAULT 0,
-            cfa01 INTEGER DEFAULT 0, cfa02 INTEGER DEFAULT 0, cfa03 INTEGER DEFAULT 0,
-            cfa04 INTEGER DEFAULT 0, cfa05 INTEGER DEFAULT 0,
-            cfs01 INTEGER DEFAULT 0, cfs02 INTEGER DEFAULT 0, cfs03 INTEGER DEFAULT 0,
-            cfs04 INTEGER DEFAULT 0, cfs05 INTEGER DEFAULT 0,
-            UNIQUE(cbsa_code, bg_geoid)
+            level INTEGER NOT NULL,
+            geometry BLOB NOT NULL,
+            PRIMARY KEY (cbsa_code, level, bg_geoid)
+        )
+    """)
+    
+    # Manifest of loaded source files, used to skip unchanged files
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS source_files (
+            file_name TEXT PRIMARY KEY,
+            cbsa_code TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            sha256 TEXT NOT NULL
+        )
+    """)
+    
+    # Vector tiles (MBTiles layout, one pyramid per CBSA)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tiles (
+            cbsa_code TEXT NOT NULL,
+            zoom_level INTEGER NOT NULL,
+            tile_column INTEGER NOT NULL,
+            tile_row INTEGER NOT NULL,
+            tile_data BLOB NOT NULL,
+            PRIMARY KEY (cbsa_code, zoom_level, tile_column, tile_row)
+        )
+    """)
+    
+    # Precompressed /api/blockgroups/{cbsa_code} bodies per detail level
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS payloads (
+            cbsa_code TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            content_encoding TEXT NOT NULL,
+            body BLOB NOT NULL,
+            PRIMARY KEY (cbsa_code, level, content_encoding)
+        )
+    """)
+    
+    # Tract, county and CBSA sums of every WAC column, with dissolved geometry
+    # encoded as GeoJSON (geometry holds WKB in databases loaded before geojson)
+    wac_sums = ",\n            ".join(f"{col} INTEGER DEFAULT 0" for col in WAC_COLUMNS)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS rollups (
+            cbsa_code TEXT NOT NULL,
+            level TEXT NOT NULL,
+            geoid TEXT NOT NULL,
+            block_groups INTEGER NOT NULL,
+            {wac_sums},
+            geometry BLOB,
+            geojson BLOB,
+            PRIMARY KEY (cbsa_code, level, geoid)
+        )
+    """)
+    if "geojson" not in [row[1] for row in cursor.execute("PRAGMA table_info(rollups)")]:
+        cursor.execute("ALTER TABLE rollups ADD COLUMN geojson BLOB")
+    
+    # Key/value metadata, including the data generation the API caches on
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metadata (
+            name TEXT PRIMARY KEY,
+            value TEXT
         )
     """)
     
@@ -101,138 +235,488 @@ def init_cbsas():
     print("✓ CBSAs initialized")
 
 
-def load_blockgroup_geometries(data_dir):
-    """Load block group geometries from CSV files"""
+def has_legacy_wac_unique(cursor):
+    """Whether wac_data still has a table-level UNIQUE constraint (sqlite_autoindex_wac_data_*)"""
+    return any(row[3] == "u" for row in cursor.execute("PRAGMA index_list(wac_data)"))
+
+
+def rebuild_wac_data(cursor):
+    """Copy wac_data into a table with the current schema and swap it in"""
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(wac_data)")]
+    cursor.execute("DROP TABLE IF EXISTS wac_data_rebuild")
+    cursor.execute(WAC_DATA_TABLE.format(table="wac_data_rebuild"))
+    cursor.execute(
+        f"INSERT INTO wac_data_rebuild ({', '.join(columns)}) SELECT {', '.join(columns)} FROM wac_data"
+    )
+    cursor.execute("DROP TABLE wac_data")
+    cursor.execute("ALTER TABLE wac_data_rebuild RENAME TO wac_data")
+
+
+def create_indexes():
+    """Create the block-group unique indexes once the bulk load is done"""
     conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    for cbsa_code in CBSA_MAPPING.keys():
-        bg_file = Path(data_dir) / f"{cbsa_code}_blockgroups2023.csv"
-        
-        if not bg_file.exists():
-            print(f"  - Skipping {bg_file.name} (not found)")
-            continue
-        
-        print(f"  Loading geometries from {bg_file.name}")
-        df = pd.read_csv(bg_file)
-        
-        for _, row in df.iterrows():
-            bg_geoid = str(row["bgrp"]).strip()
-            geometry = str(row["geometry"]).strip()
-            
-            try:
-                cursor.execute(
-                    "INSERT OR IGNORE INTO blockgroups (cbsa_code, bg_geoid, geometry) VALUES (?, ?, ?)",
-                    (cbsa_code, bg_geoid, geometry)
-                )
-            except Exception as e:
-                continue
-        
-        conn.commit()
-        print(f"    ✓ Loaded {len(df)} geometries for CBSA {cbsa_code}")
-    
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_bg_cbsa_bg ON blockgroups (cbsa_code, bg_geoid)")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_wac_cbsa_year_type_bg "
+        "ON wac_data (cbsa_code, year, job_type, bg_geoid)"
+    )
+    conn.commit()
     conn.close()
+    print("✓ Indexes created")
 
 
-def load_wac_data(data_dir):
-    """Load WAC employment data from CSV files"""
+def bump_data_generation():
+    """
+    Increment the data generation so running API processes drop cached
+    frames and responses built from the previous data
+    """
     conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    with conn:
+        conn.execute(
+            "INSERT INTO metadata (name, value) VALUES ('data_generation', '1') "
+            "ON CONFLICT (name) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+    generation = conn.execute(
+        "SELECT value FROM metadata WHERE name = 'data_generation'"
+    ).fetchone()[0]
+    conn.close()
+    print(f"✓ Data generation {generation}")
+
+
+def read_blockgroups_csv(bg_file):
+    """Read a block group geometry CSV into bg_geoid/geometry columns"""
+    df = pd.read_csv(bg_file, usecols=["bgrp", "geometry"], dtype=str)
+    df = df.dropna()
+    df = pd.DataFrame({
+        "bg_geoid": df["bgrp"].str.strip(),
+        "geometry": df["geometry"].str.strip(),
+    })
+    return df.drop_duplicates("bg_geoid")
+
+
+def read_wac_csv(wac_file):
+    """Read a WAC CSV into bg_geoid plus the lowercase integer WAC columns"""
+    df = pd.read_csv(wac_file, dtype={"bgrp": str})
     
-    wac_columns = [
-        "c000", "ca01", "ca02", "ca03", "ce01", "ce02", "ce03",
-        "cns01", "cns02", "cns03", "cns04", "cns05", "cns06", "cns07", 
-        "cns08", "cns09", "cns10", "cns11", "cns12", "cns13", "cns14", 
-        "cns15", "cns16", "cns17", "cns18", "cns19", "cns20",
-        "cr01", "cr02", "cr03", "cr04", "cr05", "cr07",
-        "ct01", "ct02",
-        "cd01", "cd02", "cd03", "cd04",
-        "cs01", "cs02",
-        "cfa01", "cfa02", "cfa03", "cfa04", "cfa05",
-        "cfs01", "cfs02", "cfs03", "cfs04", "cfs05",
+    # The bgrp column contains the block group GEOID
+    if "bgrp" not in df.columns:
+        raise ValueError(f"bgrp column not found in {Path(wac_file).name}")
+    
+    df.columns = [col.lower() for col in df.columns]
+    values = df.reindex(columns=WAC_COLUMNS, fill_value=0)
+    values = values.apply(pd.to_numeric, errors="coerce").fillna(0).astype("int64")
+    values.insert(0, "bg_geoid", df["bgrp"].str.strip())
+    return values.dropna(subset=["bg_geoid"]).drop_duplicates("bg_geoid")
+
+
+def insert_rows(conn, table, cbsa_code, df):
+    """
+    Insert a DataFrame's rows for a CBSA with a single prepared statement.
+    Callers delete the rows being replaced first, so a conflict is an error.
+    """
+    columns = ["cbsa_code"] + list(df.columns)
+    placeholders = ", ".join(["?"] * len(columns))
+    rows = zip([cbsa_code] * len(df), *(df[col].tolist() for col in df.columns))
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+        rows
+    )
+
+
+def wac_source(file_name):
+    """(year, job_type) of a WAC file name, or None for other files"""
+    match = WAC_FILE_NAME.match(file_name)
+    if match is None or match["job_type"] not in JOB_TYPES:
+        return None
+    return int(match["year"]), match["job_type"]
+
+
+def source_paths(data_dir, cbsa_code):
+    """
+    Paths of the CSV files a CBSA is loaded from: the block-group geometries
+    (which may not exist), then its WAC files by year and job type
+    """
+    wac_files = {}
+    for path in Path(data_dir).glob(f"{cbsa_code}_*.csv"):
+        source = wac_source(path.name)
+        if source is not None:
+            year, job_type = source
+            wac_files[(year, JOB_TYPES.index(job_type))] = path
+    return [Path(data_dir) / f"{cbsa_code}_blockgroups2023.csv"] + [
+        wac_files[key] for key in sorted(wac_files)
     ]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def plan_refresh(data_dir, force=False):
+    """
+    Compare each CBSA's source files against the manifest and return
+    {cbsa_code: (manifest rows, changed file names, removed file names)} for
+    the CBSAs with new, modified or removed files (every file counts as
+    changed with force). Files are only hashed when their size or mtime changed.
+    """
+    conn = sqlite3.connect(DB_FILE)
+    changed = {}
     
     for cbsa_code in CBSA_MAPPING.keys():
-        # Use the _all2023.csv file which contains WAC data
-        wac_file = Path(data_dir) / f"{cbsa_code}_all2023.csv"
+        recorded = {
+            row[0]: row[1:]
+            for row in conn.execute(
+                "SELECT file_name, size, mtime, sha256 FROM source_files WHERE cbsa_code = ?",
+                (cbsa_code,)
+            )
+        }
         
-        if not wac_file.exists():
-            print(f"  - Skipping {wac_file.name} (not found)")
-            continue
-        
-        print(f"  Loading WAC data from {wac_file.name}")
-        df = pd.read_csv(wac_file)
+        current = {}
+        for path in source_paths(data_dir, cbsa_code):
+            if not path.exists():
+                continue
+            stat = path.stat()
+            previous = recorded.get(path.name)
+            if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+                sha256 = previous[2]
+            else:
+                sha256 = file_sha256(path)
+            current[path.name] = (stat.st_size, stat.st_mtime, sha256)
         
-        # The bgrp column contains the block group GEOID
-        if "bgrp" not in df.columns:
-            print(f"    Error: bgrp column not found in {wac_file.name}")
+        rows = [(name, cbsa_code, *state) for name, state in current.items()]
+        modified = [
+            name for name in current
+            if force or name not in recorded or current[name][2] != recorded[name][2]
+        ]
+        removed = [name for name in recorded if name not in current]
+        if modified or removed:
+            changed[cbsa_code] = (rows, modified, removed)
+        else:
+            # Content unchanged; remember new mtimes so the files aren't hashed again
+            with conn:
+                write_manifest(conn, cbsa_code, rows)
+    
+    conn.close()
+    return changed
+
+
+def parse_cbsa(data_dir, cbsa_code, file_names):
+    """
+    Parse the named CSV files of one CBSA (runs in a worker process).
+    Returns (cbsa_code, geometries, {(year, job_type): wac}, messages, seconds);
+    geometries is None unless the geometry file is among them.
+    """
+    start = time.perf_counter()
+    messages = []
+    geometries = None
+    wac = {}
+    
+    for name in file_names:
+        path = Path(data_dir) / name
+        source = wac_source(name)
+        if source is None:
+            geometries = read_blockgroups_csv(path)
             continue
+        try:
+            wac[source] = read_wac_csv(path)
+        except ValueError as e:
+            messages.append(f"    Error: {e}")
+    
+    return cbsa_code, geometries, wac, messages, time.perf_counter() - start
+
+
+def write_cbsa(conn, cbsa_code, geometries, wac, removed):
+    """
+    Replace the rows of one CBSA's parsed files, delete those of its removed
+    files and recompute its total jobs (all jobs in its current year) in a
+    single transaction. WAC rows of other years are left alone, so adding a
+    year only inserts that year.
+    
+    All-jobs files go into wac_data; the other job types are stored in
+    wac_deltas as their difference from all jobs of the same year, so they
+    are re-encoded whenever that year's all-jobs rows change.
+    """
+    base_type = JOB_TYPES[0]
+    removed_sources = {wac_source(name) for name in removed} - {None}
+    base_years = {year for year, job_type in set(wac) | removed_sources if job_type == base_type}
+    rows = {source: list(df.itertuples(index=False, name=None)) for source, df in wac.items()}
+    with conn:
+        # Other job types to (re-)encode: the new files, and the stored
+        # deltas of years whose all-jobs rows change, decoded first
+        others = {source: rows[source] for source in wac if source[1] != base_type}
+        for year in base_years:
+            for job_type in JOB_TYPES[1:]:
+                stored = conn.execute(
+                    "SELECT 1 FROM wac_deltas WHERE cbsa_code = ? AND year = ? AND job_type = ?",
+                    (cbsa_code, year, job_type)
+                ).fetchone()
+                if stored and (year, job_type) not in others and (year, job_type) not in removed_sources:
+                    others[(year, job_type)] = read_wac_rows(conn, cbsa_code, job_type, year)
         
-        total_jobs_cbsa = 0
-        
-        for _, row in df.iterrows():
-            try:
-                bg_geoid = str(row["bgrp"]).strip()
-                
-                # Build insert values - convert column names to lowercase
-                values = {}
-                for col in wac_columns:
-                    col_upper = col.upper()
-                    if col_upper in df.columns:
-                        val = row[col_upper]
-                        values[col] = int(val) if pd.notna(val) else 0
-                    else:
-                        values[col] = 0
-                
-                total_jobs_cbsa += values.get("c000", 0)
-                
-                # Prepare insert statement
-                cols = ", ".join(["cbsa_code", "bg_geoid"] + list(values.keys()))
-                placeholders = ", ".join(["?"] * (len(values) + 2))
-                insert_values = [cbsa_code, bg_geoid] + list(values.values())
-                
-                cursor.execute(
-                    f"INSERT OR IGNORE INTO wac_data ({cols}) VALUES ({placeholders})",
-                    insert_values
+        for name in removed:
+            source = wac_source(name)
+            if source is None:
+                conn.execute("DELETE FROM blockgroups WHERE cbsa_code = ?", (cbsa_code,))
+            else:
+                for table in ("wac_data", "wac_deltas"):
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE cbsa_code = ? AND year = ? AND job_type = ?",
+                        (cbsa_code, *source)
+                    )
+        if geometries is not None:
+            conn.execute("DELETE FROM blockgroups WHERE cbsa_code = ?", (cbsa_code,))
+            insert_rows(conn, "blockgroups", cbsa_code, geometries)
+        for (year, job_type), df in wac.items():
+            if job_type == base_type:
+                conn.execute(
+                    "DELETE FROM wac_data WHERE cbsa_code = ? AND year = ? AND job_type = ?",
+                    (cbsa_code, year, job_type)
                 )
-                
-            except Exception as e:
-                print(f"    Error processing row: {e}")
-                continue
+                insert_rows(conn, "wac_data", cbsa_code, df.assign(year=year, job_type=job_type))
+        for (year, job_type), other_rows in others.items():
+            # Databases loaded before wac_deltas kept full rows in wac_data
+            conn.execute(
+                "DELETE FROM wac_data WHERE cbsa_code = ? AND year = ? AND job_type = ?",
+                (cbsa_code, year, job_type)
+            )
+            base_rows = rows.get((year, base_type))
+            if base_rows is None:
+                base_rows = read_wac_rows(conn, cbsa_code, base_type, year)
+            conn.execute(
+                "INSERT OR REPLACE INTO wac_deltas (cbsa_code, year, job_type, bg_geoids, dtype, deltas) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cbsa_code, year, job_type, *encode_wac_deltas(base_rows, other_rows))
+            )
+        conn.execute(
+            "UPDATE cbsas SET total_jobs = ("
+            "  SELECT COALESCE(SUM(c000), 0) FROM wac_data"
+            "  WHERE cbsa_code = ? AND job_type = ?"
+            "  AND year = (SELECT MAX(year) FROM wac_data WHERE cbsa_code = ?)"
+            ") WHERE cbsa_code = ?",
+            (cbsa_code, base_type, cbsa_code, cbsa_code)
+        )
+
+
+def current_year(conn, cbsa_code):
+    """A CBSA's current (latest) WAC year, or None without WAC data"""
+    return conn.execute("SELECT MAX(year) FROM wac_data WHERE cbsa_code = ?", (cbsa_code,)).fetchone()[0]
+
+
+def plan_derived(changed):
+    """
+    CBSAs whose derived data must be rebuilt: those whose geometry file or
+    current-year WAC files changed. Changes to earlier years only touch
+    wac_data, which the API reads by year.
+    """
+    conn = sqlite3.connect(DB_FILE)
+    rebuild = []
+    for cbsa_code, (rows, modified, removed) in changed.items():
+        year = current_year(conn, cbsa_code)
+        sources = [wac_source(name) for name in modified + removed]
+        if year is None or any(source is None or source[0] >= year for source in sources):
+            rebuild.append(cbsa_code)
+    conn.close()
+    return rebuild
+
+
+def derive_cbsa(cbsa_code):
+    """
+    Build simplified geometries, vector tiles, precompressed GeoJSON payloads
+    and rollups for one CBSA from the loaded tables (runs in a worker process
+    with a read-only connection).
+    Returns (cbsa_code, lod_rows, tile_rows, payload_rows, rollup_rows, seconds).
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True)
+    try:
+        frame = load_frame(conn, cbsa_code)
+        geometries = load_geometry_frame(conn, cbsa_code, frame.positions)
+    finally:
+        conn.close()
+    
+    rollups = rollup_rows(cbsa_code, frame, geometries)
+    if not frame.has_geometry.any():
+        return cbsa_code, [], [], [], rollups, time.perf_counter() - start
+    
+    level_frames = {0: geometries, **simplified_frames(geometries)}
+    lod = lod_rows(cbsa_code, frame.bg_geoids, level_frames)
+    tiles = [(cbsa_code, *row) for row in build_tile_pyramid(frame, level_frames)]
+    payloads = payload_rows(cbsa_code, frame, level_frames)
+    return cbsa_code, lod, tiles, payloads, rollups, time.perf_counter() - start
+
+
+def write_derived(conn, cbsa_code, lod, tiles, payloads, rollups, manifest):
+    """
+    Replace one CBSA's simplified geometries, tiles, payloads and rollups, and
+    record its source files in the manifest, in a single transaction. The
+    manifest is written last so an interrupted load is redone on the next run.
+    """
+    with conn:
+        conn.execute("DELETE FROM blockgroup_lod WHERE cbsa_code = ?", (cbsa_code,))
+        conn.executemany(
+            "INSERT INTO blockgroup_lod (cbsa_code, bg_geoid, level, geometry) VALUES (?, ?, ?, ?)",
+            lod
+        )
+        conn.execute("DELETE FROM tiles WHERE cbsa_code = ?", (cbsa_code,))
+        conn.executemany(
+            "INSERT INTO tiles (cbsa_code, zoom_level, tile_column, tile_row, tile_data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            tiles
+        )
+        conn.execute("DELETE FROM payloads WHERE cbsa_code = ?", (cbsa_code,))
+        conn.executemany(
+            "INSERT INTO payloads (cbsa_code, level, content_encoding, body) VALUES (?, ?, ?, ?)",
+            payloads
+        )
+        conn.execute("DELETE FROM rollups WHERE cbsa_code = ?", (cbsa_code,))
+        conn.executemany(
+            f"INSERT INTO rollups (cbsa_code, level, geoid, block_groups, {', '.join(WAC_COLUMNS)}, geojson) "
+            f"VALUES ({', '.join(['?'] * (len(WAC_COLUMNS) + 5))})",
+            rollups
+        )
+        write_manifest(conn, cbsa_code, manifest)
+
+
+def write_manifest(conn, cbsa_code, manifest):
+    """Record a CBSA's current source files (size, mtime, sha256) in the manifest"""
+    conn.execute("DELETE FROM source_files WHERE cbsa_code = ?", (cbsa_code,))
+    conn.executemany(
+        "INSERT INTO source_files (file_name, cbsa_code, size, mtime, sha256) VALUES (?, ?, ?, ?, ?)",
+        manifest
+    )
+
+
+def run_per_cbsa(func, args, workers):
+    """
+    Yield func(*a) for each argument tuple as results become available, using
+    a process pool when workers > 1. Callers write results from this process,
+    since SQLite allows only one writer.
+    """
+    if workers <= 1 or len(args) <= 1:
+        for a in args:
+            yield func(*a)
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(args))) as pool:
+        futures = [pool.submit(func, *a) for a in args]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def rate(count, seconds):
+    return f"{count / seconds:,.0f} rows/s" if seconds > 0 else "n/a"
+
+
+def load_cbsas(data_dir, changed, workers):
+    """Parse changed CSVs per CBSA in worker processes and write them from this process"""
+    conn = connect()
+    
+    args = [(data_dir, cbsa_code, modified) for cbsa_code, (_, modified, _) in changed.items()]
+    for cbsa_code, geometries, wac, messages, parse_seconds in run_per_cbsa(parse_cbsa, args, workers):
+        for message in messages:
+            print(message)
         
-        conn.commit()
+        start = time.perf_counter()
+        write_cbsa(conn, cbsa_code, geometries, wac, changed[cbsa_code][2])
+        write_seconds = time.perf_counter() - start
         
-        # Update CBSA total jobs
-        cursor.execute(
-            "UPDATE cbsas SET total_jobs = ? WHERE cbsa_code = ?",
-            (total_jobs_cbsa, cbsa_code)
+        rows = sum(len(df) for df in (geometries, *wac.values()) if df is not None)
+        wac_counts = ", ".join(
+            f"{len(df)} {job_type} {year}" for (year, job_type), df in wac.items()
+        ) or "0"
+        print(
+            f"    ✓ CBSA {cbsa_code}: "
+            f"{0 if geometries is None else len(geometries)} geometries, "
+            f"WAC records ({wac_counts}) "
+            f"(parse {parse_seconds:.2f}s, write {write_seconds:.2f}s, "
+            f"{rate(rows, parse_seconds + write_seconds)})"
         )
-        conn.commit()
+    
+    conn.close()
+
+
+def build_derived(manifests, workers):
+    """Build simplified geometries, vector tiles, payloads and rollups per CBSA in worker processes"""
+    conn = connect()
+    
+    args = [(cbsa_code,) for cbsa_code in manifests]
+    for cbsa_code, lod, tiles, payloads, rollups, build_seconds in run_per_cbsa(derive_cbsa, args, workers):
+        start = time.perf_counter()
+        write_derived(conn, cbsa_code, lod, tiles, payloads, rollups, manifests[cbsa_code])
+        write_seconds = time.perf_counter() - start
         
-        print(f"    ✓ Loaded {len(df)} WAC records for CBSA {cbsa_code}")
+        counts = {level: sum(row[1] == level for row in rollups) for level in ROLLUP_LEVELS}
+        summary = f"rollups ({', '.join(f'{n} {level}' for level, n in counts.items())})"
+        if tiles:
+            summary = (
+                f"{len(LOD_TOLERANCES)} detail levels ({len(lod)} geometries), "
+                f"{len(tiles)} tiles (z{TILE_MIN_ZOOM}-{TILE_MAX_ZOOM}), "
+                f"{len(payloads)} payloads ({'/'.join(ENCODINGS)}), {summary}"
+            )
+        print(f"    ✓ CBSA {cbsa_code}: {summary} (build {build_seconds:.2f}s, write {write_seconds:.2f}s)")
     
     conn.close()
 
 
-if __name__ == "__main__":
-    # Determine data directory
-    data_dir = Path(".") if len(sys.argv) == 1 else Path(sys.argv[1])
-    print(f"Loading data from: {data_dir}")
+def load(data_dir, workers=1, force=False):
+    """Create or refresh the database from the CSV files in data_dir"""
+    print("Creating database...")
+    init_database()
     
-    try:
-        print("Creating database...")
-        init_database()
+    print("Initializing CBSAs...")
+    init_cbsas()
+    
+    print("Checking source files...")
+    changed = plan_refresh(data_dir, force)
+    unchanged = [code for code in CBSA_MAPPING if code not in changed]
+    if unchanged:
+        print(f"  - Unchanged, skipping: {', '.join(unchanged)}")
+    
+    if changed:
+        print("Loading block groups and WAC employment data...")
+        load_cbsas(data_dir, changed, workers)
         
-        print("Initializing CBSAs...")
-        init_cbsas()
+        print("Creating indexes...")
+        create_indexes()
         
-        print("Loading block group geometries...")
-        load_blockgroup_geometries(data_dir)
+        rebuild = plan_derived(changed)
+        appended = [code for code in changed if code not in rebuild]
+        if appended:
+            print(f"  - Only earlier years changed, keeping derived data: {', '.join(appended)}")
+            conn = sqlite3.connect(DB_FILE)
+            with conn:
+                for cbsa_code in appended:
+                    write_manifest(conn, cbsa_code, changed[cbsa_code][0])
+            conn.close()
         
-        print("Loading WAC employment data...")
-        load_wac_data(data_dir)
+        if rebuild:
+            print("Building simplified geometries, vector tiles, payloads and rollups...")
+            build_derived({code: changed[code][0] for code in rebuild}, workers)
         
-        print("✓ Data loading complete!")
+        bump_data_generation()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("data_dir", nargs="?", default=".", type=Path,
+                        help="directory containing the CSV files (default: .)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for per-CBSA parsing and tile building "
+                             "(default: CPU count; 1 loads serially)")
+    parser.add_argument("--force", action="store_true",
+                        help="reload every CBSA even if its source files are unchanged")
+    args = parser.parse_args()
+    
+    data_dir = args.data_dir
+    print(f"Loading data from: {data_dir} ({args.workers} workers)")
+    
+    try:
+        start = time.perf_counter()
+        load(data_dir, args.workers, args.force)
+        print(f"✓ Data loading complete! ({time.perf_counter() - start:.1f}s)")
         
     except Exception as e:
         print(f"Error: {e}")
@@ -1,3 +1,4 @@
+import urllib.error
 import urllib.request
 import json
 
@@ -27,6 +28,25 @@ try:
     print(f"  - Earnings brackets: {len(filters['earnings_brackets'])} brackets")
     print(f"  - Education levels: {len(filters['education_levels'])} levels")
     
+    # Test 5: Metric expressions
+    response = urllib.request.urlopen('http://localhost:8000/api/blockgroups/41860/attributes?metric=ce03%20%2F%20c000')
+    attributes = json.loads(response.read().decode())
+    print(f"✓ Metric expression: {len(attributes['metric_value'])} values")
+    try:
+        urllib.request.urlopen('http://localhost:8000/api/blockgroups/41860/attributes?metric=c000*100000000000000000000')
+        raise AssertionError("out-of-range literal was accepted")
+    except urllib.error.HTTPError as e:
+        assert e.code == 400, f"out-of-range literal returned {e.code}"
+    print("✓ Out-of-range literal rejected: 400")
+    
+    # Test 6: Unknown CBSA
+    try:
+        urllib.request.urlopen('http://localhost:8000/api/industries/99999')
+        raise AssertionError("unknown CBSA was accepted")
+    except urllib.error.HTTPError as e:
+        assert e.code == 404, f"unknown CBSA returned {e.code}"
+    print("✓ Unknown CBSA rejected: 404")
+    
     print("\n✅ All API endpoints are working!")
     
 except Exception as e:
@@ -0,0 +1,84 @@
+"""Metric expression parsing and evaluation (python -m pytest test_expressions.py)"""
+
+import numpy as np
+import pytest
+
+from backend.services.cube import CubeSlice
+from backend.services.expressions import MAX_EXPRESSION_LENGTH, compile_expression, json_values
+from backend.services.wac_store import COLUMN_INDEX, WAC_COLUMNS
+
+
+def frame(**columns):
+    """A four-block-group frame with the given WAC columns (others zero)"""
+    data = np.zeros((1, len(WAC_COLUMNS), 4), dtype=np.int32)
+    for name, values in columns.items():
+        data[0, COLUMN_INDEX[name]] = values
+    return CubeSlice(data, [0])
+
+
+def evaluate(text, **columns):
+    return json_values(np.asarray(compile_expression(text).evaluate(frame(**columns))))
+
+
+@pytest.mark.parametrize("text", [
+    "c000.real",
+    "c000[0]",
+    "c000 ** 2",
+    "c000 // 2",
+    "c000 > 1",
+    "c000 if ce01 else ce02",
+    "lambda: c000",
+    "__import__('os')",
+    "round(c000)",
+    "min(c000, key=ce01)",
+    "min()",
+    "abs(c000, ce01)",
+    "'c000'",
+    "True + c000",
+    "unknown_column",
+    "c000 +",
+    "c000" + " + c000" * (MAX_EXPRESSION_LENGTH // 7),
+])
+def test_rejected(text):
+    with pytest.raises(ValueError):
+        compile_expression(text)
+
+
+@pytest.mark.parametrize("text", ["9223372036854775808", "c000 * 100000000000000000000", "c000 * 1e999"])
+def test_literal_out_of_range(text):
+    with pytest.raises(ValueError, match="out of range"):
+        compile_expression(text)
+
+
+def test_normalized_text_and_columns():
+    expression = compile_expression("CE03 /C000")
+    assert expression.text == "ce03 / c000"
+    assert expression.columns == ["ce03", "c000"]
+
+
+def test_integers_stay_integers():
+    assert evaluate("cns09 + cns10 - 1", cns09=[0, 1, 2, 3], cns10=[4, 5, 6, 7]) == [3, 5, 7, 9]
+    assert evaluate("max(c000, ce01) * 2", c000=[1, 5, 2, 0], ce01=[3, 1, 2, 0]) == [6, 10, 4, 0]
+
+
+def test_divide_by_zero_is_null():
+    assert evaluate("ce03 / c000", c000=[0, 4, 0, 2], ce03=[0, 1, 3, 2]) == [None, 0.25, None, 1.0]
+    assert evaluate("1 / 0") == [None] * 4
+
+
+def test_overflow_is_null():
+    c000 = [0, 5, 100000, 3000000]
+    # 3000000 overflows at the third factor, 100000 only at the fourth
+    assert evaluate("c000 * c000 * c000 * c000 * c000", c000=c000) == [0, 3125, None, None]
+    assert evaluate("c000 * c000 * c000 * c000 / 2", c000=c000) == [0, 312.5, None, None]
+    assert evaluate("c000 * 9223372036854775807", c000=c000) == [0, None, None, None]
+    assert [value is None for value in evaluate("-c000 - 9223372036854775807", c000=c000)] == [False, True, True, True]
+    assert evaluate("abs(-9223372036854775807 - 1)") == [None] * 4
+    assert evaluate("-1 * (-9223372036854775807 - 1)") == [None] * 4
+    assert evaluate("c000 * (-9223372036854775807 - 1)", c000=c000) == [0, None, None, None]
+
+
+def test_no_overflow_keeps_extremes():
+    assert evaluate("-9223372036854775807 - 1") == [-9223372036854775808] * 4
+    assert evaluate("9223372036854775806 + 1") == [9223372036854775807] * 4
+    assert evaluate("-3074457345618258602 * 3") == [-9223372036854775806] * 4